@@ -0,0 +1,191 @@
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import carga
+import cofres
+import preparar
+import relatorio
+
+# Benchmarks de carga da API, tudo local e sem rede:
+#
+#   python bench.py carregar --escala media [--container]   gera os cofres e carrega no MySQL
+#   python bench.py rodar --clientes 32 --duracao 60 --salvar resultado.json
+#   python bench.py rodar --servidor --workers 4 --baseline main   sobe o zetria.py serve e compara
+#   python bench.py comparar resultado.json main
+#   python bench.py gerar --escala grande -o cofre.ndjson    cofre de um usuário em arquivo
+#
+# Para resultados comparáveis use a mesma escala, semente, clientes e
+# duração (ficam gravados em "meta"). --rotas escolhe rotas por regex,
+# inclusive as de peso 0 (GET /api/exportar, POST /api/importar).
+
+FLASK_CORE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_core')
+
+SEMENTE_PADRAO = 303
+PORTA_MYSQL = 3306
+
+
+def escala(args):
+    valores = dict(cofres.ESCALAS[args.escala])
+    for campo in ('usuarios', 'notas', 'flashcards', 'tasks'):
+        if getattr(args, campo) is not None:
+            valores[campo] = getattr(args, campo)
+    return valores
+
+
+def cmd_gerar(args):
+    valores = escala(args)
+    saida = open(args.saida, 'wb') if args.saida else sys.stdout.buffer
+    try:
+        preparar.escrever_ndjson(saida, valores, args.semente)
+    finally:
+        if args.saida:
+            saida.close()
+
+
+def cmd_carregar(args):
+    valores = escala(args)
+    if args.container:
+        connection = preparar.subir_container(PORTA_MYSQL)
+    else:
+        connection = preparar.conectar(args.host, PORTA_MYSQL, database=None)
+
+    try:
+        if args.esquema or args.container:
+            preparar.aplicar_esquema(connection)
+        connection.database = 'zetria'
+        inicio = time.perf_counter()
+        preparar.carregar(connection, valores, args.semente)
+        print(f"carga concluída em {time.perf_counter() - inicio:.1f}s: {valores}")
+    finally:
+        connection.close()
+
+
+def subir_servidor(args):
+    # zetria.py serve com os mesmos parâmetros de produção
+    comando = [sys.executable, 'zetria.py', 'serve', '--bind', f'127.0.0.1:{args.porta}',
+               '--pidfile', f'/tmp/zetria-bench-{args.porta}.pid']
+    if args.workers:
+        comando += ['--workers', str(args.workers)]
+    if args.threads:
+        comando += ['--threads', str(args.threads)]
+    processo = subprocess.Popen(comando, cwd=FLASK_CORE)
+
+    url = f'http://127.0.0.1:{args.porta}/login'
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return processo
+        except (urllib.error.URLError, OSError):
+            if processo.poll() is not None:
+                sys.exit('o servidor terminou antes de aceitar conexões')
+            time.sleep(0.1)
+    processo.terminate()
+    sys.exit('o servidor não respondeu em 10s')
+
+
+def cmd_rodar(args):
+    servidor = subir_servidor(args) if args.servidor else None
+    url = f'http://127.0.0.1:{args.porta}' if servidor else args.url
+    try:
+        resultado = carga.rodar(url, args.usuarios_ativos, args.clientes, args.duracao,
+                                args.aquecimento, args.semente, args.rotas, args.processos)
+    finally:
+        if servidor:
+            servidor.send_signal(signal.SIGTERM)
+            servidor.wait()
+
+    rotas = relatorio.estatisticas(resultado, args.duracao)
+    print(relatorio.tabela(rotas))
+
+    meta = relatorio.metadados(url=url, clientes=args.clientes, duracao=args.duracao,
+                               aquecimento=args.aquecimento, semente=args.semente,
+                               usuarios=args.usuarios_ativos, rotas=args.rotas,
+                               workers=args.workers, threads=args.threads)
+    if args.salvar:
+        relatorio.salvar(args.salvar, meta, rotas)
+    if args.salvar_baseline:
+        relatorio.salvar(relatorio.caminho_baseline(args.salvar_baseline), meta, rotas)
+    if args.baseline:
+        return _comparar(rotas, relatorio.carregar(relatorio.caminho_baseline(args.baseline)), args.tolerancia)
+    return 0
+
+
+def cmd_comparar(args):
+    atual = relatorio.carregar(args.resultado)
+    return _comparar(atual['rotas'], relatorio.carregar(relatorio.caminho_baseline(args.baseline)),
+                     args.tolerancia)
+
+
+def _comparar(rotas, baseline, tolerancia):
+    print(f"\ncomparação com a baseline de {baseline['meta']['data']} (commit {baseline['meta'].get('commit')}):")
+    linhas, regressoes = relatorio.comparar(rotas, baseline['rotas'], tolerancia)
+    print('\n'.join(linhas))
+    if regressoes:
+        print(f'\n{len(regressoes)} rota(s) com regressão acima de {tolerancia:.0%}')
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de carga do Zetria')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    def opcoes_escala(p):
+        p.add_argument('--escala', choices=sorted(cofres.ESCALAS), default='pequena')
+        p.add_argument('--usuarios', type=int)
+        p.add_argument('--notas', type=int, help='notas por usuário')
+        p.add_argument('--flashcards', type=int, help='flashcards por usuário')
+        p.add_argument('--tasks', type=int, help='tarefas por usuário')
+        p.add_argument('--semente', type=int, default=SEMENTE_PADRAO)
+
+    p_gerar = comandos.add_parser('gerar', help='escreve o cofre sintético de um usuário em NDJSON')
+    opcoes_escala(p_gerar)
+    p_gerar.add_argument('-o', '--saida')
+    p_gerar.set_defaults(funcao=cmd_gerar)
+
+    p_carregar = comandos.add_parser('carregar', help='cria os usuários bench_NNNN e carrega os cofres')
+    opcoes_escala(p_carregar)
+    p_carregar.add_argument('--host', default=os.environ.get('ZETRIA_DB_HOST', '127.0.0.1'))
+    p_carregar.add_argument('--esquema', action='store_true', help='recria o banco a partir de zetriaBD.sql')
+    p_carregar.add_argument('--container', action='store_true',
+                            help=f'sobe um {preparar.CONTAINER_IMAGEM} descartável na porta {PORTA_MYSQL}')
+    p_carregar.set_defaults(funcao=cmd_carregar)
+
+    p_rodar = comandos.add_parser('rodar', help='carga em malha fechada em todas as rotas /api')
+    p_rodar.add_argument('--url', default='http://127.0.0.1:5000')
+    p_rodar.add_argument('--servidor', action='store_true', help='sobe o zetria.py serve só para a execução')
+    p_rodar.add_argument('--porta', type=int, default=5099, help='porta do servidor com --servidor')
+    p_rodar.add_argument('--workers', type=int)
+    p_rodar.add_argument('--threads', type=int)
+    p_rodar.add_argument('--clientes', type=int, default=16, help='requisições simultâneas')
+    p_rodar.add_argument('--processos', type=int, help='processos do gerador (padrão: CPUs)')
+    p_rodar.add_argument('--usuarios-ativos', type=int, default=cofres.ESCALAS['pequena']['usuarios'],
+                         help='usuários bench_NNNN usados pelos clientes')
+    p_rodar.add_argument('--duracao', type=float, default=30.0, help='segundos medidos')
+    p_rodar.add_argument('--aquecimento', type=float, default=5.0, help='segundos descartados no início')
+    p_rodar.add_argument('--semente', type=int, default=SEMENTE_PADRAO)
+    p_rodar.add_argument('--rotas', help='regex sobre os rótulos, ex.: "GET /api/(notas|grafos)"')
+    p_rodar.add_argument('--salvar', help='grava o resultado em JSON')
+    p_rodar.add_argument('--salvar-baseline', help='grava o resultado como baseline com este nome')
+    p_rodar.add_argument('--baseline', help='compara com a baseline (nome ou arquivo)')
+    p_rodar.add_argument('--tolerancia', type=float, default=relatorio.TOLERANCIA_PADRAO)
+    p_rodar.set_defaults(funcao=cmd_rodar)
+
+    p_comparar = comandos.add_parser('comparar', help='compara um resultado salvo com uma baseline')
+    p_comparar.add_argument('resultado')
+    p_comparar.add_argument('baseline')
+    p_comparar.add_argument('--tolerancia', type=float, default=relatorio.TOLERANCIA_PADRAO)
+    p_comparar.set_defaults(funcao=cmd_comparar)
+
+    args = parser.parse_args()
+    sys.exit(args.funcao(args) or 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,418 @@
+import http.client
+import json
+import multiprocessing
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from cofres import EPOCA, PALAVRAS, SENHA, TAGS, gerar_registros, username
+
+# Gerador de carga em malha fechada: cada cliente virtual manda uma
+# requisição, espera a resposta e já manda a próxima (sem tempo de pensar),
+# então a vazão medida é a que o servidor sustenta com N requisições em
+# curso. Os clientes são threads espalhadas por processos, para o próprio
+# gerador não ficar preso no GIL; cada um tem a sua sessão e conexão
+# keep-alive com o servidor.
+
+
+class Resposta:
+
+    def __init__(self, status, corpo, headers):
+        self.status = status
+        self.corpo = corpo
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.corpo)
+
+
+class Cliente:
+    """Sessão HTTP de um usuário dos benchmarks."""
+
+    def __init__(self, url, indice_usuario):
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.porta = partes.port or 80
+        self.usuario = username(indice_usuario)
+        self.cookie = None
+        self.conexao = None
+
+    def requisitar(self, metodo, caminho, corpo=None, form=None):
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'identity'}
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if form is not None:
+            corpo = urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif isinstance(corpo, bytes):
+            headers['Content-Type'] = 'application/x-ndjson'
+        elif corpo is not None:
+            corpo = json.dumps(corpo).encode()
+            headers['Content-Type'] = 'application/json'
+
+        # Uma nova tentativa se o servidor fechou a conexão keep-alive
+        # (ex.: worker reciclado por max_requests)
+        for tentativa in (1, 2):
+            if self.conexao is None:
+                self.conexao = http.client.HTTPConnection(self.host, self.porta, timeout=60)
+            try:
+                self.conexao.request(metodo, caminho, body=corpo, headers=headers)
+                resposta = self.conexao.getresponse()
+                dados = resposta.read()
+                break
+            except (http.client.RemoteDisconnected, ConnectionError):
+                self.conexao.close()
+                self.conexao = None
+                if tentativa == 2:
+                    raise
+
+        cookie = resposta.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return Resposta(resposta.status, dados, resposta.headers)
+
+    def login(self):
+        resposta = self.requisitar('POST', '/login', form={'username': self.usuario, 'password': SENHA})
+        if resposta.status != 302:
+            raise RuntimeError(f'login de {self.usuario} falhou (status {resposta.status})')
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+
+
+class Contexto:
+    """Ids do cofre do cliente, para montar as requisições."""
+
+    def __init__(self, cliente, rng):
+        self.rng = rng
+        self.notas = self._ids(cliente, '/api/notas?limit=200', 'notas')
+        self.flashcards = self._ids(cliente, '/api/flashcards?limit=200&fields=id', 'flashcards')
+        self.tasks = self._ids(cliente, '/api/tasks?limit=200&fields=id', 'tasks')
+        if not self.notas:
+            raise RuntimeError(f'cofre de {cliente.usuario} está vazio; rode "bench.py carregar" antes')
+        # Criados durante a execução: as escritas alteram e apagam só estes,
+        # o cofre carregado continua igual para a próxima execução
+        self.notas_criadas = []
+        self.revisoes = {}         # nota criada -> (revisão, caracteres do conteúdo)
+        self.nota_editada = None   # (nota_id, caracteres) da escrita em curso
+        self.flashcards_criados = []
+        self.tasks_criadas = []
+        self.series = []           # (task_id, início) das séries criadas
+
+    @staticmethod
+    def _ids(cliente, caminho, chave):
+        resposta = cliente.requisitar('GET', caminho)
+        if resposta.status != 200:
+            raise RuntimeError(f'GET {caminho}: status {resposta.status}')
+        return [item['id'] for item in resposta.json()[chave]]
+
+    def nota(self):
+        return self.rng.choice(self.notas)
+
+    def texto(self, palavras):
+        partes = self.rng.choices(PALAVRAS, k=palavras)
+        partes.append('#' + self.rng.choice(TAGS))
+        return ' '.join(partes)
+
+
+def _data(rng, dias=180):
+    return (EPOCA + timedelta(hours=rng.randrange(-dias * 24, dias * 24))).strftime('%Y-%m-%dT%H:%M')
+
+
+# Cada operação devolve (método, caminho, corpo) ou None quando não se
+# aplica no momento (ex.: apagar sem nada criado); o rótulo é o da rota
+
+def _criar_nota(ctx):
+    return 'POST', '/api/notas', {'title': f'Bench {ctx.rng.getrandbits(48):x}',
+                                  'content': ctx.texto(200) + f' [[{ctx.rng.choice(PALAVRAS)}]]'}
+
+
+def _atualizar_nota(ctx):
+    if not ctx.notas_criadas:
+        return None
+    nota_id = ctx.rng.choice(ctx.notas_criadas)
+    content = ctx.texto(220)
+    ctx.nota_editada = (nota_id, len(content))
+    return 'PUT', f'/api/notas/{nota_id}', {'title': f'Bench {nota_id}', 'content': content}
+
+
+def _delta_nota(ctx):
+    # Autosave por diferença: algumas palavras inseridas num ponto da nota,
+    # às vezes com uma #tag nova
+    if not ctx.notas_criadas:
+        return None
+    nota_id = ctx.rng.choice(ctx.notas_criadas)
+    revisao, tamanho = ctx.revisoes[nota_id]
+    texto = ' ' + ' '.join(ctx.rng.choices(PALAVRAS, k=5))
+    if ctx.rng.random() < 0.2:
+        texto += ' #' + ctx.rng.choice(TAGS)
+    posicao = ctx.rng.randint(0, tamanho)
+    ctx.nota_editada = (nota_id, tamanho + len(texto))
+    return 'PATCH', f'/api/notas/{nota_id}', {
+        'revisao': revisao,
+        'deltas': [{'inicio': posicao, 'fim': posicao, 'texto': texto}],
+        'tamanho': tamanho + len(texto)
+    }
+
+
+def _apagar(lista, prefixo):
+    def operacao(ctx):
+        criados = getattr(ctx, lista)
+        if len(criados) < 20:
+            return None
+        return 'DELETE', f'{prefixo}/{criados.pop(0)}', None
+    return operacao
+
+
+def _escolher(lista):
+    # Para rotas sobre um id do cofre; None se o cofre não tem nenhum
+    def operacao(ctx):
+        ids = getattr(ctx, lista)
+        return ctx.rng.choice(ids) if ids else None
+    return operacao
+
+
+def _sobre(lista, metodo, caminho, corpo=None):
+    # caminho com {id}; corpo é uma função(ctx) ou None
+    escolher = _escolher(lista)
+
+    def operacao(ctx):
+        item_id = escolher(ctx)
+        if item_id is None:
+            return None
+        return metodo, caminho.format(id=item_id), corpo(ctx) if corpo else None
+    return operacao
+
+
+def _criar_flashcard(ctx):
+    return 'POST', '/api/flashcards', {'nota_id': ctx.nota(), 'front_content': ctx.texto(6) + '?',
+                                       'back_content': ctx.texto(20)}
+
+
+def _criar_task(ctx):
+    # Parte das tarefas criadas é uma série diária, para marcar ocorrências
+    corpo = {'title': ctx.texto(4), 'description': ctx.texto(10), 'due_date': _data(ctx.rng)}
+    if ctx.rng.random() < 0.2:
+        corpo.update(recurring=True, recurrence_rule='FREQ=DAILY')
+    return 'POST', '/api/tasks', corpo
+
+
+def _atualizar_task(ctx):
+    if not ctx.tasks_criadas:
+        return None
+    return 'PUT', f'/api/tasks/{ctx.rng.choice(ctx.tasks_criadas)}', \
+        {'title': ctx.texto(4), 'due_date': _data(ctx.rng), 'completed': ctx.rng.random() < 0.5}
+
+
+def _marcar_ocorrencia(ctx):
+    if not ctx.series:
+        return None
+    task_id, inicio = ctx.rng.choice(ctx.series)
+    ocorrencia = inicio + timedelta(days=ctx.rng.randrange(30))
+    return 'PUT', f'/api/tasks/{task_id}/ocorrencias', \
+        {'ocorrencia': ocorrencia.isoformat(), 'completed': ctx.rng.random() < 0.7}
+
+
+def _intervalo_tasks(ctx):
+    inicio = EPOCA + timedelta(days=ctx.rng.randrange(-150, 150))
+    consulta = urlencode({'start': inicio.strftime('%Y-%m-%d'),
+                          'end': (inicio + timedelta(days=42)).strftime('%Y-%m-%d'),
+                          'fields': 'id,title,due_date,completed'})
+    return 'GET', f'/api/tasks/range?{consulta}', None
+
+
+def _importar(ctx):
+    # Cofre pequeno: mede o custo fixo da importação, não o volume
+    registros = gerar_registros({'notas': 10, 'flashcards': 5, 'tasks': 5}, ctx.rng.getrandbits(32))
+    return 'POST', '/api/importar', b''.join(json.dumps(r).encode() + b'\n' for r in registros)
+
+
+# (rótulo, peso, operação). Os pesos imitam o uso da interface: leituras de
+# listas e do grafo dominam, autosave de notas é a escrita mais frequente.
+# Exportação e importação têm peso 0: só rodam quando escolhidas pelo filtro
+OPERACOES = (
+    ('GET /api/notas', 10, lambda ctx: ('GET', '/api/notas', None)),
+    ('GET /api/notas/search', 6, lambda ctx: ('GET', '/api/notas/search?' + urlencode({'q': ctx.rng.choice(PALAVRAS)}), None)),
+    ('GET /api/notas/<id>', 12, _sobre('notas', 'GET', '/api/notas/{id}')),
+    ('GET /api/notas/<id>/derivado', 2, _sobre('notas', 'GET', '/api/notas/{id}/derivado')),
+    ('POST /api/notas', 3, _criar_nota),
+    ('PUT /api/notas/<id>', 3, _atualizar_nota),
+    ('PATCH /api/notas/<id>', 5, _delta_nota),
+    ('DELETE /api/notas/<id>', 1, _apagar('notas_criadas', '/api/notas')),
+    ('GET /api/flashcards', 4, lambda ctx: ('GET', '/api/flashcards', None)),
+    ('GET /api/flashcards/<id>', 2, _sobre('flashcards', 'GET', '/api/flashcards/{id}')),
+    ('GET /api/flashcards/due', 5, lambda ctx: ('GET', '/api/flashcards/due', None)),
+    ('POST /api/flashcards', 1, _criar_flashcard),
+    ('PUT /api/flashcards/<id>', 1, _sobre('flashcards_criados', 'PUT', '/api/flashcards/{id}',
+                                           lambda ctx: {'front_content': ctx.texto(6) + '?', 'back_content': ctx.texto(20)})),
+    ('POST /api/flashcards/<id>/review', 5, _sobre('flashcards', 'POST', '/api/flashcards/{id}/review',
+                                                   lambda ctx: {'grade': ctx.rng.choice(['again', 'hard', 'medium', 'easy'])})),
+    ('DELETE /api/flashcards/<id>', 1, _apagar('flashcards_criados', '/api/flashcards')),
+    ('GET /api/tasks', 3, lambda ctx: ('GET', '/api/tasks', None)),
+    ('GET /api/tasks/range', 6, _intervalo_tasks),
+    ('GET /api/tasks/date/<data>', 1, lambda ctx: ('GET', f"/api/tasks/date/{_data(ctx.rng)[:10]}", None)),
+    ('POST /api/tasks', 1, _criar_task),
+    ('PUT /api/tasks/<id>', 1, _atualizar_task),
+    ('PUT /api/tasks/<id>/ocorrencias', 1, _marcar_ocorrencia),
+    ('DELETE /api/tasks/<id>', 1, _apagar('tasks_criadas', '/api/tasks')),
+    ('GET /api/grafos', 2, lambda ctx: ('GET', '/api/grafos', None)),
+    ('GET /api/grafos/nodes', 2, lambda ctx: ('GET', '/api/grafos/nodes', None)),
+    ('GET /api/grafos/edges', 2, lambda ctx: ('GET', '/api/grafos/edges', None)),
+    ('GET /api/grafos/backlinks/<id>', 3, _sobre('notas', 'GET', '/api/grafos/backlinks/{id}')),
+    ('GET /api/grafos/vizinhanca/<id>', 3, _sobre('notas', 'GET', '/api/grafos/vizinhanca/{id}?k=2')),
+    ('GET /api/grafos/caminho', 2, lambda ctx: ('GET', f'/api/grafos/caminho?origem={ctx.nota()}&destino={ctx.nota()}', None)),
+    ('GET /api/sistema/pool', 1, lambda ctx: ('GET', '/api/sistema/pool', None)),
+    ('GET /api/sistema/cache', 1, lambda ctx: ('GET', '/api/sistema/cache', None)),
+    ('GET /api/exportar', 0, lambda ctx: ('GET', '/api/exportar', None)),
+    ('POST /api/importar', 0, _importar),
+)
+
+
+def _registrar_nota(ctx, corpo):
+    nota = corpo['nota']
+    ctx.notas_criadas.append(nota['id'])
+    ctx.revisoes[nota['id']] = (nota['revisao'], len(nota['content']))
+
+
+def _registrar_revisao(ctx, corpo):
+    nota_id, tamanho = ctx.nota_editada
+    ctx.revisoes[nota_id] = (corpo['revisao'], tamanho)
+
+
+def _registrar_flashcard(ctx, corpo):
+    ctx.flashcards_criados.append(corpo['flashcard']['id'])
+
+
+def _registrar_task(ctx, corpo):
+    task = corpo['task']
+    ctx.tasks_criadas.append(task['id'])
+    if task.get('recurring'):
+        ctx.series.append((task['id'], datetime.fromisoformat(task['due_date'])))
+
+
+# Rótulo -> função(ctx, corpo da resposta) que guarda o id criado (ou a
+# nova revisão da nota alterada)
+REGISTROS = {
+    'POST /api/notas': _registrar_nota,
+    'PUT /api/notas/<id>': _registrar_revisao,
+    'PATCH /api/notas/<id>': _registrar_revisao,
+    'POST /api/flashcards': _registrar_flashcard,
+    'POST /api/tasks': _registrar_task,
+}
+
+
+def selecionar_operacoes(filtro=None):
+    # filtro: regex sobre o rótulo. Rotas de peso 0 (ex.: exportação) só
+    # entram quando o filtro as escolhe
+    selecionadas = []
+    for rotulo, peso, operacao in OPERACOES:
+        if filtro and not re.search(filtro, rotulo):
+            continue
+        if peso > 0 or filtro:
+            selecionadas.append((rotulo, peso or 1, operacao))
+    if not selecionadas:
+        raise ValueError(f'nenhuma rota corresponde a {filtro!r}')
+    return selecionadas
+
+
+def _cliente_virtual(url, usuario, semente, operacoes, inicio, aquecimento, fim, amostras, erros, trava):
+    rng = random.Random(semente)
+    cliente = Cliente(url, usuario)
+    cliente.login()
+    ctx = Contexto(cliente, rng)
+    rotulos = [rotulo for rotulo, _, _ in operacoes]
+    funcoes = {rotulo: operacao for rotulo, _, operacao in operacoes}
+    pesos = [peso for _, peso, _ in operacoes]
+
+    locais = {}
+    erros_locais = {}
+    while time.time() < fim:
+        rotulo = rng.choices(rotulos, weights=pesos)[0]
+        pedido = funcoes[rotulo](ctx)
+        if pedido is None:
+            continue
+        metodo, caminho, corpo = pedido
+
+        agora = time.time()
+        t0 = time.perf_counter()
+        try:
+            resposta = cliente.requisitar(metodo, caminho, corpo)
+            status = resposta.status
+        except (OSError, http.client.HTTPException):
+            status = 0
+        duracao = time.perf_counter() - t0
+
+        if status and status < 400 and rotulo in REGISTROS:
+            try:
+                REGISTROS[rotulo](ctx, resposta.json())
+            except (ValueError, KeyError, TypeError):
+                pass
+
+        # Amostras do aquecimento (caches frios, JIT do MySQL) ficam de fora
+        if agora < inicio + aquecimento:
+            continue
+        locais.setdefault(rotulo, []).append(duracao)
+        if not status or status >= 400:
+            erros_locais[rotulo] = erros_locais.get(rotulo, 0) + 1
+
+    cliente.fechar()
+    with trava:
+        for rotulo, valores in locais.items():
+            amostras.setdefault(rotulo, []).extend(valores)
+        for rotulo, quantidade in erros_locais.items():
+            erros[rotulo] = erros.get(rotulo, 0) + quantidade
+
+
+def _processo(url, usuarios, sementes, operacoes, inicio, aquecimento, fim, fila):
+    # Um processo do gerador com uma thread por cliente virtual
+    amostras, erros, trava = {}, {}, threading.Lock()
+    threads = [
+        threading.Thread(target=_cliente_virtual,
+                         args=(url, usuario, semente, operacoes, inicio, aquecimento, fim, amostras, erros, trava))
+        for usuario, semente in zip(usuarios, sementes)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    fila.put((amostras, erros))
+
+
+def rodar(url, usuarios, clientes, duracao, aquecimento, semente, filtro=None, processos=None):
+    # Devolve {rótulo: {'latencias': [...], 'erros': n}} com as amostras da
+    # janela medida (depois do aquecimento)
+    operacoes = selecionar_operacoes(filtro)
+    processos = max(1, min(processos or multiprocessing.cpu_count(), clientes))
+
+    # Cliente i usa o usuário (i % usuarios) + 1: vários clientes por cofre
+    # quando há mais clientes que usuários
+    distribuicao = [[] for _ in range(processos)]
+    for indice in range(clientes):
+        distribuicao[indice % processos].append((indice % usuarios + 1, semente * 7919 + indice))
+
+    inicio = time.time() + 1.0
+    fim = inicio + aquecimento + duracao
+    fila = multiprocessing.Queue()
+    filhos = [
+        multiprocessing.Process(target=_processo, args=(
+            url, [u for u, _ in parte], [s for _, s in parte],
+            operacoes, inicio, aquecimento, fim, fila))
+        for parte in distribuicao if parte
+    ]
+    for filho in filhos:
+        filho.start()
+
+    resultado = {}
+    for _ in filhos:
+        amostras, erros = fila.get()
+        for rotulo, valores in amostras.items():
+            resultado.setdefault(rotulo, {'latencias': [], 'erros': 0})['latencias'].extend(valores)
+        for rotulo, quantidade in erros.items():
+            resultado.setdefault(rotulo, {'latencias': [], 'erros': 0})['erros'] += quantidade
+    for filho in filhos:
+        filho.join()
+    return resultado
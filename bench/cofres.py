@@ -0,0 +1,141 @@
+import hashlib
+import random
+from datetime import datetime, timedelta
+
+# Cofres sintéticos para os benchmarks, no formato NDJSON de flask_core/cofre.py:
+# a carga no banco passa pela mesma importação da API, então as notas já
+# entram com tags e links derivados, como depois do consumer_grafos.
+#
+# Tudo sai de um random.Random(semente): a mesma escala e a mesma semente
+# geram sempre o mesmo cofre, e as medições de duas execuções são comparáveis.
+
+# Escalas predefinidas; cada campo pode ser sobrescrito na linha de comando
+ESCALAS = {
+    'pequena': {'usuarios': 2, 'notas': 200, 'flashcards': 100, 'tasks': 100},
+    'media': {'usuarios': 10, 'notas': 2000, 'flashcards': 1000, 'tasks': 500},
+    'grande': {'usuarios': 50, 'notas': 10000, 'flashcards': 5000, 'tasks': 2000},
+}
+
+# Senha de todos os usuários dos benchmarks (bench_0001, bench_0002, ...)
+SENHA = 'bench'
+
+PALAVRAS = (
+    'sistema distribuido processo mensagem fila banco indice consulta cache '
+    'replica consenso lider quorum particao latencia vazao memoria disco rede '
+    'protocolo servidor cliente requisicao resposta transacao bloqueio versao '
+    'estado evento log snapshot nota estudo revisao conceito exemplo resumo '
+    'capitulo aula prova exercicio definicao teorema algoritmo estrutura grafo '
+    'arvore lista tabela hash ordenacao busca caminho vertice aresta peso'
+).split()
+
+TAGS = (
+    'estudo revisao prova importante duvida resumo aula projeto leitura ideia '
+    'redes so bd algoritmos grafos distribuidos concorrencia seguranca compiladores '
+    'matematica fisica ingles pesquisa artigo tcc'
+).split()
+
+REGRAS = ('FREQ=DAILY', 'FREQ=WEEKLY', 'FREQ=WEEKLY;BYDAY=MO,WE,FR',
+          'FREQ=MONTHLY;BYMONTHDAY=1', 'FREQ=DAILY;INTERVAL=2;COUNT=30')
+
+# Notas grandes (dezenas de KB) em uma fração pequena do cofre
+FRACAO_NOTAS_GRANDES = 0.01
+PARAGRAFOS_NOTA = (1, 8)
+PARAGRAFOS_NOTA_GRANDE = (200, 400)
+
+# Parte dos [[links]] aponta para títulos que não existem (links pendentes)
+FRACAO_LINKS_PENDENTES = 0.1
+
+# Referência fixa para as datas: o cofre não muda com o dia da geração
+EPOCA = datetime(2025, 1, 1)
+
+
+def username(indice):
+    return f'bench_{indice:04d}'
+
+
+def hash_senha(senha):
+    # Mesmo hash de rotas_auth.hash_password
+    return hashlib.sha256(senha.encode()).hexdigest()
+
+
+def titulo_nota(indice):
+    return f'Nota {indice:05d} {PALAVRAS[indice % len(PALAVRAS)]}'
+
+
+def _zipf(rng, n, s=1.1):
+    # Índice em [0, n) com cauda longa: poucas tags e notas muito populares
+    return min(n - 1, int(rng.paretovariate(s)) - 1)
+
+
+def _paragrafo(rng, notas):
+    partes = []
+    for _ in range(rng.randint(20, 80)):
+        sorteio = rng.random()
+        if sorteio < 0.03:
+            partes.append('#' + TAGS[_zipf(rng, len(TAGS))])
+        elif sorteio < 0.05:
+            if rng.random() < FRACAO_LINKS_PENDENTES:
+                partes.append(f'[[Pendente {rng.randrange(notas * 2)}]]')
+            else:
+                partes.append(f'[[{titulo_nota(_zipf(rng, notas))}]]')
+        else:
+            partes.append(rng.choice(PALAVRAS))
+    return ' '.join(partes)
+
+
+def gerar_registros(escala, semente):
+    # Registros (dicts) de um cofre de usuário, na ordem da exportação
+    rng = random.Random(semente)
+    notas = escala['notas']
+
+    yield {'tipo': 'zetria', 'versao': 1, 'exportado_em': EPOCA.isoformat()}
+
+    for indice in range(notas):
+        grande = rng.random() < FRACAO_NOTAS_GRANDES
+        minimo, maximo = PARAGRAFOS_NOTA_GRANDE if grande else PARAGRAFOS_NOTA
+        criada = EPOCA - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        yield {
+            'tipo': 'nota',
+            'id': indice + 1,
+            'title': titulo_nota(indice),
+            'content': '\n\n'.join(_paragrafo(rng, notas) for _ in range(rng.randint(minimo, maximo))),
+            'created_at': criada.isoformat(),
+            'updated_at': (criada + timedelta(minutes=rng.randrange(30 * 24 * 60))).isoformat(),
+        }
+
+    for indice in range(escala['flashcards']):
+        repeticoes = rng.randint(0, 6)
+        yield {
+            'tipo': 'flashcard',
+            'id': indice + 1,
+            'nota_id': rng.randrange(notas) + 1,
+            'front_content': ' '.join(rng.choices(PALAVRAS, k=rng.randint(3, 12))) + '?',
+            'back_content': ' '.join(rng.choices(PALAVRAS, k=rng.randint(5, 40))),
+            'created_at': (EPOCA - timedelta(days=rng.randrange(365))).isoformat(),
+            # Parte dos cartões vencida, parte no futuro
+            'review_at': (EPOCA + timedelta(hours=rng.randrange(-30 * 24, 60 * 24))).isoformat(),
+            'ease': round(rng.uniform(1.3, 3.0), 2),
+            'interval_days': 0 if not repeticoes else rng.randint(1, 120),
+            'repetitions': repeticoes,
+        }
+
+    for indice in range(escala['tasks']):
+        recorrente = rng.random() < 0.1
+        yield {
+            'tipo': 'task',
+            'id': indice + 1,
+            'title': ' '.join(rng.choices(PALAVRAS, k=rng.randint(2, 6))).capitalize(),
+            'description': ' '.join(rng.choices(PALAVRAS, k=rng.randint(0, 30))),
+            'due_date': (EPOCA + timedelta(hours=rng.randrange(-180 * 24, 180 * 24))).isoformat(),
+            'recurring': recorrente,
+            'recurrence_rule': rng.choice(REGRAS) if recorrente else None,
+            'completed': rng.random() < 0.3,
+            'created_at': (EPOCA - timedelta(days=rng.randrange(365))).isoformat(),
+        }
+
+    yield {'tipo': 'fim'}
+
+
+def semente_usuario(semente, indice):
+    # Cada usuário tem o seu cofre, todos derivados da semente da execução
+    return semente * 100003 + indice
@@ -0,0 +1,104 @@
+import os
+import subprocess
+import sys
+import time
+
+import mysql.connector
+from mysql.connector import Error
+
+from cofres import SENHA, gerar_registros, hash_senha, semente_usuario, username
+
+# Módulos do flask_core usados na carga (como no consumer_grafos)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_core'))
+
+from cofre import Importacao
+from serializacao import dumps
+
+ESQUEMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_core', 'zetriaBD.sql')
+
+# Banco descartável em container; a imagem precisa estar no cache local
+# para rodar sem rede (docker pull mariadb:11 uma vez)
+CONTAINER_NOME = 'zetria-bench-db'
+CONTAINER_IMAGEM = os.environ.get('ZETRIA_BENCH_IMAGEM', 'mariadb:11')
+
+
+def conectar(host, porta, database='zetria', tentativas=1):
+    # A aplicação usa root sem senha em localhost (flask_core/banco.py)
+    for tentativa in range(tentativas):
+        try:
+            return mysql.connector.connect(host=host, port=porta, database=database, user='root', password='')
+        except Error:
+            if tentativa == tentativas - 1:
+                raise
+            time.sleep(1)
+
+
+def subir_container(porta):
+    # Recria o container do zero: cada execução começa com o banco vazio
+    subprocess.run(['docker', 'rm', '-f', CONTAINER_NOME], capture_output=True)
+    subprocess.run([
+        'docker', 'run', '-d', '--rm', '--name', CONTAINER_NOME,
+        '-e', 'MARIADB_ALLOW_EMPTY_ROOT_PASSWORD=1',
+        '-p', f'{porta}:3306',
+        CONTAINER_IMAGEM,
+        # Logs de transação como em produção; o buffer pool cabe na máquina de teste
+        '--innodb-buffer-pool-size=512M', '--innodb-flush-log-at-trx-commit=1',
+    ], check=True, capture_output=True)
+    return conectar('127.0.0.1', porta, database=None, tentativas=60)
+
+
+def descer_container():
+    subprocess.run(['docker', 'rm', '-f', CONTAINER_NOME], capture_output=True)
+
+
+def aplicar_esquema(connection):
+    # zetriaBD.sql já inclui as migrações; apaga o banco anterior antes
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DROP DATABASE IF EXISTS zetria")
+        with open(ESQUEMA, encoding='utf-8') as arquivo:
+            for instrucao in arquivo.read().split(';'):
+                if instrucao.strip():
+                    cursor.execute(instrucao)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def criar_usuario(connection, indice):
+    # Devolve o id do usuário; recria o cofre se ele já existia
+    cursor = connection.cursor()
+    try:
+        cursor.execute("DELETE FROM usuarios WHERE username = %s", (username(indice),))
+        cursor.execute(
+            "INSERT INTO usuarios (username, password_hash) VALUES (%s, %s)",
+            (username(indice), hash_senha(SENHA))
+        )
+        connection.commit()
+        return cursor.lastrowid
+    finally:
+        cursor.close()
+
+
+def carregar(connection, escala, semente, progresso=print):
+    # Um cofre por usuário, importado pelo mesmo caminho de POST /api/importar
+    resumo = {}
+    for indice in range(1, escala['usuarios'] + 1):
+        inicio = time.perf_counter()
+        user_id = criar_usuario(connection, indice)
+
+        importacao = Importacao(connection, user_id)
+        for registro in gerar_registros(escala, semente_usuario(semente, indice)):
+            importacao.adicionar(registro)
+        resultado = importacao.concluir()
+
+        resumo[username(indice)] = resultado['importados']
+        progresso(f"{username(indice)}: {resultado['importados']} em {time.perf_counter() - inicio:.1f}s"
+                  + (f" ({len(resultado['erros'])} erros)" if resultado['erros'] else ''))
+    return resumo
+
+
+def escrever_ndjson(saida, escala, semente, indice=1):
+    # Cofre de um usuário em arquivo, para importar pela API ou pelo cofre.py
+    for registro in gerar_registros(escala, semente_usuario(semente, indice)):
+        saida.write(dumps(registro) + b'\n')
@@ -0,0 +1,148 @@
+import json
+import math
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+# Estatísticas por rota, arquivos de resultado e comparação com baselines.
+# Um resultado é um JSON {"meta": {...}, "rotas": {rótulo: estatísticas}};
+# as baselines são resultados salvos em bench/baselines/<nome>.json.
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+PERCENTIS = (50, 95, 99)
+
+# Piora tolerada na comparação antes de contar como regressão; execuções
+# curtas oscilam alguns por cento mesmo sem mudança no código
+TOLERANCIA_PADRAO = 0.10
+
+# Rotas com menos amostras que isso não entram no veredito da comparação
+AMOSTRAS_MINIMAS = 50
+
+
+def percentil(ordenados, p):
+    # Nearest-rank sobre a lista já ordenada
+    if not ordenados:
+        return None
+    posicao = max(0, math.ceil(p / 100 * len(ordenados)) - 1)
+    return ordenados[posicao]
+
+
+def estatisticas(resultado, duracao):
+    # {rótulo: {'latencias', 'erros'}} -> {rótulo: estatísticas em ms}
+    rotas = {}
+    for rotulo, dados in sorted(resultado.items()):
+        latencias = sorted(dados['latencias'])
+        if not latencias:
+            continue
+        rotas[rotulo] = {
+            'requisicoes': len(latencias),
+            'erros': dados['erros'],
+            'vazao': round(len(latencias) / duracao, 2),
+            'media_ms': round(sum(latencias) / len(latencias) * 1000, 3),
+            **{f'p{p}_ms': round(percentil(latencias, p) * 1000, 3) for p in PERCENTIS},
+            'max_ms': round(latencias[-1] * 1000, 3),
+        }
+
+    todas = sorted(valor for dados in resultado.values() for valor in dados['latencias'])
+    if todas:
+        rotas['TOTAL'] = {
+            'requisicoes': len(todas),
+            'erros': sum(dados['erros'] for dados in resultado.values()),
+            'vazao': round(len(todas) / duracao, 2),
+            'media_ms': round(sum(todas) / len(todas) * 1000, 3),
+            **{f'p{p}_ms': round(percentil(todas, p) * 1000, 3) for p in PERCENTIS},
+            'max_ms': round(todas[-1] * 1000, 3),
+        }
+    return rotas
+
+
+def metadados(**parametros):
+    # O que é preciso para saber se dois resultados são comparáveis
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'maquina': platform.node(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        **parametros,
+    }
+
+
+def salvar(caminho, meta, rotas):
+    os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump({'meta': meta, 'rotas': rotas}, arquivo, ensure_ascii=False, indent=2)
+        arquivo.write('\n')
+
+
+def carregar(caminho):
+    with open(caminho, encoding='utf-8') as arquivo:
+        return json.load(arquivo)
+
+
+def caminho_baseline(nome):
+    # Nome simples vira bench/baselines/<nome>.json; caminhos ficam como estão
+    if os.sep in nome or nome.endswith('.json'):
+        return nome
+    return os.path.join(BASELINES, f'{nome}.json')
+
+
+def tabela(rotas):
+    colunas = ('requisicoes', 'erros', 'vazao', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+    largura = max([len(rotulo) for rotulo in rotas] + [4])
+    linhas = [f"{'rota':<{largura}} " + ' '.join(f'{coluna:>11}' for coluna in colunas)]
+    for rotulo, dados in rotas.items():
+        linhas.append(f'{rotulo:<{largura}} ' + ' '.join(f'{dados[coluna]:>11}' for coluna in colunas))
+    return '\n'.join(linhas)
+
+
+def comparar(atual, baseline, tolerancia=TOLERANCIA_PADRAO):
+    # Devolve (linhas do relatório, rotas com regressão). Regressão: p50, p95
+    # ou p99 mais lentos, ou vazão menor, além da tolerância
+    linhas, regressoes = [], []
+    largura = max([len(rotulo) for rotulo in atual] + [4])
+    linhas.append(f"{'rota':<{largura}} {'vazao':>16} " + ' '.join(f'{f"p{p}_ms":>20}' for p in PERCENTIS))
+
+    for rotulo, dados in atual.items():
+        base = baseline.get(rotulo)
+        if base is None:
+            linhas.append(f'{rotulo:<{largura}} (sem baseline)')
+            continue
+
+        piorou = []
+        celulas = []
+        variacao = _variacao(dados['vazao'], base['vazao'])
+        celulas.append(f"{dados['vazao']:>8} {variacao:>+7.1%}")
+        if variacao < -tolerancia:
+            piorou.append('vazao')
+        for p in PERCENTIS:
+            chave = f'p{p}_ms'
+            variacao = _variacao(dados[chave], base[chave])
+            celulas.append(f'{dados[chave]:>12} {variacao:>+7.1%}')
+            if variacao > tolerancia:
+                piorou.append(chave)
+
+        conta = dados['requisicoes'] >= AMOSTRAS_MINIMAS and base['requisicoes'] >= AMOSTRAS_MINIMAS
+        marca = ''
+        if piorou and conta:
+            regressoes.append((rotulo, piorou))
+            marca = '  << ' + ', '.join(piorou)
+        linhas.append(f'{rotulo:<{largura}} ' + ' '.join(celulas) + marca)
+
+    for rotulo in baseline:
+        if rotulo not in atual:
+            linhas.append(f'{rotulo:<{largura}} (só na baseline)')
+    return linhas, regressoes
+
+
+def _variacao(atual, base):
+    if not base:
+        return 0.0
+    return (atual - base) / base
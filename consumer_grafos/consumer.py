@@ -1,28 +1,315 @@
-import pika
-import mysql.connector
+import argparse
 import json
+import multiprocessing
+import os
+import signal
+import sys
+import time
+
+import pika
+from mysql.connector import Error, errorcode
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
 
-def process_message(body):
-    data = json.loads(body)
-    # Exemplo: processar dados de grafos e salvar no banco
-    print("Processando dados de grafo:", data)
-    # Aqui você faria operações no banco, por exemplo inserir nós ou arestas
+# Módulos compartilhados com o flask_core (no container já estão no PYTHONPATH)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'flask_core'))
 
-def main():
-    connection = pika.BlockingConnection(pika.ConnectionParameters(host='rabbitmq'))
-    channel = connection.channel()
+from db_pool import ConnectionPool
+from derivacao import derivar_notas
+from fila_grafos import CABECALHO_TENTATIVAS, FILA, FILA_ANTIGA, FILA_FALHAS, FILA_RETENTATIVAS, MAX_TENTATIVAS, RABBITMQ_HOST, declarar_filas, mover_mensagens, tentativas, transferir_fila_antiga
+from metricas import Metricas, lag_mensagem, servir_metricas
+
+DB_CONFIG = {
+    'host': os.environ.get('ZETRIA_DB_HOST', 'localhost'),
+    'database': 'zetria',
+    'user': 'root',
+    'password': ''
+}
+
+# prefetch limita quantas mensagens não confirmadas cada worker segura;
+# precisa ser maior que o lote para o próximo lote já ir chegando
+PREFETCH = int(os.environ.get('ZETRIA_CONSUMER_PREFETCH', '200'))
+LOTE_MAX = int(os.environ.get('ZETRIA_CONSUMER_LOTE', '50'))
+LOTE_ESPERA = float(os.environ.get('ZETRIA_CONSUMER_LOTE_MS', '200')) / 1000
+PROCESSOS = int(os.environ.get('ZETRIA_CONSUMER_PROCESSOS', str(min(4, os.cpu_count() or 1))))
+METRICAS_PORTA = int(os.environ.get('ZETRIA_CONSUMER_METRICAS_PORTA', '9100'))
+# De quanto em quanto tempo cada worker consulta a profundidade da fila (e
+# passa para ela o que chegou na fila antiga, ver fila_grafos.py)
+FILA_INTERVALO = 5.0
+
+# Erros que condenam o lote (banco ou mensagem malformada); o resto derruba
+# o worker e o supervisor o recria
+ERROS_LOTE = (Error, LookupError, TypeError, ValueError)
+
+# Erros do banco que passam sozinhos: a mensagem volta pela fila de
+# retentativas em vez de ir para a de falhas
+ERROS_TEMPORARIOS = {
+    errorcode.ER_LOCK_DEADLOCK,
+    errorcode.ER_LOCK_WAIT_TIMEOUT,
+    errorcode.ER_CON_COUNT_ERROR,
+    errorcode.ER_SERVER_SHUTDOWN,
+    errorcode.CR_CONN_HOST_ERROR,
+    errorcode.CR_SERVER_GONE_ERROR,
+    errorcode.CR_SERVER_LOST,
+    errorcode.CR_SERVER_LOST_EXTENDED,
+}
+
+
+def erro_temporario(erro):
+    # Deadlock, lock wait timeout, banco fora do ar ou conexão perdida, e
+    # pool esgotado; erro de SQL ou mensagem malformada não passa tentando
+    if isinstance(erro, (OperationalError, InterfaceError, PoolError)):
+        return True
+    return isinstance(erro, Error) and erro.errno in ERROS_TEMPORARIOS
+
+
+def processar_notas_alteradas(cursor, eventos):
+    # Várias escritas da mesma nota no lote viram uma derivação só. Usuários
+    # em ordem crescente: os FOR UPDATE em usuarios não formam ciclo entre
+    # workers que processam lotes com os mesmos usuários
+    notas_por_usuario = {}
+    for evento in eventos:
+        notas_por_usuario.setdefault(int(evento['user_id']), set()).add(int(evento['nota_id']))
+
+    for user_id in sorted(notas_por_usuario):
+        derivar_notas(cursor, user_id, sorted(notas_por_usuario[user_id]))
+
+
+# tipo da mensagem -> função(cursor, eventos) que grava o lote inteiro;
+# roda dentro de uma transação, o commit é feito aqui
+HANDLERS = {
+    'nota_alterada': processar_notas_alteradas,
+}
+
+
+class Worker:
+    """Um processo consumidor: junta mensagens em lotes e grava cada lote
+    numa única transação, confirmando tudo com um só ack."""
+
+    def __init__(self, numero, metricas):
+        self.numero = numero
+        self.metricas = metricas
+        self.parar = False
+        self.pool = ConnectionPool(DB_CONFIG, size=1)
+        self.lote = []  # (method, properties, evento)
+        self.inicio_lote = None
+        self.ultima_verificacao_fila = 0.0
+
+    def _sinal(self, signum, frame):
+        self.parar = True
+
+    def executar(self):
+        signal.signal(signal.SIGTERM, self._sinal)
+        signal.signal(signal.SIGINT, self._sinal)
+
+        while not self.parar:
+            try:
+                self._consumir()
+            except pika.exceptions.AMQPConnectionError as e:
+                if self.parar:
+                    break
+                # Mensagens sem ack voltam para a fila quando a conexão cai
+                print(f"[worker {self.numero}] Conexão com o RabbitMQ perdida: {e}")
+                self.lote = []
+                self.metricas.somar(self.numero, 'reconexoes')
+                time.sleep(2)
+
+        self.pool.close_all()
+
+    def _consumir(self):
+        connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST, heartbeat=60))
+        channel = connection.channel()
+        declarar_filas(channel)
+        # Republicação na fila de retentativas confirmada antes do ack
+        channel.confirm_delivery()
+        channel.basic_qos(prefetch_count=PREFETCH)
+
+        print(f"[worker {self.numero}] Esperando mensagens na fila {FILA}")
+        try:
+            # inactivity_timeout devolve (None, None, None) quando a fila fica
+            # parada, o que fecha lotes incompletos e deixa checar self.parar
+            for method, properties, body in channel.consume(FILA, inactivity_timeout=LOTE_ESPERA):
+                if method is not None:
+                    self._receber(channel, method, properties, body)
+
+                if self.lote and (len(self.lote) >= LOTE_MAX
+                                  or time.monotonic() - self.inicio_lote >= LOTE_ESPERA):
+                    self._processar_lote(channel)
 
-    channel.queue_declare(queue='grafos_queue')
+                self._verificar_fila(channel)
+                if self.parar:
+                    break
+
+            # Desligamento: termina o lote atual e devolve o que sobrou do prefetch
+            if self.lote:
+                self._processar_lote(channel)
+            channel.cancel()
+        finally:
+            if connection.is_open:
+                connection.close()
+
+    def _receber(self, channel, method, properties, body):
+        try:
+            evento = json.loads(body)
+            if not isinstance(evento, dict):
+                raise ValueError('mensagem não é um objeto')
+        except ValueError as e:
+            print(f"[worker {self.numero}] Mensagem inválida descartada: {e}")
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            self.metricas.somar(self.numero, 'falhas')
+            return
+
+        if not self.lote:
+            self.inicio_lote = time.monotonic()
+        self.lote.append((method, properties, evento))
+
+    def _processar_lote(self, channel):
+        lote, self.lote = self.lote, []
+        inicio = time.monotonic()
+
+        try:
+            self._gravar([evento for _, _, evento in lote])
+            # Um ack cobre todas as entregas até a última do lote
+            channel.basic_ack(delivery_tag=lote[-1][0].delivery_tag, multiple=True)
+            processadas = len(lote)
+        except ERROS_LOTE as e:
+            # Lote falhou: refaz mensagem a mensagem para isolar a culpada
+            print(f"[worker {self.numero}] Erro ao gravar lote de {len(lote)}: {e}")
+            processadas = 0
+            for method, properties, evento in lote:
+                try:
+                    self._gravar([evento])
+                    channel.basic_ack(delivery_tag=method.delivery_tag)
+                    processadas += 1
+                except ERROS_LOTE as e:
+                    print(f"[worker {self.numero}] Erro ao processar mensagem {evento.get('tipo')}: {e}")
+                    self._falhou(channel, method, properties, evento, e)
+
+        lags = [lag for lag in (lag_mensagem(properties) for _, properties, _ in lote) if lag is not None]
+        if lags:
+            self.metricas.definir(self.numero, 'lag_segundos', lags[-1])
+            self.metricas.definir(self.numero, 'lag_maximo_lote_segundos', max(lags))
+        self.metricas.somar(self.numero, 'mensagens', processadas)
+        self.metricas.somar(self.numero, 'lotes')
+        self.metricas.somar(self.numero, 'segundos_processando', time.monotonic() - inicio)
+        self.metricas.definir(self.numero, 'ultimo_lote_timestamp', time.time())
+
+    def _falhou(self, channel, method, properties, evento, erro):
+        # Erro temporário: a mensagem espera na fila de retentativas e volta
+        # à FILA. Erro permanente, ou tentativas esgotadas: fila de falhas
+        feitas = tentativas(properties)
+        if erro_temporario(erro) and feitas < MAX_TENTATIVAS:
+            properties.headers = dict(properties.headers or {}, **{CABECALHO_TENTATIVAS: feitas + 1})
+            channel.basic_publish(exchange='', routing_key=FILA_RETENTATIVAS,
+                                  body=json.dumps(evento), properties=properties)
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            self.metricas.somar(self.numero, 'retentativas')
+        else:
+            channel.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            self.metricas.somar(self.numero, 'falhas')
+
+    def _gravar(self, eventos):
+        # Agrupa por tipo e grava tudo numa transação
+        por_tipo = {}
+        for evento in eventos:
+            por_tipo.setdefault(evento.get('tipo'), []).append(evento)
+
+        connection = self.pool.acquire()
+        cursor = connection.cursor(dictionary=True)
+        try:
+            for tipo, eventos_tipo in por_tipo.items():
+                handler = HANDLERS.get(tipo)
+                if handler is None:
+                    print(f"[worker {self.numero}] Tipo de mensagem desconhecido: {tipo}")
+                    continue
+                handler(cursor, eventos_tipo)
+            connection.commit()
+        except ERROS_LOTE:
+            connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            self.pool.release(connection)
+
+    def _verificar_fila(self, channel):
+        agora = time.monotonic()
+        if agora - self.ultima_verificacao_fila < FILA_INTERVALO:
+            return
+        self.ultima_verificacao_fila = agora
+        movidas = transferir_fila_antiga(channel.connection)
+        if movidas:
+            print(f"[worker {self.numero}] {movidas} mensagens passadas de {FILA_ANTIGA} para {FILA}")
+        fila = channel.queue_declare(queue=FILA, passive=True)
+        self.metricas.definir(self.numero, 'fila_mensagens', fila.method.message_count)
+
+
+def executar_worker(numero, metricas):
+    Worker(numero, metricas).executar()
+
+
+def reprocessar(limite=None):
+    # Devolve à FILA as mensagens da fila de falhas (depois de corrigida a
+    # causa), com as tentativas zeradas
+    connection = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
+    try:
+        declarar_filas(connection.channel())
+        movidas = mover_mensagens(connection, FILA_FALHAS, FILA, limite, sem_cabecalhos=True)
+    finally:
+        connection.close()
+    print(f"{movidas} mensagens passadas de {FILA_FALHAS} para {FILA}")
+
+
+def consumir():
+    metricas = Metricas(PROCESSOS)
+    servir_metricas(metricas, METRICAS_PORTA)
+
+    parar = False
+
+    def sinal(signum, frame):
+        nonlocal parar
+        parar = True
+
+    signal.signal(signal.SIGTERM, sinal)
+    signal.signal(signal.SIGINT, sinal)
+
+    processos = {}
+    print(f"Iniciando {PROCESSOS} workers (prefetch {PREFETCH}, lote {LOTE_MAX}). Para sair, pressione CTRL+C")
+
+    # Supervisor: recria workers que morrerem até receber o sinal de parada
+    while not parar:
+        for numero in range(PROCESSOS):
+            processo = processos.get(numero)
+            if processo is None or not processo.is_alive():
+                if processo is not None:
+                    print(f"Worker {numero} terminou (código {processo.exitcode}); reiniciando")
+                processo = multiprocessing.Process(target=executar_worker, args=(numero, metricas), daemon=False)
+                processo.start()
+                processos[numero] = processo
+        time.sleep(1)
+
+    print("Encerrando workers...")
+    for processo in processos.values():
+        if processo.is_alive():
+            processo.terminate()  # SIGTERM: o worker fecha o lote atual antes de sair
+    for processo in processos.values():
+        processo.join(30)
+        if processo.is_alive():
+            processo.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consumidor dos eventos de derivação de notas')
+    comandos = parser.add_subparsers(dest='comando')
 
-    def callback(ch, method, properties, body):
-        print("Mensagem recebida")
-        process_message(body)
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+    comandos.add_parser('consumir', help='inicia os workers (padrão)')
+    p_reprocessar = comandos.add_parser('reprocessar', help=f'devolve as mensagens de {FILA_FALHAS} para {FILA}')
+    p_reprocessar.add_argument('--limite', type=int, help='no máximo esta quantidade de mensagens')
 
-    channel.basic_consume(queue='grafos_queue', on_message_callback=callback)
+    args = parser.parse_args()
+    if args.comando == 'reprocessar':
+        reprocessar(args.limite)
+    else:
+        consumir()
 
-    print('Esperando mensagens na fila grafos_queue. Para sair, pressione CTRL+C')
-    channel.start_consuming()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,88 @@
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Contadores e medidores por worker; cada processo só escreve na sua fatia
+CONTADORES = (
+    ('mensagens', 'Mensagens processadas com sucesso'),
+    ('falhas', 'Mensagens mandadas para a fila de falhas'),
+    ('retentativas', 'Mensagens reenviadas após um erro temporário do banco'),
+    ('lotes', 'Lotes gravados no banco'),
+    ('segundos_processando', 'Tempo gasto processando lotes'),
+    ('reconexoes', 'Reconexões ao RabbitMQ'),
+)
+MEDIDORES = (
+    ('lag_segundos', 'Atraso entre a publicação e o processamento da última mensagem'),
+    ('lag_maximo_lote_segundos', 'Maior atraso do último lote'),
+    ('fila_mensagens', 'Mensagens prontas na fila na última verificação'),
+    ('ultimo_lote_timestamp', 'Instante (epoch) do último lote processado'),
+)
+CAMPOS = [nome for nome, _ in CONTADORES + MEDIDORES]
+
+
+class Metricas:
+    """Métricas compartilhadas entre os processos do consumidor.
+
+    Um Array em memória compartilhada com uma fatia por worker; o processo
+    pai lê tudo e expõe no formato texto do Prometheus.
+    """
+
+    def __init__(self, processos):
+        self.processos = processos
+        self._valores = multiprocessing.Array('d', processos * len(CAMPOS), lock=False)
+
+    def _posicao(self, worker, campo):
+        return worker * len(CAMPOS) + CAMPOS.index(campo)
+
+    def somar(self, worker, campo, valor=1):
+        self._valores[self._posicao(worker, campo)] += valor
+
+    def definir(self, worker, campo, valor):
+        self._valores[self._posicao(worker, campo)] = valor
+
+    def valor(self, worker, campo):
+        return self._valores[self._posicao(worker, campo)]
+
+    def exportar(self):
+        linhas = []
+        for tipo, campos in (('counter', CONTADORES), ('gauge', MEDIDORES)):
+            for nome, descricao in campos:
+                metrica = f'zetria_consumer_{nome}' + ('_total' if tipo == 'counter' else '')
+                linhas.append(f'# HELP {metrica} {descricao}')
+                linhas.append(f'# TYPE {metrica} {tipo}')
+                for worker in range(self.processos):
+                    linhas.append(f'{metrica}{{worker="{worker}"}} {self.valor(worker, nome):g}')
+        return '\n'.join(linhas) + '\n'
+
+
+def servir_metricas(metricas, porta):
+    # GET /metrics em uma thread do processo pai
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            corpo = metricas.exportar().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, format, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('0.0.0.0', porta), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def lag_mensagem(properties):
+    # properties.timestamp é preenchido pelo publicador (epoch em segundos)
+    if properties is None or not properties.timestamp:
+        return None
+    return max(0.0, time.time() - properties.timestamp)
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+from flask import g
+from mysql.connector import Error
+
+from db_pool import ConnectionPool, PooledConnection
+
+# Conexões MySQL da aplicação web: um pool por processo (ver db_pool.py) e
+# uma conexão por requisição, guardada em flask.g e devolvida no teardown.
+# Depois de um fork o pool herdado é descartado sem fechar as conexões,
+# que continuam sendo do processo pai.
+
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'zetria',
+    'user': 'root',
+    'password': ''
+}
+
+# Tamanho do pool por processo: com vários workers o total de conexões
+# no MySQL é workers * ZETRIA_DB_POOL_SIZE
+DB_POOL_CONFIG = {
+    'size': int(os.environ.get('ZETRIA_DB_POOL_SIZE', '5')),
+    'timeout': float(os.environ.get('ZETRIA_DB_POOL_TIMEOUT', '10')),
+    'ping_interval': float(os.environ.get('ZETRIA_DB_POOL_PING', '30')),
+}
+
+_pool = None
+
+_pool_lock = threading.Lock()
+
+def get_db_pool():
+    
+    global _pool
+    # Recria o pool após fork: conexões não podem ser compartilhadas entre processos
+    if _pool is None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = ConnectionPool(DB_CONFIG, **DB_POOL_CONFIG)
+    return _pool
+
+def get_db_connection():
+    
+    # Uma conexão por requisição, guardada em flask.g
+    if 'db_connection' in g:
+        return g.db_connection
+    
+    medicao = g.get('medicao')
+    inicio = time.perf_counter()
+    try:
+        connection = get_db_pool().acquire()
+    except Error as e:
+        print(f"Erro ao conectar ao MySQL: {e}")
+        return None
+    
+    # Espera pelo pool e cursores medidos (ver instrumentacao.py)
+    if medicao is None:
+        g.db_connection = PooledConnection(connection)
+    else:
+        medicao.aquisicao += time.perf_counter() - inicio
+        g.db_connection = PooledConnection(connection, medicao.envolver)
+    return g.db_connection
+
+def release_db_connection(exception):
+    
+    connection = g.pop('db_connection', None)
+    if connection is not None:
+        get_db_pool().release(connection.raw, discard=exception is not None)
@@ -0,0 +1,202 @@
+import itertools
+import mmap
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+# Buffer das escritas do autosave (PATCH /api/notas/<id>): salvamentos
+# seguidos da mesma nota são juntados aqui e viram uma única escrita no
+# MySQL, feita quando a nota fica JANELA segundos sem salvar, quando a
+# primeira escrita pendente passa de IDADE_MAXIMA segundos ou no fim do
+# processo (ver escrita_notas.py).
+#
+# Como as métricas (instrumentacao.py), o buffer fica em memória
+# compartilhada criada antes do fork dos workers: qualquer worker lê o
+# estado pendente de qualquer nota, e o que um worker derrubado deixou
+# pendente é gravado pelos outros. São VAGAS de tamanho fixo; uma nota que
+# não cabe numa vaga, ou que chega com o buffer cheio, é gravada direto.
+#
+# Regras de concorrência, junto com o FOR UPDATE de versao_notas_usuario
+# (que põe em série as escritas de um usuário no banco):
+#   - sem o lock do banco, um salvamento só altera uma vaga que já existe,
+#     não está reservada e está na revisão base que o cliente mandou;
+#   - com o lock do banco, guardar() cria ou substitui a vaga e reservar()
+#     vale sempre: ninguém mais pode estar no meio de uma escrita daquela
+#     nota, então uma reserva que sobrou é de uma gravação que já terminou
+#     ou de um processo que morreu;
+#   - uma vaga reservada só muda pelas mãos de quem a reservou, e só sai do
+#     buffer depois do commit de quem a gravou ou substituiu (PUT e DELETE
+#     também reservam: sem commit, concluir(gravada=False) a devolve).
+
+GUARDADO = 'guardado'
+CONFLITO = 'conflito'
+SEM_VAGA = 'sem_vaga'
+
+Pendente = namedtuple('Pendente', 'nota_id user_id title content revisao revisao_banco atualizado_em')
+
+# Cabeçalho de cada vaga, em inteiros de 64 bits; instantes em microssegundos
+(NOTA, USUARIO, REVISAO, REVISAO_BANCO, PRIMEIRA, ULTIMA, RESERVA,
+ RESERVADA_EM, TAM_TITULO, TAM_CONTEUDO) = range(10)
+CAMPOS = 10
+
+# Reserva mais velha que isso é de uma gravação que não terminou
+RESERVA_EXPIRA = 60
+
+
+def _agora():
+    return int(time.time() * 1_000_000)
+
+
+class BufferNotas:
+    """Escritas de notas ainda não gravadas, compartilhadas entre processos."""
+
+    def __init__(self, vagas=64, bytes_por_vaga=256 * 1024, janela=5.0, idade_maxima=30.0):
+        self.vagas = vagas
+        self.bytes_por_vaga = bytes_por_vaga
+        self.janela = int(janela * 1_000_000)
+        self.idade_maxima = int(idade_maxima * 1_000_000)
+        self._cabecalhos = multiprocessing.RawArray('q', max(vagas, 1) * CAMPOS)
+        # mmap anônimo compartilhado: as páginas só ocupam memória quando usadas
+        self._dados = mmap.mmap(-1, max(vagas * bytes_por_vaga, 1))
+        self._lock = multiprocessing.Lock()
+        self._reservas = itertools.count(1)
+        self._reservas_lock = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self.vagas > 0
+
+    def _campo(self, vaga, campo):
+        return self._cabecalhos[vaga * CAMPOS + campo]
+
+    def _definir(self, vaga, campos):
+        base = vaga * CAMPOS
+        for campo, valor in campos.items():
+            self._cabecalhos[base + campo] = valor
+
+    def _vaga(self, nota_id):
+        for vaga in range(self.vagas):
+            if self._cabecalhos[vaga * CAMPOS + NOTA] == nota_id:
+                return vaga
+        return -1
+
+    def _pendente(self, vaga):
+        inicio = vaga * self.bytes_por_vaga
+        tam_titulo = self._campo(vaga, TAM_TITULO)
+        fim = inicio + tam_titulo + self._campo(vaga, TAM_CONTEUDO)
+        return Pendente(
+            nota_id=self._campo(vaga, NOTA),
+            user_id=self._campo(vaga, USUARIO),
+            title=self._dados[inicio:inicio + tam_titulo].decode('utf-8'),
+            content=self._dados[inicio + tam_titulo:fim].decode('utf-8'),
+            revisao=self._campo(vaga, REVISAO),
+            revisao_banco=self._campo(vaga, REVISAO_BANCO),
+            atualizado_em=datetime.fromtimestamp(self._campo(vaga, ULTIMA) / 1_000_000),
+        )
+
+    def _reservada(self, vaga, agora):
+        return (self._campo(vaga, RESERVA) != 0
+                and agora - self._campo(vaga, RESERVADA_EM) < RESERVA_EXPIRA * 1_000_000)
+
+    def ler(self, nota_id):
+        # Estado pendente da nota, ou None se não há nada no buffer
+        if not self.ativo:
+            return None
+        with self._lock:
+            vaga = self._vaga(nota_id)
+            return self._pendente(vaga) if vaga >= 0 else None
+
+    def guardar(self, nota_id, user_id, title, content, revisao_base, revisao_banco=None):
+        # Guarda title/content como a revisão revisao_base + 1. revisao_banco
+        # é a revisão no banco, lida com o lock do banco; sem ela só atualiza
+        # uma vaga livre de reserva (ver as regras no topo)
+        if not self.ativo:
+            return SEM_VAGA
+        titulo = title.encode('utf-8')
+        conteudo = content.encode('utf-8')
+
+        with self._lock:
+            vaga = self._vaga(nota_id)
+            agora = _agora()
+            if revisao_banco is None:
+                if (vaga < 0 or self._reservada(vaga, agora)
+                        or self._campo(vaga, REVISAO) != revisao_base):
+                    return CONFLITO
+                primeira = self._campo(vaga, PRIMEIRA)
+                revisao_banco = self._campo(vaga, REVISAO_BANCO)
+            else:
+                # Vaga já gravada (reserva que não foi concluída) conta como livre
+                pendente = vaga >= 0 and self._campo(vaga, REVISAO) > revisao_banco
+                if (self._campo(vaga, REVISAO) if pendente else revisao_banco) != revisao_base:
+                    return CONFLITO
+                primeira = self._campo(vaga, PRIMEIRA) if pendente else agora
+                if vaga >= 0 and len(titulo) + len(conteudo) > self.bytes_por_vaga:
+                    # Vai direto para o banco e substitui o que estava aqui
+                    self._definir(vaga, {NOTA: 0, RESERVA: 0})
+                    return SEM_VAGA
+                if vaga < 0:
+                    vaga = self._vaga(0)
+
+            if vaga < 0 or len(titulo) + len(conteudo) > self.bytes_por_vaga:
+                return SEM_VAGA
+
+            inicio = vaga * self.bytes_por_vaga
+            self._dados[inicio:inicio + len(titulo)] = titulo
+            self._dados[inicio + len(titulo):inicio + len(titulo) + len(conteudo)] = conteudo
+            self._definir(vaga, {
+                NOTA: nota_id, USUARIO: user_id, REVISAO: revisao_base + 1,
+                REVISAO_BANCO: revisao_banco, PRIMEIRA: primeira, ULTIMA: agora,
+                RESERVA: 0, RESERVADA_EM: 0, TAM_TITULO: len(titulo), TAM_CONTEUDO: len(conteudo),
+            })
+            return GUARDADO
+
+    def vencidas(self, todas=False):
+        # Notas que já devem ser gravadas: paradas há JANELA ou pendentes há
+        # IDADE_MAXIMA (todas=True: tudo, no fim do processo)
+        if not self.ativo:
+            return []
+        agora = _agora()
+        with self._lock:
+            return [
+                self._campo(vaga, NOTA) for vaga in range(self.vagas)
+                if self._campo(vaga, NOTA) and not self._reservada(vaga, agora)
+                and (todas or agora - self._campo(vaga, ULTIMA) >= self.janela
+                     or agora - self._campo(vaga, PRIMEIRA) >= self.idade_maxima)
+            ]
+
+    def reservar(self, nota_id):
+        # Com o lock do banco: (reserva, Pendente) para gravar, ou None se a
+        # nota saiu do buffer
+        with self._reservas_lock:
+            reserva = os.getpid() << 32 | next(self._reservas)
+        with self._lock:
+            vaga = self._vaga(nota_id)
+            if vaga < 0:
+                return None
+            self._definir(vaga, {RESERVA: reserva, RESERVADA_EM: _agora()})
+            return reserva, self._pendente(vaga)
+
+    def concluir(self, nota_id, reserva, gravada=True):
+        # Fim da gravação: libera a vaga, ou só a reserva se a gravação falhou
+        with self._lock:
+            vaga = self._vaga(nota_id)
+            if vaga < 0 or self._campo(vaga, RESERVA) != reserva:
+                return
+            if gravada:
+                self._definir(vaga, {NOTA: 0, RESERVA: 0})
+            else:
+                self._definir(vaga, {RESERVA: 0})
+
+    def stats(self):
+        with self._lock:
+            ocupadas = [vaga for vaga in range(self.vagas) if self._campo(vaga, NOTA)]
+            return {
+                'vagas': self.vagas,
+                'ocupadas': len(ocupadas),
+                'bytes': sum(self._campo(vaga, TAM_TITULO) + self._campo(vaga, TAM_CONTEUDO)
+                             for vaga in ocupadas),
+                'bytes_por_vaga': self.bytes_por_vaga,
+            }
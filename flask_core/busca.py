@@ -0,0 +1,223 @@
+import html
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+TOKEN_RE = re.compile(r'\w+')
+TAG_RE = re.compile(r'#(\w+)')
+
+# Palavras muito frequentes que só atrapalham o ranking
+STOPWORDS = frozenset("""
+a o as os um uma uns umas de da do das dos em na no nas nos por para com sem
+e ou que se ao aos à às é ser foi são the of and to in is for on
+""".split())
+
+# BM25F simplificado: o título conta como se aparecesse PESO_TITULO vezes
+PESO_TITULO = 3
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalizar(texto):
+    # Minúsculas e sem acentos: "Ação" e "acao" caem no mesmo termo
+    texto = unicodedata.normalize('NFKD', texto.casefold())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    return [t for t in TOKEN_RE.findall(normalizar(texto)) if t not in STOPWORDS]
+
+
+def parse_consulta(consulta):
+    # "#tag" vira filtro; o restante são os termos ranqueados
+    tags = {normalizar(tag) for tag in TAG_RE.findall(consulta)}
+    termos = tokenizar(TAG_RE.sub(' ', consulta))
+    return list(dict.fromkeys(termos)), tags
+
+
+class IndiceBusca:
+    """Índice invertido das notas de um usuário, com ranking BM25.
+
+    Guarda só termos e frequências (não o conteúdo). É atualizado nota a
+    nota nas escritas deste processo e, para escritas de outros workers,
+    pela sincronização incremental em sincronizar().
+    """
+
+    def __init__(self):
+        self.postings = {}      # termo -> {nota_id: tf}
+        self.docs = {}          # nota_id -> (comprimento, termos, tags, updated_at)
+        self.comprimento_total = 0
+        self.total_postings = 0
+        self.versao = None      # notas_versao do usuário refletida no índice
+
+    def __len__(self):
+        return len(self.docs)
+
+    def upsert(self, nota_id, titulo, conteudo, updated_at=None):
+        self.remove(nota_id)
+
+        frequencias = Counter(tokenizar(conteudo))
+        for termo in tokenizar(titulo):
+            frequencias[termo] += PESO_TITULO
+        comprimento = sum(frequencias.values())
+
+        for termo, tf in frequencias.items():
+            self.postings.setdefault(termo, {})[nota_id] = tf
+        tags = frozenset(normalizar(tag) for tag in TAG_RE.findall(conteudo))
+
+        self.docs[nota_id] = (comprimento, tuple(frequencias), tags, updated_at)
+        self.comprimento_total += comprimento
+        self.total_postings += len(frequencias)
+
+    def remove(self, nota_id):
+        doc = self.docs.pop(nota_id, None)
+        if doc is None:
+            return
+        comprimento, termos, _, _ = doc
+        self.comprimento_total -= comprimento
+        self.total_postings -= len(termos)
+        for termo in termos:
+            lista = self.postings.get(termo)
+            if lista is not None:
+                lista.pop(nota_id, None)
+                if not lista:
+                    del self.postings[termo]
+
+    def sincronizar(self, cursor, user_id, versao):
+        # Traz só as notas escritas depois da versão que o índice reflete
+        # (notas.versao_usuario) e, se a contagem não bate, a lista de ids
+        # para achar as removidas
+        if self.versao is None:
+            cursor.execute("""
+                SELECT id, title, content, updated_at FROM notas WHERE user_id = %s
+            """, (user_id,))
+        else:
+            cursor.execute("""
+                SELECT id, title, content, updated_at FROM notas
+                WHERE user_id = %s AND versao_usuario > %s
+            """, (user_id, self.versao))
+
+        for row in cursor.fetchall():
+            self.upsert(row['id'], row['title'], row['content'] or '', row['updated_at'])
+
+        cursor.execute("""
+            SELECT COUNT(*) AS total, SUM(id) AS soma_ids FROM notas WHERE user_id = %s
+        """, (user_id,))
+        contagem = cursor.fetchone()
+        if len(self.docs) != contagem['total'] or sum(self.docs) != int(contagem['soma_ids'] or 0):
+            cursor.execute("SELECT id FROM notas WHERE user_id = %s", (user_id,))
+            existentes = {row['id'] for row in cursor.fetchall()}
+            for nota_id in [nota_id for nota_id in self.docs if nota_id not in existentes]:
+                self.remove(nota_id)
+
+        self.versao = versao
+
+    def buscar(self, termos, tags=()):
+        # Devolve [(score, nota_id)] já ordenado
+        candidatos = None
+        if tags:
+            candidatos = {nota_id for nota_id, doc in self.docs.items() if tags <= doc[2]}
+
+        if not termos:
+            if candidatos is None:
+                return []
+            # Só filtro por tag: mais recentes primeiro
+            return sorted(((0.0, nota_id) for nota_id in candidatos),
+                          key=lambda item: (self.docs[item[1]][3] or datetime.min, item[1]), reverse=True)
+
+        total_docs = len(self.docs)
+        media = self.comprimento_total / total_docs if total_docs else 0
+        scores = {}
+        for termo in termos:
+            lista = self.postings.get(termo)
+            if not lista:
+                continue
+            idf = math.log(1 + (total_docs - len(lista) + 0.5) / (len(lista) + 0.5))
+            for nota_id, tf in lista.items():
+                if candidatos is not None and nota_id not in candidatos:
+                    continue
+                comprimento = self.docs[nota_id][0]
+                norma = BM25_K1 * (1 - BM25_B + BM25_B * comprimento / media)
+                scores[nota_id] = scores.get(nota_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norma)
+
+        return sorted(((score, nota_id) for nota_id, score in scores.items()),
+                      key=lambda item: (-item[0], item[1]))
+
+
+class BuscaCache:
+    """LRU de índices de busca por usuário, limitado pelo total de postings.
+
+    Cada índice tem seu próprio lock: a sincronização com o banco de um
+    usuário não bloqueia as buscas dos outros.
+    """
+
+    def __init__(self, max_postings=5_000_000):
+        self.max_postings = max_postings
+        self._entradas = OrderedDict()  # user_id -> (indice, lock do índice)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None:
+                entrada = self._entradas[user_id] = (IndiceBusca(), threading.Lock())
+            self._entradas.move_to_end(user_id)
+            return entrada
+
+    def patch(self, user_id, versao_antes, versao_depois, aplicar):
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+        if entrada is None:
+            return
+        indice, lock = entrada
+        with lock:
+            # Índice atrasado: a próxima busca sincroniza pelo banco
+            if indice.versao != versao_antes:
+                return
+            aplicar(indice)
+            indice.versao = versao_depois
+
+    def liberar_espaco(self):
+        with self._lock:
+            total = sum(indice.total_postings for indice, _ in self._entradas.values())
+            while total > self.max_postings and len(self._entradas) > 1:
+                _, (indice, _) = self._entradas.popitem(last=False)
+                total -= indice.total_postings
+
+
+def snippet(conteudo, termos, tamanho=160):
+    # Trecho em volta da primeira ocorrência de um termo, com <mark>
+    if not conteudo:
+        return ''
+    normalizado = normalizar(conteudo)
+    # normalizar() pode mudar o comprimento (ex.: ligaduras); nesse caso
+    # destacar sobre o texto normalizado para as posições baterem
+    if len(normalizado) != len(conteudo):
+        conteudo = normalizado
+
+    padrao = re.compile(r'\b(' + '|'.join(re.escape(t) for t in termos) + r')\w*') if termos else None
+    inicio = 0
+    if padrao is not None:
+        primeira = padrao.search(normalizado)
+        if primeira:
+            inicio = max(0, primeira.start() - tamanho // 4)
+    fim = min(len(conteudo), inicio + tamanho)
+
+    partes = []
+    posicao = inicio
+    if padrao is not None:
+        for ocorrencia in padrao.finditer(normalizado, inicio, fim):
+            partes.append(html.escape(conteudo[posicao:ocorrencia.start()]))
+            partes.append('<mark>' + html.escape(conteudo[ocorrencia.start():ocorrencia.end()]) + '</mark>')
+            posicao = ocorrencia.end()
+    partes.append(html.escape(conteudo[posicao:fim]))
+
+    texto = ''.join(partes)
+    if inicio > 0:
+        texto = '...' + texto
+    if fim < len(conteudo):
+        texto += '...'
+    return texto
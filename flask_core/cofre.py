@@ -0,0 +1,576 @@
+import argparse
+import json
+import math
+import os
+import sys
+from datetime import datetime
+
+import mysql.connector
+
+from derivacao import atualizar_contagens, avancar_versao_notas, carregar_titulos_derivados, contar_palavras, extract_links, extract_tags, preview_nota, versao_notas_usuario
+from serializacao import dumps
+from srs import EASE_INICIAL
+from versoes import avancar_versao_recurso
+from wikilinks import chave_titulo
+
+# Exportação e importação do cofre de um usuário em NDJSON: um objeto JSON
+# por linha, com o campo "tipo". A exportação sai nesta ordem:
+#   {"tipo": "zetria", "versao": 1, "exportado_em": ...}   cabeçalho
+#   {"tipo": "nota", "id", "title", "content", "created_at", "updated_at", "tags"}
+#   {"tipo": "link", "source", "target"}                  depois das notas do lote
+#   {"tipo": "flashcard", "id", "nota_id", "front_content", ...}
+#   {"tipo": "task", "id", "title", ..., "ocorrencias": [...]}
+#   {"tipo": "fim", "notas", "links", "flashcards", "tasks"}
+# Os ids são os do banco de origem; na importação só servem para ligar os
+# flashcards às notas. Tags e links são derivados do conteúdo (#tag e
+# [[Título]]), como em qualquer escrita de nota, então os registros "link"
+# e as listas "tags" são informativos e a importação os ignora.
+
+FORMATO_VERSAO = 1
+
+# Linhas por consulta na exportação e por transação na importação
+LOTE_EXPORTACAO = 1000
+LOTE_IMPORTACAO = 500
+# Linhas por INSERT multi-linha (limita o tamanho da instrução)
+LOTE_INSERT = 1000
+
+# Quantos erros de registro a importação devolve no resumo
+MAX_ERROS_RELATADOS = 100
+
+# Maior valor de uma coluna INT (interval_days, repetitions, lapses)
+MAX_INT = 2 ** 31 - 1
+
+
+def _linha(registro):
+    return dumps(registro) + b'\n'
+
+
+def exportar(connection, user_id, lote=LOTE_EXPORTACAO):
+    # Gerador de linhas NDJSON (bytes). Lê em páginas por id (keyset), então a
+    # memória não cresce com o tamanho do cofre; o snapshot consistente faz
+    # todas as páginas verem o mesmo estado mesmo com escritas no meio
+    cursor = connection.cursor(dictionary=True)
+    contagem = {'notas': 0, 'links': 0, 'flashcards': 0, 'tasks': 0}
+    try:
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        yield _linha({'tipo': 'zetria', 'versao': FORMATO_VERSAO, 'exportado_em': datetime.now()})
+
+        ultimo = 0
+        while True:
+            cursor.execute("""
+                SELECT id, title, content, created_at, updated_at
+                FROM notas
+                WHERE user_id = %s AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (user_id, ultimo, lote))
+            notas = cursor.fetchall()
+            if not notas:
+                break
+            ultimo = notas[-1]['id']
+
+            ids = [nota['id'] for nota in notas]
+            placeholders = ','.join(['%s'] * len(ids))
+            cursor.execute(f"""
+                SELECT nt.nota_id, t.name
+                FROM nota_tags nt
+                JOIN tags t ON t.id = nt.tag_id
+                WHERE nt.nota_id IN ({placeholders})
+            """, ids)
+            tags_por_nota = {}
+            for row in cursor.fetchall():
+                tags_por_nota.setdefault(row['nota_id'], []).append(row['name'])
+
+            for nota in notas:
+                yield _linha({'tipo': 'nota', **nota, 'tags': tags_por_nota.get(nota['id'], [])})
+            contagem['notas'] += len(notas)
+
+            # Links saindo das notas do lote; o alvo pode estar num lote seguinte
+            cursor.execute(f"""
+                SELECT source_nota_id, target_nota_id
+                FROM links_notas
+                WHERE source_nota_id IN ({placeholders})
+                ORDER BY source_nota_id, target_nota_id
+            """, ids)
+            for row in cursor.fetchall():
+                yield _linha({'tipo': 'link', 'source': row['source_nota_id'], 'target': row['target_nota_id']})
+                contagem['links'] += 1
+
+        ultimo = 0
+        while True:
+            cursor.execute("""
+                SELECT id, nota_id, front_content, back_content, audio_path, created_at,
+                       review_at, ease, interval_days, repetitions, lapses, last_reviewed_at
+                FROM flashcards
+                WHERE user_id = %s AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (user_id, ultimo, lote))
+            flashcards = cursor.fetchall()
+            if not flashcards:
+                break
+            ultimo = flashcards[-1]['id']
+
+            for flashcard in flashcards:
+                yield _linha({'tipo': 'flashcard', **flashcard})
+            contagem['flashcards'] += len(flashcards)
+
+        ultimo = 0
+        while True:
+            cursor.execute("""
+                SELECT id, title, description, due_date, recurring, recurrence_rule, completed, created_at
+                FROM tasks
+                WHERE user_id = %s AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (user_id, ultimo, lote))
+            tasks = cursor.fetchall()
+            if not tasks:
+                break
+            ultimo = tasks[-1]['id']
+
+            # Conclusões por ocorrência das tarefas recorrentes do lote
+            recorrentes = [task['id'] for task in tasks if task['recurring']]
+            ocorrencias_por_task = {}
+            if recorrentes:
+                placeholders = ','.join(['%s'] * len(recorrentes))
+                cursor.execute(f"""
+                    SELECT task_id, ocorrencia, completed
+                    FROM task_ocorrencias
+                    WHERE task_id IN ({placeholders})
+                    ORDER BY task_id, ocorrencia
+                """, recorrentes)
+                for row in cursor.fetchall():
+                    ocorrencias_por_task.setdefault(row['task_id'], []).append(
+                        {'ocorrencia': row['ocorrencia'], 'completed': bool(row['completed'])}
+                    )
+
+            for task in tasks:
+                registro = {'tipo': 'task', **task, 'recurring': bool(task['recurring']),
+                            'completed': bool(task['completed'])}
+                if task['recurring']:
+                    registro['ocorrencias'] = ocorrencias_por_task.get(task['id'], [])
+                yield _linha(registro)
+            contagem['tasks'] += len(tasks)
+
+        # Sem o registro final o arquivo foi cortado no meio
+        yield _linha({'tipo': 'fim', **contagem})
+    finally:
+        connection.rollback()
+        cursor.close()
+
+
+def _parse_data(valor, obrigatoria=False):
+    if valor is None or valor == '':
+        if obrigatoria:
+            raise ValueError('data obrigatória')
+        return None
+    if not isinstance(valor, str):
+        raise ValueError(f'data inválida: {valor!r}')
+    data = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    # As colunas guardam hora local sem fuso, como as rotas da API
+    return data.replace(tzinfo=None)
+
+
+def _parse_texto(registro, campo, obrigatorio=False, maximo=None):
+    valor = registro.get(campo)
+    if valor is None:
+        valor = ''
+    if not isinstance(valor, str):
+        raise ValueError(f'{campo} deve ser texto')
+    valor = valor.strip()
+    if obrigatorio and not valor:
+        raise ValueError(f'{campo} é obrigatório')
+    if maximo is not None and len(valor) > maximo:
+        raise ValueError(f'{campo} maior que {maximo} caracteres')
+    return valor
+
+
+def _parse_numero(registro, campo, padrao, inteiro=True):
+    # Campos numéricos dos flashcards: finitos, não negativos e dentro do que
+    # uma coluna INT guarda. Um valor fora disso é recusado aqui (o registro
+    # é ignorado) em vez de chegar ao MySQL e derrubar o lote inteiro
+    valor = registro.get(campo)
+    if valor is None or valor == '':
+        return padrao
+    if isinstance(valor, bool) or not isinstance(valor, (int, float, str)):
+        raise ValueError(f'{campo} inválido: {valor!r}')
+    numero = float(valor)
+    if not math.isfinite(numero) or numero < 0:
+        raise ValueError(f'{campo} inválido: {valor!r}')
+    if not inteiro:
+        return numero
+    if numero != int(numero) or numero > MAX_INT:
+        raise ValueError(f'{campo} inválido: {valor!r}')
+    return int(numero)
+
+
+def _inserir_lotes(cursor, instrucao, linhas, tamanho=LOTE_INSERT):
+    # instrucao tem {valores}; uma instrução multi-linha por fatia
+    for inicio in range(0, len(linhas), tamanho):
+        fatia = linhas[inicio:inicio + tamanho]
+        marcadores = '(' + ', '.join(['%s'] * len(fatia[0])) + ')'
+        cursor.execute(instrucao.format(valores=','.join([marcadores] * len(fatia))),
+                       [valor for linha in fatia for valor in linha])
+
+
+class Importacao:
+    """Importa registros NDJSON para o cofre de um usuário.
+
+    As notas são gravadas em lotes, cada lote numa transação com INSERTs
+    multi-linha e as tags resolvidas de uma vez; os links só são resolvidos
+    em concluir(), quando todos os títulos já existem (um link pode apontar
+    para uma nota que vem mais adiante no arquivo). As notas entram já
+    derivadas, sem passar pela fila de derivação.
+    """
+
+    def __init__(self, connection, user_id, lote=LOTE_IMPORTACAO):
+        self.connection = connection
+        self.user_id = user_id
+        self.lote = lote
+        self.ids_notas = {}        # id no arquivo -> id novo
+        self.notas_importadas = []
+        self.chaves_importadas = set()
+        self.notas = []
+        self.flashcards = []
+        self.tasks = []
+        self.contagem = {'notas': 0, 'links': 0, 'flashcards': 0, 'tasks': 0, 'ignorados': 0}
+        self.erros = []
+
+    def adicionar_linha(self, numero, linha):
+        if isinstance(linha, bytes):
+            linha = linha.decode('utf-8', errors='replace')
+        if not linha.strip():
+            return
+        try:
+            registro = json.loads(linha)
+            if not isinstance(registro, dict):
+                raise ValueError('linha não é um objeto')
+            self.adicionar(registro)
+        except ValueError as e:
+            self._erro(numero, e)
+
+    def _erro(self, numero, erro):
+        self.contagem['ignorados'] += 1
+        if len(self.erros) < MAX_ERROS_RELATADOS:
+            self.erros.append({'linha': numero, 'erro': str(erro)})
+
+    def adicionar(self, registro):
+        # ValueError para registros inválidos
+        tipo = registro.get('tipo')
+        if tipo == 'nota':
+            criada = _parse_data(registro.get('created_at')) or datetime.now()
+            self.notas.append((
+                registro.get('id'),
+                _parse_texto(registro, 'title', obrigatorio=True, maximo=255),
+                _parse_texto(registro, 'content'),
+                criada,
+                _parse_data(registro.get('updated_at')) or criada,
+            ))
+            if len(self.notas) >= self.lote:
+                self._gravar_notas()
+        elif tipo == 'flashcard':
+            self.flashcards.append(registro)
+            if len(self.flashcards) >= self.lote:
+                self._gravar_flashcards()
+        elif tipo == 'task':
+            self.tasks.append(registro)
+            if len(self.tasks) >= self.lote:
+                self._gravar_tasks()
+        elif tipo in ('zetria', 'link', 'fim'):
+            pass
+        else:
+            raise ValueError(f'tipo de registro desconhecido: {tipo!r}')
+
+    def _transacao(self, gravar, versionar=False):
+        # versionar: escrita nas notas, em série com as outras escritas do
+        # usuário (FOR UPDATE) e avançando notas_versao, o que invalida os caches
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            versao = None
+            if versionar:
+                versao = versao_notas_usuario(cursor, self.user_id, para_escrita=True) + 1
+            resultado = gravar(cursor, versao)
+            if versionar:
+                avancar_versao_notas(cursor, self.user_id, versao)
+            self.connection.commit()
+            return resultado
+        except Exception:
+            self.connection.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def _gravar_notas(self):
+        notas, self.notas = self.notas, []
+        if not notas:
+            return
+        novos_ids = self._transacao(lambda cursor, versao: self._inserir_notas(cursor, versao, notas),
+                                    versionar=True)
+
+        # Só depois do commit os ids valem para os flashcards
+        for nota_id, (id_origem, title, _, _, _) in zip(novos_ids, notas):
+            if id_origem is not None:
+                self.ids_notas[id_origem] = nota_id
+            self.chaves_importadas.add(chave_titulo(title))
+        self.notas_importadas += novos_ids
+        self.contagem['notas'] += len(notas)
+
+    def _inserir_notas(self, cursor, versao, notas):
+        # Derivação já aplicada na importação: derivado_versao = revisao e
+        # titulo_derivado = title. Um INSERT multi-linha simples recebe ids
+        # consecutivos do auto-increment, a partir do lastrowid
+        novos_ids = []
+        for inicio in range(0, len(notas), LOTE_INSERT):
+            fatia = notas[inicio:inicio + LOTE_INSERT]
+            cursor.execute(f"""
+                INSERT INTO notas (user_id, title, content, preview, word_count, created_at, updated_at,
+                                   versao_usuario, revisao, derivado_versao, titulo_derivado)
+                VALUES {','.join(['(%s, %s, %s, %s, %s, %s, %s, %s, 1, 1, %s)'] * len(fatia))}
+            """, [valor for _, title, content, criada, atualizada in fatia
+                  for valor in (self.user_id, title, content, preview_nota(content), contar_palavras(content),
+                                criada, atualizada, versao, title)])
+            novos_ids += range(cursor.lastrowid, cursor.lastrowid + len(fatia))
+
+        # Tags: cria as que faltam e liga pelo nome no próprio banco, para a
+        # collation decidir quais nomes são a mesma tag
+        pares = [(nota_id, tag) for nota_id, nota in zip(novos_ids, notas) for tag in extract_tags(nota[2])]
+        if pares:
+            nomes = sorted({tag for _, tag in pares})
+            _inserir_lotes(cursor, "INSERT IGNORE INTO tags (name) VALUES {valores}", [(nome,) for nome in nomes])
+            for inicio in range(0, len(pares), LOTE_INSERT):
+                fatia = pares[inicio:inicio + LOTE_INSERT]
+                selects = ' UNION ALL '.join(['SELECT %s AS nota_id, %s AS name'] * len(fatia))
+                cursor.execute(f"""
+                    INSERT IGNORE INTO nota_tags (nota_id, tag_id)
+                    SELECT v.nota_id, t.id
+                    FROM ({selects}) v
+                    JOIN tags t ON t.name = v.name
+                """, [valor for par in fatia for valor in par])
+
+        return novos_ids
+
+    def _gravar_flashcards(self):
+        # Os flashcards apontam para notas do arquivo: grava as notas pendentes antes
+        self._gravar_notas()
+        registros, self.flashcards = self.flashcards, []
+        linhas = []
+        for registro in registros:
+            try:
+                nota_id = self.ids_notas.get(registro.get('nota_id'))
+                if nota_id is None:
+                    raise ValueError(f"nota {registro.get('nota_id')!r} não está no arquivo")
+                criada = _parse_data(registro.get('created_at')) or datetime.now()
+                linhas.append((
+                    nota_id, self.user_id,
+                    _parse_texto(registro, 'front_content', obrigatorio=True),
+                    _parse_texto(registro, 'back_content', obrigatorio=True),
+                    _parse_texto(registro, 'audio_path', maximo=255) or None,
+                    criada,
+                    _parse_data(registro.get('review_at')) or criada,
+                    _parse_numero(registro, 'ease', EASE_INICIAL, inteiro=False),
+                    _parse_numero(registro, 'interval_days', 0),
+                    _parse_numero(registro, 'repetitions', 0),
+                    _parse_numero(registro, 'lapses', 0),
+                    _parse_data(registro.get('last_reviewed_at')),
+                ))
+            except (TypeError, ValueError) as e:
+                self._erro(None, f"flashcard {registro.get('id')!r}: {e}")
+
+        if linhas:
+            self._transacao(lambda cursor, _: self._inserir_flashcards(cursor, linhas))
+            self.contagem['flashcards'] += len(linhas)
+
+    def _inserir_flashcards(self, cursor, linhas):
+        _inserir_lotes(cursor, """
+            INSERT INTO flashcards (nota_id, user_id, front_content, back_content, audio_path, created_at,
+                                    review_at, ease, interval_days, repetitions, lapses, last_reviewed_at)
+            VALUES {valores}
+        """, linhas)
+        avancar_versao_recurso(cursor, self.user_id, 'flashcards')
+
+    def _gravar_tasks(self):
+        registros, self.tasks = self.tasks, []
+        validas = []
+        for registro in registros:
+            try:
+                due_date = _parse_data(registro.get('due_date'))
+                validas.append((registro, (
+                    self.user_id,
+                    _parse_texto(registro, 'title', obrigatorio=True, maximo=255),
+                    _parse_texto(registro, 'description'),
+                    due_date,
+                    # Recorrente sem data não tem início de série
+                    bool(registro.get('recurring')) and due_date is not None,
+                    _parse_texto(registro, 'recurrence_rule', maximo=100),
+                    bool(registro.get('completed')),
+                    _parse_data(registro.get('created_at')) or datetime.now(),
+                )))
+            except ValueError as e:
+                self._erro(None, f"task {registro.get('id')!r}: {e}")
+
+        if validas:
+            self._transacao(lambda cursor, _: self._inserir_tasks(cursor, validas))
+            self.contagem['tasks'] += len(validas)
+
+    def _inserir_tasks(self, cursor, validas):
+        ocorrencias = []
+        for inicio in range(0, len(validas), LOTE_INSERT):
+            fatia = validas[inicio:inicio + LOTE_INSERT]
+            cursor.execute(f"""
+                INSERT INTO tasks (user_id, title, description, due_date, recurring, recurrence_rule,
+                                   completed, created_at)
+                VALUES {','.join(['(%s, %s, %s, %s, %s, %s, %s, %s)'] * len(fatia))}
+            """, [valor for _, linha in fatia for valor in linha])
+
+            for task_id, (registro, linha) in zip(range(cursor.lastrowid, cursor.lastrowid + len(fatia)), fatia):
+                if not linha[4]:
+                    continue
+                for ocorrencia in registro.get('ocorrencias') or []:
+                    try:
+                        ocorrencias.append((task_id, _parse_data(ocorrencia['ocorrencia'], obrigatoria=True),
+                                            bool(ocorrencia.get('completed', True))))
+                    except (KeyError, TypeError, ValueError) as e:
+                        self._erro(None, f"ocorrência da task {registro.get('id')!r}: {e}")
+
+        if ocorrencias:
+            _inserir_lotes(cursor, "INSERT IGNORE INTO task_ocorrencias (task_id, ocorrencia, completed) VALUES {valores}",
+                           ocorrencias)
+        avancar_versao_recurso(cursor, self.user_id, 'tasks')
+
+    def concluir(self):
+        # Grava o que sobrou nos buffers e resolve os links das notas importadas
+        self._gravar_flashcards()
+        self._gravar_tasks()
+        self._resolver_links()
+        return {'importados': self.contagem, 'erros': self.erros}
+
+    def _resolver_links(self):
+        if not self.notas_importadas:
+            return
+
+        cursor = self.connection.cursor(dictionary=True)
+        try:
+            indice = carregar_titulos_derivados(cursor, self.user_id)
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+        # Links das notas importadas; notas novas, então só há o que inserir
+        for inicio in range(0, len(self.notas_importadas), self.lote):
+            ids = self.notas_importadas[inicio:inicio + self.lote]
+            self._transacao(lambda cursor, versao: self._inserir_links(cursor, indice, ids), versionar=True)
+
+        # Links pendentes de notas que já existiam e agora têm alvo
+        chaves = sorted(self.chaves_importadas)
+        for inicio in range(0, len(chaves), self.lote):
+            fatia = chaves[inicio:inicio + self.lote]
+            self._transacao(lambda cursor, versao: self._resolver_pendentes(cursor, indice, fatia), versionar=True)
+
+    def _inserir_links(self, cursor, indice, ids):
+        placeholders = ','.join(['%s'] * len(ids))
+        cursor.execute(f"SELECT id, content FROM notas WHERE id IN ({placeholders})", ids)
+        links, pendentes = set(), set()
+        for nota in cursor.fetchall():
+            for texto in extract_links(nota['content'] or ''):
+                chave = chave_titulo(texto)
+                if not chave:
+                    continue
+                alvo = indice.resolve(chave)
+                if alvo is None:
+                    pendentes.add((nota['id'], chave))
+                elif alvo != nota['id']:
+                    links.add((nota['id'], alvo))
+
+        if links:
+            _inserir_lotes(cursor, "INSERT IGNORE INTO links_notas (source_nota_id, target_nota_id) VALUES {valores}",
+                           sorted(links))
+        if pendentes:
+            _inserir_lotes(cursor, "INSERT IGNORE INTO links_pendentes (source_nota_id, target_key) VALUES {valores}",
+                           sorted(pendentes))
+        self.contagem['links'] += len(links)
+
+        # tag_count e link_count das notas, com as tags gravadas em _inserir_notas
+        atualizar_contagens(cursor, ids)
+
+    def _resolver_pendentes(self, cursor, indice, chaves):
+        placeholders = ','.join(['%s'] * len(chaves))
+        cursor.execute(f"""
+            SELECT lp.source_nota_id, lp.target_key
+            FROM links_pendentes lp
+            JOIN notas n ON n.id = lp.source_nota_id
+            WHERE n.user_id = %s AND lp.target_key IN ({placeholders})
+        """, [self.user_id] + chaves)
+
+        resolvidos = []
+        for row in cursor.fetchall():
+            alvo = indice.resolve(row['target_key'])
+            if alvo is not None:
+                resolvidos.append((row['source_nota_id'], row['target_key'], alvo))
+        if not resolvidos:
+            return
+
+        for inicio in range(0, len(resolvidos), LOTE_INSERT):
+            fatia = resolvidos[inicio:inicio + LOTE_INSERT]
+            condicoes = ' OR '.join(['(source_nota_id = %s AND target_key = %s)'] * len(fatia))
+            cursor.execute(f"DELETE FROM links_pendentes WHERE {condicoes}",
+                           [valor for origem, chave, _ in fatia for valor in (origem, chave)])
+
+        links = sorted({(origem, alvo) for origem, _, alvo in resolvidos if origem != alvo})
+        if links:
+            _inserir_lotes(cursor, "INSERT IGNORE INTO links_notas (source_nota_id, target_nota_id) VALUES {valores}",
+                           links)
+        self.contagem['links'] += len(links)
+
+        # Recontagem das origens: pendente que resolve para a própria nota
+        # sai sem virar link
+        atualizar_contagens(cursor, sorted({origem for origem, _, _ in resolvidos}))
+
+
+def importar(connection, user_id, linhas, lote=LOTE_IMPORTACAO):
+    # linhas: qualquer iterável de linhas NDJSON (arquivo, stream da requisição)
+    importacao = Importacao(connection, user_id, lote)
+    for numero, linha in enumerate(linhas, 1):
+        importacao.adicionar_linha(numero, linha)
+    return importacao.concluir()
+
+
+def main():
+    # python cofre.py exportar USER_ID [-o arquivo]
+    # python cofre.py importar USER_ID arquivo.ndjson
+    parser = argparse.ArgumentParser(description='Exporta ou importa o cofre de um usuário em NDJSON')
+    parser.add_argument('acao', choices=['exportar', 'importar'])
+    parser.add_argument('user_id', type=int)
+    parser.add_argument('arquivo', nargs='?', help='arquivo de entrada (importar) ou saída (exportar)')
+    parser.add_argument('-o', '--saida', help='arquivo de saída da exportação (padrão: stdout)')
+    parser.add_argument('--lote', type=int, default=LOTE_IMPORTACAO, help='notas por transação na importação')
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(
+        host=os.environ.get('ZETRIA_DB_HOST', 'localhost'),
+        database='zetria',
+        user='root',
+        password=''
+    )
+    try:
+        if args.acao == 'exportar':
+            destino = args.saida or args.arquivo
+            saida = open(destino, 'wb') if destino else sys.stdout.buffer
+            try:
+                for linha in exportar(connection, args.user_id):
+                    saida.write(linha)
+            finally:
+                if destino:
+                    saida.close()
+        else:
+            if not args.arquivo:
+                parser.error('informe o arquivo a importar')
+            with open(args.arquivo, encoding='utf-8') as entrada:
+                resumo = importar(connection, args.user_id, entrada, args.lote)
+            print(json.dumps(resumo, ensure_ascii=False, indent=2))
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+
+class ConnectionPool:
+    """Pool limitado de conexões MySQL, um por processo (worker)."""
+
+    def __init__(self, config, size=5, timeout=10.0, ping_interval=30.0):
+        self.config = dict(config)
+        self.size = size
+        self.timeout = timeout
+        self.ping_interval = ping_interval
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conexao, instante do último uso)
+        self._created = 0
+        self._in_use = 0
+
+        # Estatísticas
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._discarded = 0
+
+    def acquire(self):
+        inicio = time.monotonic()
+        esperou = False
+        conexao = None
+        ultimo_uso = None
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO: reaproveita a conexão mais "quente"
+                    conexao, ultimo_uso = self._idle.pop()
+                    break
+                if self._created < self.size:
+                    self._created += 1
+                    break
+
+                esperou = True
+                restante = self.timeout - (time.monotonic() - inicio)
+                if restante <= 0:
+                    self._waits += 1
+                    self._timeouts += 1
+                    self._wait_time += time.monotonic() - inicio
+                    raise PoolError(f"Pool esgotado ({self.size} conexões em uso)")
+                self._cond.wait(restante)
+
+            self._in_use += 1
+            self._checkouts += 1
+            if esperou:
+                self._waits += 1
+                self._wait_time += time.monotonic() - inicio
+
+        try:
+            if conexao is None:
+                conexao = mysql.connector.connect(**self.config)
+            else:
+                self._verificar(conexao, ultimo_uso)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+        return conexao
+
+    def _verificar(self, conexao, ultimo_uso):
+        # Health-check só para conexões paradas há algum tempo; as demais
+        # acabaram de ser usadas e não precisam de um round trip extra.
+        if time.monotonic() - ultimo_uso < self.ping_interval:
+            return
+        try:
+            conexao.ping(reconnect=False)
+        except Error:
+            try:
+                conexao.reconnect(attempts=1)
+            except Error:
+                # Descartada: acquire só ajusta os contadores
+                try:
+                    conexao.close()
+                except Error:
+                    pass
+                with self._cond:
+                    self._discarded += 1
+                raise
+            with self._cond:
+                self._reconnects += 1
+
+    def release(self, conexao, discard=False):
+        if not discard:
+            try:
+                # Reset: não deixa transação (nem snapshot) aberta no pool
+                if conexao.in_transaction:
+                    conexao.rollback()
+            except Error:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._created -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conexao, time.monotonic()))
+            self._cond.notify()
+
+        if discard:
+            try:
+                conexao.close()
+            except Error:
+                pass
+
+    def close_all(self):
+        with self._cond:
+            ociosas = list(self._idle)
+            self._idle.clear()
+            self._created -= len(ociosas)
+        for conexao, _ in ociosas:
+            try:
+                conexao.close()
+            except Error:
+                pass
+
+    def stats(self):
+        with self._cond:
+            return {
+                'pid': self.pid,
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 3),
+                'timeouts': self._timeouts,
+                'reconnects': self._reconnects,
+                'discarded': self._discarded,
+            }
+
+
+class PooledConnection:
+    """Conexão emprestada do pool para uma requisição.
+
+    close() não fecha nada: a conexão volta ao pool no teardown da
+    requisição, então os handlers podem continuar chamando close().
+    envolver_cursor, se dado, recebe cada cursor aberto e devolve o que
+    os handlers vão usar (ex.: um cursor medido).
+    """
+
+    def __init__(self, conexao, envolver_cursor=None):
+        self.raw = conexao
+        self.envolver_cursor = envolver_cursor
+
+    def __getattr__(self, nome):
+        return getattr(self.raw, nome)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self.raw.cursor(*args, **kwargs)
+        if self.envolver_cursor is not None:
+            return self.envolver_cursor(cursor)
+        return cursor
+
+    def close(self):
+        pass
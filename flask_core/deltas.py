@@ -0,0 +1,196 @@
+from derivacao import LINK_RE, TAG_RE
+from wikilinks import chave_titulo
+
+# Salvamento de notas por diferença (PATCH /api/notas/<id>): o editor manda
+# só os trechos alterados em relação à revisão que ele tem, em vez do
+# conteúdo inteiro. Cada delta é {"inicio", "fim", "texto"}: troca
+# conteudo[inicio:fim] da revisão base por texto, com posições em
+# caracteres Unicode (como os índices de str do Python e o CHAR_LENGTH do
+# MySQL; o editor converte das unidades UTF-16 do JavaScript).
+#
+# Para a derivação, as #tags e [[links]] só são procurados de novo na
+# janela alterada: o trecho que contém os deltas, alargado até fronteiras
+# onde nenhuma ocorrência pode começar de um lado e terminar do outro.
+# Fora da janela o texto é o mesmo antes e depois, então as ocorrências
+# lá também são; o texto de fora só é percorrido para saber se uma tag ou
+# link que sumiu (ou apareceu) na janela continua existindo no resto.
+
+# Deltas por requisição; o editor manda um (prefixo e sufixo comuns)
+MAX_DELTAS = 100
+
+
+def normalizar_deltas(deltas, tamanho):
+    # Valida os deltas contra o tamanho do conteúdo base e devolve
+    # [(inicio, fim, texto)] em ordem. ValueError se inválidos
+    if not isinstance(deltas, list) or not deltas:
+        raise ValueError('deltas deve ser uma lista não vazia')
+    if len(deltas) > MAX_DELTAS:
+        raise ValueError(f'no máximo {MAX_DELTAS} deltas por requisição')
+
+    normalizados = []
+    for delta in deltas:
+        if not isinstance(delta, dict):
+            raise ValueError('delta inválido')
+        inicio, fim, texto = delta.get('inicio'), delta.get('fim'), delta.get('texto', '')
+        if (type(inicio) is not int or type(fim) is not int or not isinstance(texto, str)
+                or not 0 <= inicio <= fim <= tamanho):
+            raise ValueError('delta inválido')
+        normalizados.append((inicio, fim, texto))
+
+    normalizados.sort(key=lambda delta: (delta[0], delta[1]))
+    for anterior, atual in zip(normalizados, normalizados[1:]):
+        if atual[0] < anterior[1] or atual[0] == anterior[0] == anterior[1] == atual[1]:
+            raise ValueError('deltas sobrepostos')
+    return normalizados
+
+
+def aplicar_deltas(texto, deltas):
+    partes = []
+    posicao = 0
+    for inicio, fim, novo in deltas:
+        partes.append(texto[posicao:inicio])
+        partes.append(novo)
+        posicao = fim
+    partes.append(texto[posicao:])
+    return ''.join(partes)
+
+
+def _prefixo_comum(a, b, limite):
+    # Busca binária comparando fatias (memcmp), sem laço por caractere
+    inicio, fim = 0, limite
+    while inicio < fim:
+        meio = (inicio + fim + 1) // 2
+        if a[inicio:meio] == b[inicio:meio]:
+            inicio = meio
+        else:
+            fim = meio - 1
+    return inicio
+
+
+def delta_unico(antigo, novo):
+    # Um delta só de antigo para novo: o que sobra sem o prefixo e o sufixo
+    # comuns (é o que o editor manda; aqui serve para gravar no banco uma
+    # série de salvamentos juntados no buffer)
+    prefixo = _prefixo_comum(antigo, novo, min(len(antigo), len(novo)))
+    limite = min(len(antigo), len(novo)) - prefixo
+    sufixo = _prefixo_comum(antigo[::-1], novo[::-1], limite) if limite else 0
+    return prefixo, len(antigo) - sufixo, novo[prefixo:len(novo) - sufixo]
+
+
+def sql_deltas(coluna, deltas):
+    # Expressão SQL que aplica os deltas à coluna sem reenviar o texto que
+    # não mudou: CONCAT dos trechos mantidos (SUBSTRING, base 1) e dos novos
+    original = f'COALESCE({coluna}, \'\')'
+    partes = []
+    params = []
+    posicao = 0
+    for inicio, fim, novo in deltas:
+        if inicio > posicao:
+            partes.append(f'SUBSTRING({original}, %s, %s)')
+            params += [posicao + 1, inicio - posicao]
+        partes.append('%s')
+        params.append(novo)
+        posicao = fim
+    partes.append(f'SUBSTRING({original}, %s)')
+    params.append(posicao + 1)
+    return f"CONCAT({', '.join(partes)})", params
+
+
+def _inicio_janela(texto, posicao):
+    # Início de linha antes de posicao fora de qualquer [[link]]: nenhuma
+    # tag atravessa quebra de linha, mas um link pode
+    inicio = texto.rfind('\n', 0, posicao) + 1
+    while True:
+        abertura = texto.rfind('[[', 0, inicio)
+        if abertura <= texto.rfind(']', 0, inicio):
+            return inicio
+        inicio = texto.rfind('\n', 0, abertura) + 1
+
+
+def _fim_janela(texto, inicio, posicao):
+    # Fim de linha depois de posicao sem [[ aberto entre inicio e ele
+    fim = texto.find('\n', posicao)
+    if fim < 0:
+        return len(texto)
+    while texto.rfind('[[', inicio, fim) > texto.rfind(']', inicio, fim):
+        fechamento = texto.find(']', fim)
+        fim = texto.find('\n', fechamento + 1) if fechamento >= 0 else -1
+        if fim < 0:
+            return len(texto)
+    return fim
+
+
+def janela_alterada(antigo, novo, deltas):
+    # (inicio, fim no antigo, fim no novo) do trecho a reexaminar. Os
+    # deltas viram uma janela só: o texto entre eles não mudou e é
+    # reexaminado junto, o que mantém o antes da janela idêntico nos dois
+    inicio = _inicio_janela(antigo, deltas[0][0])
+    deslocamento = len(novo) - len(antigo)
+
+    fim = _fim_janela(antigo, inicio, deltas[-1][1])
+    while True:
+        # A fronteira precisa valer no texto antigo e no novo
+        fim_novo = _fim_janela(novo, inicio, fim + deslocamento) - deslocamento
+        if fim_novo == fim:
+            return inicio, fim, fim + deslocamento
+        fim = _fim_janela(antigo, inicio, fim_novo)
+
+
+def _ocorrencias(regex, chave, texto, inicio, fim):
+    ocorrencias = {}
+    for valor in regex.findall(texto, inicio, fim):
+        k = chave(valor)
+        if k:
+            ocorrencias.setdefault(k, valor)
+    return ocorrencias
+
+
+def _presentes_fora(regex, chave, texto, trechos, procuradas):
+    # Quais das chaves procuradas aparecem nos trechos (inicio, fim) fora da
+    # janela. Só roda quando uma tag ou link entra ou sai na janela
+    encontradas = set()
+    if not procuradas:
+        return encontradas
+    for inicio, fim in trechos:
+        valores = set(regex.findall(texto, inicio, fim))
+        encontradas |= procuradas & {chave(valor) for valor in valores}
+    return encontradas
+
+
+def _diferenca(regex, chave, antigo, novo, janela):
+    inicio, fim_antigo, fim_novo = janela
+    antes = _ocorrencias(regex, chave, antigo, inicio, fim_antigo)
+    depois = _ocorrencias(regex, chave, novo, inicio, fim_novo)
+
+    # Só as chaves que aparecem de um lado da janela e não do outro podem
+    # mudar; mudam se também não aparecem fora dela
+    candidatas = antes.keys() ^ depois.keys()
+    fora = _presentes_fora(regex, chave, antigo, ((0, inicio), (fim_antigo, len(antigo))), candidatas)
+
+    adicionadas = {k: depois[k] for k in candidatas if k in depois and k not in fora}
+    removidas = {k: antes[k] for k in candidatas if k in antes and k not in fora}
+    return adicionadas, removidas
+
+
+def diferenca_palavras(antigo, novo, deltas):
+    # Quantas palavras (separadas por espaço, como contar_palavras) o
+    # conteúdo ganha com os deltas. Só o trecho alterado, alargado até um
+    # espaço de cada lado, é contado nos dois textos
+    inicio, fim = deltas[0][0], deltas[-1][1]
+    while inicio > 0 and not antigo[inicio - 1].isspace():
+        inicio -= 1
+    while fim < len(antigo) and not antigo[fim].isspace():
+        fim += 1
+    fim_novo = fim + len(novo) - len(antigo)
+    return len(novo[inicio:fim_novo].split()) - len(antigo[inicio:fim].split())
+
+
+def diferenca_derivada(antigo, novo, deltas):
+    # Tags e links que entram e saem do conteúdo com os deltas:
+    # (tags_adicionadas, tags_removidas, links_adicionados, links_removidos).
+    # Tags por nome casefold -> nome como escrito (a tabela tags não
+    # diferencia maiúsculas); links por chave de título -> texto
+    janela = janela_alterada(antigo, novo, deltas)
+    tags = _diferenca(TAG_RE, str.casefold, antigo, novo, janela)
+    links = _diferenca(LINK_RE, chave_titulo, antigo, novo, janela)
+    return tags + links
@@ -0,0 +1,202 @@
+import re
+
+from wikilinks import TituloIndex, sync_escrita_nota
+
+# Estado derivado de uma nota: as tags (#tag) e os [[links]] extraídos do
+# conteúdo. Salvar uma nota grava só a linha em notas (incrementando
+# notas.revisao); a derivação roda depois, no consumer_grafos, e marca
+# notas.derivado_versao com a revisão aplicada.
+
+TAG_RE = re.compile(r'#(\w+)')
+LINK_RE = re.compile(r'\[\[([^\]]+)\]\]')
+
+
+def extract_tags(content):
+    tags = TAG_RE.findall(content)
+    return list(set(tags))  # Remove duplicatas
+
+
+def extract_links(content):
+    links = LINK_RE.findall(content)
+    return list(set(links))  # Remove duplicatas
+
+
+# Resumo da nota guardado na própria linha: as listas e o grafo leem só
+# ele, nunca o content. preview e word_count são gravados junto com o
+# conteúdo; tag_count e link_count contam o que a derivação aplicou
+PREVIEW_CARACTERES = 100
+
+# Atribuições do UPDATE de notas que recontam tags e links já gravados
+SQL_CONTAGENS = """tag_count = (SELECT COUNT(*) FROM nota_tags WHERE nota_id = notas.id),
+    link_count = (SELECT COUNT(*) FROM links_notas WHERE source_nota_id = notas.id)
+               + (SELECT COUNT(*) FROM links_pendentes WHERE source_nota_id = notas.id)"""
+
+
+def preview_nota(content):
+    if len(content) > PREVIEW_CARACTERES:
+        return content[:PREVIEW_CARACTERES] + '...'
+    return content
+
+
+def contar_palavras(content):
+    return len(content.split())
+
+
+def atualizar_contagens(cursor, nota_ids):
+    # Para quem grava tags e links fora de derivar_notas (importação)
+    if not nota_ids:
+        return
+    placeholders = ','.join(['%s'] * len(nota_ids))
+    cursor.execute(f"""
+        UPDATE notas SET {SQL_CONTAGENS}, updated_at = updated_at
+        WHERE id IN ({placeholders})
+    """, list(nota_ids))
+
+
+def versao_notas_usuario(cursor, user_id, para_escrita=False):
+    # Contador por usuário incrementado em toda escrita de nota (e as tags e
+    # links só mudam junto com as notas). Nas escritas é lido com FOR UPDATE:
+    # as escritas de um mesmo usuário ficam em série, então a versão lida é
+    # exatamente o estado que a escrita modifica
+    cursor.execute(
+        "SELECT notas_versao FROM usuarios WHERE id = %s" + (" FOR UPDATE" if para_escrita else ""),
+        (user_id,)
+    )
+    return cursor.fetchone()['notas_versao']
+
+
+def avancar_versao_notas(cursor, user_id, versao):
+    # notas_alterado_em: Last-Modified das leituras de notas (ver versoes.py)
+    cursor.execute(
+        "UPDATE usuarios SET notas_versao = %s, notas_alterado_em = CURRENT_TIMESTAMP(6) WHERE id = %s",
+        (versao, user_id)
+    )
+
+
+def sync_nota_tags(cursor, nota_id, tags, nova=False):
+    # Sincroniza nota_tags com o conjunto de tags do conteúdo usando só
+    # instruções multi-linha. Não faz commit: roda na transação do chamador.
+    atuais = {}
+    if not nova:
+        cursor.execute("""
+            SELECT t.id, t.name
+            FROM nota_tags nt
+            JOIN tags t ON t.id = nt.tag_id
+            WHERE nt.nota_id = %s
+        """, (nota_id,))
+        atuais = {row['name'].casefold(): row for row in cursor.fetchall()}
+
+    # Comparação sem diferenciar maiúsculas, como a collation da tabela tags
+    novas = {tag.casefold(): tag for tag in tags}
+
+    removidas = [row for chave, row in atuais.items() if chave not in novas]
+    adicionadas = [tag for chave, tag in novas.items() if chave not in atuais]
+
+    remover_nota_tags(cursor, nota_id, removidas)
+    return inserir_nota_tags(cursor, nota_id, adicionadas), removidas
+
+
+def tags_nota_por_nome(cursor, nota_id, nomes):
+    # Linhas (id, name) das tags da nota com esses nomes, comparados pela
+    # collation da tabela tags
+    if not nomes:
+        return []
+    placeholders = ','.join(['%s'] * len(nomes))
+    cursor.execute(f"""
+        SELECT t.id, t.name
+        FROM nota_tags nt
+        JOIN tags t ON t.id = nt.tag_id
+        WHERE nt.nota_id = %s AND t.name IN ({placeholders})
+    """, [nota_id] + list(nomes))
+    return cursor.fetchall()
+
+
+def remover_nota_tags(cursor, nota_id, tag_rows):
+    if tag_rows:
+        placeholders = ','.join(['%s'] * len(tag_rows))
+        cursor.execute(
+            f"DELETE FROM nota_tags WHERE nota_id = %s AND tag_id IN ({placeholders})",
+            [nota_id] + [row['id'] for row in tag_rows]
+        )
+
+
+def inserir_nota_tags(cursor, nota_id, nomes):
+    # Liga a nota às tags, criando as que ainda não existem; devolve as
+    # linhas (id, name) das tags
+    if not nomes:
+        return []
+    placeholders = ','.join(['%s'] * len(nomes))
+
+    # Criar as tags que ainda não existem
+    cursor.execute(
+        f"INSERT IGNORE INTO tags (name) VALUES {','.join(['(%s)'] * len(nomes))}",
+        list(nomes)
+    )
+
+    cursor.execute(f"SELECT id, name FROM tags WHERE name IN ({placeholders})", list(nomes))
+    tag_rows = cursor.fetchall()
+    tag_ids = [row['id'] for row in tag_rows]
+
+    # IGNORE: nomes equivalentes na collation (ex.: acentos) caem na mesma tag
+    if tag_ids:
+        cursor.execute(
+            f"INSERT IGNORE INTO nota_tags (nota_id, tag_id) VALUES {','.join(['(%s, %s)'] * len(tag_ids))}",
+            [valor for tag_id in tag_ids for valor in (nota_id, tag_id)]
+        )
+    return tag_rows
+
+
+def carregar_titulos_derivados(cursor, user_id):
+    # Os links resolvem pelo título já derivado de cada nota, não pelo título
+    # recém-salvo: assim reapontar links na troca de título parte sempre do
+    # estado que links_notas/links_pendentes refletem
+    cursor.execute("""
+        SELECT id, titulo_derivado AS title FROM notas
+        WHERE user_id = %s AND titulo_derivado IS NOT NULL
+    """, (user_id,))
+    return TituloIndex(cursor.fetchall())
+
+
+def derivar_notas(cursor, user_id, nota_ids, indice=None):
+    # Aplica tags e links das notas com derivação pendente. Idempotente: a
+    # mensagem só diz quais notas olhar, o estado vem do banco, então eventos
+    # repetidos ou fora de ordem convergem para a última revisão. Não faz
+    # commit; devolve a nova notas_versao (None se não havia nada pendente)
+    versao = versao_notas_usuario(cursor, user_id, para_escrita=True)
+
+    placeholders = ','.join(['%s'] * len(nota_ids))
+    cursor.execute(f"""
+        SELECT id, title, content, revisao, derivado_versao, titulo_derivado
+        FROM notas
+        WHERE user_id = %s AND id IN ({placeholders}) AND derivado_versao < revisao
+        ORDER BY id
+    """, [user_id] + list(nota_ids))
+    pendentes = cursor.fetchall()
+    if not pendentes:
+        return None
+
+    if indice is None:
+        indice = carregar_titulos_derivados(cursor, user_id)
+
+    for nota in pendentes:
+        # derivado_versao 0: nota nova, ainda sem tags nem links gravados
+        nova = nota['derivado_versao'] == 0
+        content = nota['content'] or ''
+        sync_nota_tags(cursor, nota['id'], extract_tags(content), nova=nova)
+        sync_escrita_nota(cursor, user_id, indice, nota['id'], nota['titulo_derivado'],
+                          nota['title'], extract_links(content), nova=nova)
+        indice.set_titulo(nota['id'], nota['titulo_derivado'], nota['title'])
+
+    # As notas não mudam durante a derivação (as escritas do usuário esperam
+    # o FOR UPDATE acima); updated_at = updated_at evita o ON UPDATE
+    versao_depois = versao + 1
+    placeholders = ','.join(['%s'] * len(pendentes))
+    cursor.execute(f"""
+        UPDATE notas
+        SET derivado_versao = revisao, titulo_derivado = title, {SQL_CONTAGENS},
+            versao_usuario = %s, updated_at = updated_at
+        WHERE id IN ({placeholders})
+    """, [versao_depois] + [nota['id'] for nota in pendentes])
+
+    avancar_versao_notas(cursor, user_id, versao_depois)
+    return versao_depois
@@ -0,0 +1,192 @@
+import atexit
+import os
+import threading
+import time
+
+from mysql.connector import Error
+
+from banco import get_db_pool
+from deltas import delta_unico, diferenca_derivada, diferenca_palavras, sql_deltas
+from derivacao import SQL_CONTAGENS, avancar_versao_notas, inserir_nota_tags, preview_nota, remover_nota_tags, tags_nota_por_nome, versao_notas_usuario
+from estado import agendar_derivacao, buffer_notas, busca_cache, get_titulo_index, grafo_cache, titulo_cache
+from wikilinks import alterar_links_nota
+
+# Gravação de uma nova revisão de nota a partir da anterior, usada pelo
+# PATCH /api/notas/<id> e pela descarga do buffer do autosave
+# (buffer_notas.py): a thread de cada worker grava as notas vencidas e o fim
+# do processo grava tudo o que ainda estiver pendente.
+
+# Intervalo entre as verificações de notas vencidas no buffer
+INTERVALO_DESCARGA = float(os.environ.get('ZETRIA_AUTOSAVE_INTERVALO', '1'))
+
+# Colunas de nota_atual para gravar_nota
+COLUNAS_NOTA = 'id, title, content, word_count, revisao, derivado_versao, titulo_derivado'
+
+
+def gravar_nota(connection, cursor, user_id, nota_atual, title, content, deltas, revisao, versao_antes, atualizado_em):
+    # Grava title/content como a revisão revisao, com os deltas que levam
+    # do conteúdo de nota_atual ao novo. Chamado com o lock das notas do
+    # usuário (versao_notas_usuario para escrita); faz o commit, o patch dos
+    # caches e devolve se a derivação ficou pendente
+    nota_id = nota_atual['id']
+    versao_depois = versao_antes + 1
+    antigo = nota_atual['content'] or ''
+
+    # Nota já derivada na revisão base e sem troca de título: tags e
+    # links mudam só pelo que entrou e saiu na janela alterada e são
+    # aplicados aqui mesmo. Senão, a derivação completa de sempre
+    incremental = (nota_atual['derivado_versao'] == nota_atual['revisao']
+                   and title == nota_atual['titulo_derivado'])
+    tags_adicionadas, tags_removidas = [], []
+    links_adicionados, links_removidos = [], []
+    if incremental:
+        novas, antigas, links_novos, links_antigos = diferenca_derivada(antigo, content, deltas)
+        tags_removidas = tags_nota_por_nome(cursor, nota_id, list(antigas.values()))
+        # Tag gravada com outra grafia equivalente na collation (ex.: sem
+        # acento) pode ainda ser usada pelo resto do conteúdo
+        incremental = all(row['name'].casefold() in antigas for row in tags_removidas)
+
+    if incremental:
+        remover_nota_tags(cursor, nota_id, tags_removidas)
+        tags_adicionadas = inserir_nota_tags(cursor, nota_id, list(novas.values()))
+        if links_novos or links_antigos:
+            indice = get_titulo_index(cursor, user_id, versao_antes)
+            links_adicionados, links_removidos = alterar_links_nota(
+                cursor, nota_id, indice, links_novos, links_antigos
+            )
+
+    # Resumo da nota: palavras contadas só no trecho alterado; as contagens
+    # de tags e links, se aplicados aqui, no que acabou de ser gravado
+    preview = preview_nota(content)
+    word_count = nota_atual['word_count'] + diferenca_palavras(antigo, content, deltas)
+    derivado = f', derivado_versao = revisao, {SQL_CONTAGENS}' if incremental else ''
+
+    # Só os trechos novos vão para o banco (ver sql_deltas)
+    expressao, params = sql_deltas('content', deltas)
+    cursor.execute(f"""
+        UPDATE notas
+        SET content = {expressao}, title = %s, preview = %s, word_count = %s, updated_at = %s,
+            versao_usuario = %s, revisao = %s{derivado}
+        WHERE id = %s
+    """, params + [title, preview, word_count, atualizado_em, versao_depois, revisao, nota_id])
+
+    avancar_versao_notas(cursor, user_id, versao_depois)
+
+    connection.commit()
+
+    titulo_cache.patch(user_id, versao_antes, versao_depois, lambda indice: None)
+
+    nota_grafo = {'id': nota_id, 'title': title, 'preview': preview}
+
+    def patch_grafo(grafo):
+        grafo.upsert_nota(nota_grafo, tags_adicionadas, tags_removidas)
+        grafo.apply_links(links_adicionados, links_removidos)
+
+    grafo_cache.patch(user_id, versao_antes, versao_depois, patch_grafo)
+    busca_cache.patch(user_id, versao_antes, versao_depois,
+                      lambda indice: indice.upsert(nota_id, title, content, atualizado_em))
+
+    return False if incremental else agendar_derivacao(connection, cursor, user_id, nota_id)
+
+
+def _descarregar_nota(connection, nota_id):
+    pendente = buffer_notas.ler(nota_id)
+    if pendente is None:
+        return
+
+    cursor = connection.cursor(dictionary=True)
+    reserva = None
+    try:
+        versao_antes = versao_notas_usuario(cursor, pendente.user_id, para_escrita=True)
+        cursor.execute(f"""
+            SELECT {COLUNAS_NOTA}
+            FROM notas
+            WHERE id = %s AND user_id = %s
+        """, (nota_id, pendente.user_id))
+        nota_atual = cursor.fetchone()
+
+        # Com o lock: o que está na vaga agora é o que vai para o banco
+        reservado = buffer_notas.reservar(nota_id)
+        if reservado is None:
+            connection.rollback()
+            return
+        reserva, pendente = reservado
+
+        # Nota apagada, ou vaga que já foi gravada e não chegou a ser liberada
+        if not nota_atual or nota_atual['revisao'] >= pendente.revisao:
+            connection.rollback()
+            buffer_notas.concluir(nota_id, reserva)
+            return
+
+        deltas = [delta_unico(nota_atual['content'] or '', pendente.content)]
+        gravar_nota(connection, cursor, pendente.user_id, nota_atual, pendente.title, pendente.content,
+                    deltas, pendente.revisao, versao_antes, pendente.atualizado_em)
+        buffer_notas.concluir(nota_id, reserva)
+
+    except Error as e:
+        print(f"Erro ao gravar nota {nota_id} do buffer: {e}")
+        connection.rollback()
+        if reserva is not None:
+            buffer_notas.concluir(nota_id, reserva, gravada=False)
+    finally:
+        cursor.close()
+
+
+def descarregar(nota_ids):
+    # Grava no banco as notas dadas que estão no buffer, fora de requisição
+    if not nota_ids:
+        return
+    pool = get_db_pool()
+    try:
+        connection = pool.acquire()
+    except Error as e:
+        print(f"Erro ao conectar ao MySQL para gravar o buffer: {e}")
+        return
+
+    erro = False
+    try:
+        for nota_id in nota_ids:
+            _descarregar_nota(connection, nota_id)
+    except Error:
+        erro = True
+        raise
+    finally:
+        pool.release(connection, discard=erro)
+
+
+_descarga_pid = None
+
+_descarga_lock = threading.Lock()
+
+
+def _laco_descarga():
+    while True:
+        time.sleep(INTERVALO_DESCARGA)
+        try:
+            descarregar(buffer_notas.vencidas())
+        except Exception as e:
+            # A thread não pode morrer: sem ela o buffer só esvazia no fim
+            print(f"Erro na descarga do buffer de notas: {e}")
+
+
+def garantir_descarga():
+    # Uma thread de descarga por processo, iniciada na primeira requisição
+    # depois do fork (como o pool de conexões)
+    global _descarga_pid
+    if _descarga_pid == os.getpid() or not buffer_notas.ativo:
+        return
+    with _descarga_lock:
+        if _descarga_pid != os.getpid():
+            threading.Thread(target=_laco_descarga, name='descarga-notas', daemon=True).start()
+            _descarga_pid = os.getpid()
+
+
+def descarregar_tudo():
+    descarregar(buffer_notas.vencidas(todas=True))
+
+
+def instalar(app):
+    app.before_request(garantir_descarga)
+    # No fim de cada worker e do processo mestre (que fica com o que um
+    # worker derrubado deixou), grava o que ainda estiver no buffer
+    atexit.register(descarregar_tudo)
@@ -0,0 +1,98 @@
+import os
+import threading
+
+from buffer_notas import BufferNotas
+from busca import BuscaCache
+from derivacao import carregar_titulos_derivados, derivar_notas
+from fila_grafos import Publicador
+from grafo_cache import GrafoCache
+from recorrencia import CacheOcorrencias
+from wikilinks import TituloIndexCache
+
+# Estado por processo (worker) da aplicação web: os caches versionados e o
+# publicador da fila de derivação. Cada worker tem os seus; com preload os
+# objetos são criados vazios no processo pai e copiados no fork.
+
+# Cache de grafos por processo (ver grafo_cache.py)
+grafo_cache = GrafoCache(max_bytes=int(os.environ.get('ZETRIA_GRAFO_CACHE_MB', '64')) * 1024 * 1024)
+
+# Índice de títulos por usuário para resolver [[links]] (ver wikilinks.py)
+titulo_cache = TituloIndexCache()
+
+# Índice invertido para a busca de notas (ver busca.py)
+busca_cache = BuscaCache(max_postings=int(os.environ.get('ZETRIA_BUSCA_MAX_POSTINGS', '5000000')))
+
+# Expansões das tarefas recorrentes por (regra, início da série, janela)
+ocorrencias_cache = CacheOcorrencias(max_entries=int(os.environ.get('ZETRIA_OCORRENCIAS_CACHE', '20000')))
+
+# Buffer do autosave (ver buffer_notas.py). Ao contrário do resto deste
+# módulo é um só para todos os workers: a memória compartilhada é criada
+# aqui, no import, antes do fork. ZETRIA_AUTOSAVE_VAGAS=0 desliga
+buffer_notas = BufferNotas(
+    vagas=int(os.environ.get('ZETRIA_AUTOSAVE_VAGAS', '64')),
+    bytes_por_vaga=int(os.environ.get('ZETRIA_AUTOSAVE_VAGA_KB', '256')) * 1024,
+    janela=float(os.environ.get('ZETRIA_AUTOSAVE_JANELA', '5')),
+    idade_maxima=float(os.environ.get('ZETRIA_AUTOSAVE_IDADE', '30')),
+)
+
+def get_titulo_index(cursor, user_id, versao):
+    
+    # Títulos já derivados (ver derivacao.py), que é o que os links refletem
+    indice = titulo_cache.get(user_id, versao)
+    if indice is None:
+        indice = carregar_titulos_derivados(cursor, user_id)
+        titulo_cache.put(user_id, versao, indice)
+    return indice
+
+def fetch_tags_por_nota(cursor, nota_ids):
+    
+    tags_por_nota = {}
+    if not nota_ids:
+        return tags_por_nota
+    
+    placeholders = ','.join(['%s'] * len(nota_ids))
+    cursor.execute(f"""
+        SELECT nt.nota_id, t.name
+        FROM nota_tags nt
+        JOIN tags t ON t.id = nt.tag_id
+        WHERE nt.nota_id IN ({placeholders})
+    """, nota_ids)
+    
+    for row in cursor.fetchall():
+        tags_por_nota.setdefault(row['nota_id'], []).append(row['name'])
+    return tags_por_nota
+
+# Tags e [[links]] das notas são derivados no consumer_grafos, fora da
+# requisição. Com ZETRIA_DERIVACAO_ASSINCRONA=0 (ou sem RabbitMQ) a
+# derivação roda na própria requisição, logo depois do commit da nota
+DERIVACAO_ASSINCRONA = os.environ.get('ZETRIA_DERIVACAO_ASSINCRONA', '1') != '0'
+
+_publicador = None
+
+_publicador_lock = threading.Lock()
+
+def get_publicador():
+    
+    global _publicador
+    # Como o pool: a conexão com o RabbitMQ não sobrevive a um fork
+    if _publicador is None or _publicador.pid != os.getpid():
+        with _publicador_lock:
+            if _publicador is None or _publicador.pid != os.getpid():
+                _publicador = Publicador()
+    return _publicador
+
+def send_grafos_message(data):
+    
+    return get_publicador().publicar(data)
+
+def agendar_derivacao(connection, cursor, user_id, nota_id):
+    
+    # Chamado depois do commit da nota. Devolve True se a derivação ficou
+    # pendente no consumer; se a fila não aceitou o evento, deriva aqui
+    if DERIVACAO_ASSINCRONA and send_grafos_message(
+            {'tipo': 'nota_alterada', 'user_id': user_id, 'nota_id': nota_id}):
+        return True
+    
+    derivar_notas(cursor, user_id, [nota_id])
+    connection.commit()
+    return False
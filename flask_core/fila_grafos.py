@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+
+import pika
+
+RABBITMQ_HOST = os.environ.get('RABBITMQ_HOST', 'rabbitmq')
+FILA = 'grafos_eventos'
+FILA_FALHAS = 'grafos_eventos.falhas'
+FILA_RETENTATIVAS = 'grafos_eventos.retentativas'
+
+# Mensagem que falha por um erro temporário do banco (deadlock, conexão
+# perdida...) espera ESPERA_RETENTATIVA_MS na FILA_RETENTATIVAS e volta à
+# FILA; depois de MAX_TENTATIVAS vai para a FILA_FALHAS. O número de
+# tentativas já feitas vai no cabeçalho CABECALHO_TENTATIVAS
+ESPERA_RETENTATIVA_MS = int(os.environ.get('ZETRIA_CONSUMER_ESPERA_RETENTATIVA_MS', '5000'))
+MAX_TENTATIVAS = int(os.environ.get('ZETRIA_CONSUMER_MAX_TENTATIVAS', '5'))
+CABECALHO_TENTATIVAS = 'x-tentativas'
+
+# Fila das versões anteriores, declarada sem durable e sem argumentos. Um
+# broker que já a tem recusa redeclará-la com outros (PRECONDITION_FAILED),
+# por isso a FILA tem outro nome; o consumer passa para ela o que ainda
+# chegar aqui (transferir_fila_antiga) e apaga a fila quando esvazia
+FILA_ANTIGA = 'grafos_queue'
+
+# Depois de uma falha, não tenta reconectar por este tempo: as escritas
+# caem direto no processamento síncrono em vez de esperar o timeout
+ESPERA_APOS_FALHA = 5.0
+
+
+def declarar_filas(channel):
+    # Mensagens que falham vão para a fila de falhas em vez de voltar à fila.
+    # Publicador e consumidor declaram com os mesmos argumentos
+    channel.queue_declare(queue=FILA_FALHAS, durable=True)
+    # Sem consumidor: cada mensagem expira e o broker a devolve para a FILA
+    channel.queue_declare(queue=FILA_RETENTATIVAS, durable=True, arguments={
+        'x-message-ttl': ESPERA_RETENTATIVA_MS,
+        'x-dead-letter-exchange': '',
+        'x-dead-letter-routing-key': FILA,
+    })
+    channel.queue_declare(queue=FILA, durable=True, arguments={
+        'x-dead-letter-exchange': '',
+        'x-dead-letter-routing-key': FILA_FALHAS,
+    })
+
+
+def tentativas(properties):
+    # Quantas vezes a mensagem já falhou por erro temporário
+    headers = getattr(properties, 'headers', None) or {}
+    try:
+        return int(headers.get(CABECALHO_TENTATIVAS, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def mover_mensagens(connection, origem, destino, limite=None, sem_cabecalhos=False):
+    # Passa mensagens de origem para destino, uma a uma, com confirmação do
+    # broker antes do ack. Devolve quantas moveu (0 se origem não existe).
+    # sem_cabecalhos: a mensagem recomeça do zero (tentativas e x-death).
+    # Canal próprio: a declaração passiva de uma fila inexistente o fecha
+    channel = connection.channel()
+    try:
+        channel.queue_declare(queue=origem, passive=True)
+    except pika.exceptions.ChannelClosedByBroker:
+        return 0
+
+    channel.confirm_delivery()
+    movidas = 0
+    try:
+        while limite is None or movidas < limite:
+            method, properties, body = channel.basic_get(origem)
+            if method is None:
+                break
+            if sem_cabecalhos:
+                properties.headers = None
+            channel.basic_publish(exchange='', routing_key=destino, body=body, properties=properties)
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            movidas += 1
+    finally:
+        if channel.is_open:
+            channel.close()
+    return movidas
+
+
+def transferir_fila_antiga(connection):
+    # Eventos publicados na FILA_ANTIGA por processos ainda não atualizados
+    movidas = mover_mensagens(connection, FILA_ANTIGA, FILA)
+    channel = connection.channel()
+    try:
+        channel.queue_delete(queue=FILA_ANTIGA, if_unused=True, if_empty=True)
+    except pika.exceptions.ChannelClosedByBroker:
+        # Ainda tem consumidor ou mensagens: fica para a próxima verificação
+        pass
+    finally:
+        if channel.is_open:
+            channel.close()
+    return movidas
+
+
+class Publicador:
+    """Conexão persistente com o RabbitMQ para publicar na FILA.
+
+    Uma por processo (recriada após fork) e protegida por lock, já que a
+    BlockingConnection do pika não é thread-safe. Com publisher confirms,
+    publicar() só devolve True quando o broker aceitou a mensagem.
+    """
+
+    def __init__(self, host=RABBITMQ_HOST):
+        self.host = host
+        self.pid = os.getpid()
+        self._connection = None
+        self._channel = None
+        self._falhou_em = None
+        self._lock = threading.Lock()
+
+    def _conectar(self):
+        self._connection = pika.BlockingConnection(pika.ConnectionParameters(
+            host=self.host, heartbeat=0, socket_timeout=2, blocked_connection_timeout=2
+        ))
+        self._channel = self._connection.channel()
+        declarar_filas(self._channel)
+        self._channel.confirm_delivery()
+
+    def _fechar(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except pika.exceptions.AMQPError:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def publicar(self, evento):
+        corpo = json.dumps(evento)
+        propriedades = pika.BasicProperties(
+            content_type='application/json',
+            delivery_mode=2,  # persistente
+            timestamp=int(time.time())
+        )
+
+        with self._lock:
+            if self._falhou_em is not None and time.monotonic() - self._falhou_em < ESPERA_APOS_FALHA:
+                return False
+
+            # Duas tentativas: a conexão guardada pode ter caído sem aviso
+            for tentativa in range(2):
+                try:
+                    if self._channel is None or self._channel.is_closed:
+                        self._fechar()
+                        self._conectar()
+                    self._channel.basic_publish(exchange='', routing_key=FILA, body=corpo,
+                                                properties=propriedades, mandatory=True)
+                    self._falhou_em = None
+                    return True
+                except (pika.exceptions.AMQPError, OSError) as e:
+                    print(f"Erro ao publicar na {FILA} (tentativa {tentativa + 1}): {e}")
+                    self._fechar()
+
+            self._falhou_em = time.monotonic()
+            return False
@@ -0,0 +1,373 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from grafo_engine import GrafoCSR
+
+
+def _nota_node(nota):
+    return {
+        'id': f'nota_{nota["id"]}',
+        'label': nota['title'][:30] + ('...' if len(nota['title']) > 30 else ''),
+        'type': 'nota',
+        'data': {
+            'id': nota['id'],
+            'title': nota['title'],
+            # Coluna notas.preview, já cortada (ver derivacao.preview_nota)
+            'content': nota['preview'],
+            'created_at': nota['created_at'].isoformat() if isinstance(nota['created_at'], datetime) else str(nota['created_at'])
+        }
+    }
+
+
+def _epoch(valor):
+    if isinstance(valor, datetime):
+        return int(valor.timestamp())
+    if isinstance(valor, str):
+        try:
+            return int(datetime.fromisoformat(valor).timestamp())
+        except ValueError:
+            return None
+    return None
+
+
+def _tag_node(tag):
+    return {
+        'id': f'tag_{tag["id"]}',
+        'label': f'#{tag["name"]}',
+        'type': 'tag',
+        'data': dict(tag)
+    }
+
+
+class GrafoUsuario:
+    """Grafo nota-tag e nota-nota de um usuário, pronto para ser modificado aos poucos."""
+
+    # Estimativa grosseira de bytes por estrutura, usada no limite de memória
+    CUSTO_NOTA = 600
+    CUSTO_TAG = 350
+    CUSTO_ARESTA = 120
+    # Formas derivadas guardadas junto: aresta do payload (dict com os ids em
+    # texto) e item das listas do formato compacto
+    CUSTO_ARESTA_PAYLOAD = 350
+    CUSTO_ITEM_COMPACTO = 40
+
+    def __init__(self):
+        self.notas = {}       # nota_id -> node
+        self.tags = {}        # tag_id -> {'id', 'name', 'usage_count'}
+        self.arestas = {}     # nota_id -> set(tag_id)
+        self.links = {}       # source_nota_id -> set(target_nota_id)
+        self.backlinks = {}   # target_nota_id -> set(source_nota_id)
+        self._payload = None
+        self._compacto = {}   # campos opcionais -> payload compacto
+        self._csr = None
+        # Versão da entrada no cache e lock das leituras e patches deste
+        # grafo, para montar as formas derivadas sem o lock do cache todo
+        self.versao = None
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, notas, relacionamentos, links=()):
+        grafo = cls()
+        for nota in notas:
+            grafo.notas[nota['id']] = _nota_node(nota)
+            grafo.arestas[nota['id']] = set()
+        for rel in relacionamentos:
+            grafo._ligar(rel['nota_id'], rel['tag_id'], rel['name'])
+        grafo.apply_links([(link['source_nota_id'], link['target_nota_id']) for link in links])
+        return grafo
+
+    def _ligar(self, nota_id, tag_id, nome):
+        tags_da_nota = self.arestas.setdefault(nota_id, set())
+        if tag_id in tags_da_nota:
+            return
+        tags_da_nota.add(tag_id)
+        tag = self.tags.get(tag_id)
+        if tag is None:
+            tag = self.tags[tag_id] = {'id': tag_id, 'name': nome, 'usage_count': 0}
+        tag['usage_count'] += 1
+
+    def _desligar(self, nota_id, tag_id):
+        tags_da_nota = self.arestas.get(nota_id)
+        if not tags_da_nota or tag_id not in tags_da_nota:
+            return
+        tags_da_nota.discard(tag_id)
+        tag = self.tags.get(tag_id)
+        if tag is not None:
+            tag['usage_count'] -= 1
+            if tag['usage_count'] <= 0:
+                del self.tags[tag_id]
+
+    def upsert_nota(self, nota, tags_adicionadas=(), tags_removidas=()):
+        anterior = self.notas.get(nota['id'])
+        if anterior is not None and 'created_at' not in nota:
+            nota = dict(nota, created_at=anterior['data']['created_at'])
+        self.notas[nota['id']] = _nota_node(nota)
+        self.arestas.setdefault(nota['id'], set())
+
+        for tag in tags_removidas:
+            self._desligar(nota['id'], tag['id'])
+        for tag in tags_adicionadas:
+            self._ligar(nota['id'], tag['id'], tag['name'])
+        self._modificado()
+
+    def apply_links(self, adicionados=(), removidos=()):
+        for origem, alvo in removidos:
+            self.links.get(origem, set()).discard(alvo)
+            self.backlinks.get(alvo, set()).discard(origem)
+        for origem, alvo in adicionados:
+            self.links.setdefault(origem, set()).add(alvo)
+            self.backlinks.setdefault(alvo, set()).add(origem)
+        self._modificado()
+
+    def remove_nota(self, nota_id):
+        for tag_id in list(self.arestas.get(nota_id, ())):
+            self._desligar(nota_id, tag_id)
+        self.arestas.pop(nota_id, None)
+        self.apply_links(
+            removidos=[(nota_id, alvo) for alvo in self.links.pop(nota_id, ())]
+                      + [(origem, nota_id) for origem in self.backlinks.pop(nota_id, ())]
+        )
+        self.notas.pop(nota_id, None)
+        self._modificado()
+
+    def _modificado(self):
+        # Descarta as formas derivadas; são remontadas sob demanda
+        self._payload = None
+        self._compacto = {}
+        self._csr = None
+
+    def compacto(self, campos=()):
+        campos = frozenset(campos)
+        if campos not in self._compacto:
+            self._compacto[campos] = self._montar_compacto(campos)
+        return self._compacto[campos]
+
+    def _montar_compacto(self, campos):
+        # Formato colunar: notas e tags em arrays paralelos e arestas como
+        # pares de índices nesses arrays (lista plana [a0, b0, a1, b1, ...])
+        posicao_nota = {}
+        notas = {'id': [], 'title': []}
+        if 'preview' in campos:
+            notas['preview'] = []
+        if 'created_at' in campos:
+            notas['created_at'] = []
+
+        for posicao, (nota_id, node) in enumerate(self.notas.items()):
+            posicao_nota[nota_id] = posicao
+            dados = node['data']
+            notas['id'].append(nota_id)
+            notas['title'].append(dados['title'])
+            if 'preview' in campos:
+                notas['preview'].append(dados['content'])
+            if 'created_at' in campos:
+                notas['created_at'].append(_epoch(dados['created_at']))
+
+        posicao_tag = {}
+        tags = {'id': [], 'name': [], 'usage_count': []}
+        for posicao, tag in enumerate(self.tags.values()):
+            posicao_tag[tag['id']] = posicao
+            tags['id'].append(tag['id'])
+            tags['name'].append(tag['name'])
+            tags['usage_count'].append(tag['usage_count'])
+
+        nota_tag = []
+        for nota_id, tag_ids in self.arestas.items():
+            origem = posicao_nota.get(nota_id)
+            if origem is None:
+                continue
+            for tag_id in tag_ids:
+                nota_tag.append(origem)
+                nota_tag.append(posicao_tag[tag_id])
+
+        nota_nota = []
+        for origem_id, alvos in self.links.items():
+            origem = posicao_nota.get(origem_id)
+            if origem is None:
+                continue
+            for alvo_id in alvos:
+                alvo = posicao_nota.get(alvo_id)
+                if alvo is not None:
+                    nota_nota.append(origem)
+                    nota_nota.append(alvo)
+
+        return {
+            'notas': notas,
+            'tags': tags,
+            'edges': {'nota_tag': nota_tag, 'nota_nota': nota_nota}
+        }
+
+    def csr(self):
+        if self._csr is None:
+            self._csr = GrafoCSR(self.nodes_edges()[0], self.arestas, self.links)
+        return self._csr
+
+    def nodes_edges(self):
+        if self._payload is None:
+            nodes = list(self.notas.values())
+            nodes.extend(_tag_node(tag) for tag in self.tags.values())
+            edges = [
+                {'from': f'nota_{nota_id}', 'to': f'tag_{tag_id}', 'type': 'nota_tag'}
+                for nota_id, tag_ids in self.arestas.items()
+                for tag_id in tag_ids
+            ]
+            edges.extend(
+                {'from': f'nota_{origem}', 'to': f'nota_{alvo}', 'type': 'nota_nota'}
+                for origem, alvos in self.links.items()
+                for alvo in alvos
+            )
+            self._payload = (nodes, edges)
+        return self._payload
+
+    def estimated_size(self):
+        total_arestas = sum(len(tag_ids) for tag_ids in self.arestas.values())
+        total_arestas += 2 * sum(len(alvos) for alvos in self.links.values())
+        tamanho = (len(self.notas) * self.CUSTO_NOTA
+                   + len(self.tags) * self.CUSTO_TAG
+                   + total_arestas * self.CUSTO_ARESTA)
+
+        # As formas já montadas podem ser tão grandes quanto o grafo
+        if self._payload is not None:
+            nodes, edges = self._payload
+            tamanho += 8 * len(nodes) + len(self.tags) * self.CUSTO_TAG + len(edges) * self.CUSTO_ARESTA_PAYLOAD
+        for payload in self._compacto.values():
+            itens = sum(len(lista) for parte in ('notas', 'tags', 'edges') for lista in payload[parte].values())
+            tamanho += itens * self.CUSTO_ITEM_COMPACTO
+        if self._csr is not None:
+            tamanho += self._csr.estimated_size()
+        return tamanho
+
+
+class GrafoCache:
+    """Cache LRU de grafos por usuário, limitado por memória estimada.
+
+    Cada entrada guarda a versão (carimbo de notas do usuário) a partir da
+    qual foi montada. Leituras só usam a entrada se a versão bate; escritas
+    feitas neste processo aplicam o patch e avançam a versão, desde que a
+    entrada estivesse na versão anterior à escrita - senão ela é descartada.
+
+    O lock do cache só protege o dicionário de entradas. Montar uma forma
+    derivada (payload, compacto, CSR) e aplicar um patch acontecem sob o
+    lock do grafo, e o tamanho da entrada é medido de novo em seguida.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()  # user_id -> (versao, grafo, tamanho)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+        self.evictions = 0
+
+    def __contains__(self, user_id):
+        with self._lock:
+            return user_id in self._entradas
+
+    def get(self, user_id, versao, derivar=GrafoUsuario.nodes_edges):
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None or entrada[0] != versao:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(user_id)
+            grafo = entrada[1]
+
+        # Montado sob o lock do grafo: não concorre com um patch dele, e a
+        # montagem lenta de um usuário não segura as leituras dos outros
+        with grafo.lock:
+            if grafo.versao != versao:
+                resultado = None
+            else:
+                resultado = derivar(grafo)
+                tamanho = grafo.estimated_size()
+
+        with self._lock:
+            if resultado is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._medir(user_id, grafo, versao, tamanho)
+        return resultado
+
+    def put(self, user_id, versao, grafo):
+        grafo.versao = versao
+        tamanho = grafo.estimated_size()
+        with self._lock:
+            self._remover(user_id)
+            if tamanho > self.max_bytes:
+                return
+            self._entradas[user_id] = (versao, grafo, tamanho)
+            self._bytes += tamanho
+            self._liberar_espaco()
+
+    def patch(self, user_id, versao_antes, versao_depois, aplicar):
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None:
+                return
+            if entrada[0] != versao_antes:
+                self._remover(user_id)
+                return
+            grafo = entrada[1]
+
+        with grafo.lock:
+            aplicado = grafo.versao == versao_antes
+            if aplicado:
+                aplicar(grafo)
+                grafo.versao = versao_depois
+                tamanho = grafo.estimated_size()
+
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None or entrada[1] is not grafo:
+                # Substituída ou removida enquanto o patch era aplicado
+                return
+            if not aplicado:
+                self._remover(user_id)
+                return
+            self._bytes += tamanho - entrada[2]
+            self._entradas[user_id] = (versao_depois, grafo, tamanho)
+            self.patches += 1
+            self._liberar_espaco()
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._remover(user_id)
+
+    def _medir(self, user_id, grafo, versao, tamanho):
+        # Tamanho novo da entrada depois de montar uma forma derivada; se um
+        # patch passou na frente, a medida dele é que vale
+        entrada = self._entradas.get(user_id)
+        if entrada is None or entrada[1] is not grafo or entrada[0] != versao:
+            return
+        self._bytes += tamanho - entrada[2]
+        self._entradas[user_id] = (entrada[0], grafo, tamanho)
+        if tamanho > self.max_bytes:
+            self._remover(user_id)
+        self._liberar_espaco()
+
+    def _remover(self, user_id):
+        entrada = self._entradas.pop(user_id, None)
+        if entrada is not None:
+            self._bytes -= entrada[2]
+
+    def _liberar_espaco(self):
+        while self._bytes > self.max_bytes and self._entradas:
+            _, entrada = self._entradas.popitem(last=False)
+            self._bytes -= entrada[2]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'patches': self.patches,
+                'evictions': self.evictions,
+            }
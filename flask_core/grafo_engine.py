@@ -0,0 +1,193 @@
+from array import array
+from collections import deque
+
+# Tipo de cada posição da adjacência; o mesmo par aparece nos dois sentidos
+NOTA_TAG = 0      # nota -> tag
+TAG_NOTA = 1      # tag -> nota (sentido reverso de NOTA_TAG)
+LINK = 2          # nota -> nota apontada pelo [[link]]
+BACKLINK = 3      # nota apontada -> nota de origem (sentido reverso de LINK)
+
+
+class GrafoCSR:
+    """Adjacência compacta (CSR) do grafo de um usuário.
+
+    Os vértices são as posições da lista de nós do payload (notas e depois
+    tags). A vizinhança do vértice v ocupa alvos[offsets[v]:offsets[v + 1]],
+    com o tipo de cada aresta em tipos na mesma posição. Os backlinks ficam
+    numa segunda CSR só com as arestas LINK invertidas.
+    """
+
+    def __init__(self, nodes, arestas_tag, links):
+        self.nodes = nodes
+        self.indice_nota = {}
+        self.indice_tag = {}
+        for posicao, node in enumerate(nodes):
+            if node['type'] == 'nota':
+                self.indice_nota[node['data']['id']] = posicao
+            else:
+                self.indice_tag[node['data']['id']] = posicao
+
+        total = len(nodes)
+        pares = []
+        for nota_id, tag_ids in arestas_tag.items():
+            origem = self.indice_nota.get(nota_id)
+            if origem is None:
+                continue
+            for tag_id in tag_ids:
+                alvo = self.indice_tag.get(tag_id)
+                if alvo is not None:
+                    pares.append((origem, alvo, NOTA_TAG))
+        for nota_id, alvos in links.items():
+            origem = self.indice_nota.get(nota_id)
+            if origem is None:
+                continue
+            for alvo_id in alvos:
+                alvo = self.indice_nota.get(alvo_id)
+                if alvo is not None:
+                    pares.append((origem, alvo, LINK))
+
+        # Grau de cada vértice (cada par entra nos dois sentidos)
+        graus = array('i', bytes(4 * total))
+        graus_backlink = array('i', bytes(4 * total))
+        for origem, alvo, tipo in pares:
+            graus[origem] += 1
+            graus[alvo] += 1
+            if tipo == LINK:
+                graus_backlink[alvo] += 1
+
+        self.offsets = self._prefixos(graus)
+        self.backlink_offsets = self._prefixos(graus_backlink)
+
+        self.alvos = array('i', bytes(4 * self.offsets[-1]))
+        self.tipos = array('b', bytes(self.offsets[-1]))
+        self.backlink_alvos = array('i', bytes(4 * self.backlink_offsets[-1]))
+
+        proxima = array('i', self.offsets[:-1])
+        proxima_backlink = array('i', self.backlink_offsets[:-1])
+        for origem, alvo, tipo in pares:
+            reverso = TAG_NOTA if tipo == NOTA_TAG else BACKLINK
+
+            self.alvos[proxima[origem]] = alvo
+            self.tipos[proxima[origem]] = tipo
+            proxima[origem] += 1
+
+            self.alvos[proxima[alvo]] = origem
+            self.tipos[proxima[alvo]] = reverso
+            proxima[alvo] += 1
+
+            if tipo == LINK:
+                self.backlink_alvos[proxima_backlink[alvo]] = origem
+                proxima_backlink[alvo] += 1
+
+    @staticmethod
+    def _prefixos(graus):
+        offsets = array('i', bytes(4 * (len(graus) + 1)))
+        acumulado = 0
+        for posicao, grau in enumerate(graus):
+            offsets[posicao] = acumulado
+            acumulado += grau
+        offsets[len(graus)] = acumulado
+        return offsets
+
+    def estimated_size(self):
+        return (self.offsets.itemsize * len(self.offsets)
+                + self.alvos.itemsize * len(self.alvos)
+                + len(self.tipos)
+                + self.backlink_offsets.itemsize * len(self.backlink_offsets)
+                + self.backlink_alvos.itemsize * len(self.backlink_alvos)
+                + 100 * (len(self.indice_nota) + len(self.indice_tag)))
+
+    def vertice_nota(self, nota_id):
+        return self.indice_nota.get(nota_id)
+
+    def _vizinhos(self, vertice, com_tags):
+        for posicao in range(self.offsets[vertice], self.offsets[vertice + 1]):
+            if com_tags or self.tipos[posicao] >= LINK:
+                yield self.alvos[posicao]
+
+    def backlinks(self, nota_id):
+        vertice = self.indice_nota[nota_id]
+        inicio, fim = self.backlink_offsets[vertice], self.backlink_offsets[vertice + 1]
+        return [self.nodes[origem] for origem in self.backlink_alvos[inicio:fim]]
+
+    def vizinhanca(self, nota_id, k, com_tags=True, limite=500):
+        # BFS até k saltos; devolve {vertice: distancia}, em ordem de distância
+        origem = self.indice_nota[nota_id]
+        distancias = {origem: 0}
+        fila = deque([origem])
+        while fila and len(distancias) < limite:
+            vertice = fila.popleft()
+            distancia = distancias[vertice]
+            if distancia == k:
+                continue
+            for vizinho in self._vizinhos(vertice, com_tags):
+                if vizinho not in distancias:
+                    distancias[vizinho] = distancia + 1
+                    fila.append(vizinho)
+                    if len(distancias) >= limite:
+                        break
+        return distancias
+
+    def caminho(self, origem_id, destino_id, com_tags=True):
+        # BFS bidirecional: expande sempre a fronteira menor
+        origem = self.indice_nota[origem_id]
+        destino = self.indice_nota[destino_id]
+        if origem == destino:
+            return [origem]
+
+        pais_origem = {origem: -1}
+        pais_destino = {destino: -1}
+        fronteira_origem = [origem]
+        fronteira_destino = [destino]
+
+        while fronteira_origem and fronteira_destino:
+            if len(fronteira_origem) <= len(fronteira_destino):
+                fronteira_origem, encontro = self._expandir(
+                    fronteira_origem, pais_origem, pais_destino, com_tags)
+            else:
+                fronteira_destino, encontro = self._expandir(
+                    fronteira_destino, pais_destino, pais_origem, com_tags)
+
+            if encontro is not None:
+                caminho = []
+                vertice = encontro
+                while vertice != -1:
+                    caminho.append(vertice)
+                    vertice = pais_origem[vertice]
+                caminho.reverse()
+                vertice = pais_destino[encontro]
+                while vertice != -1:
+                    caminho.append(vertice)
+                    vertice = pais_destino[vertice]
+                return caminho
+        return None
+
+    def _expandir(self, fronteira, pais, pais_outro_lado, com_tags):
+        proxima = []
+        for vertice in fronteira:
+            for vizinho in self._vizinhos(vertice, com_tags):
+                if vizinho in pais:
+                    continue
+                pais[vizinho] = vertice
+                if vizinho in pais_outro_lado:
+                    return proxima, vizinho
+                proxima.append(vizinho)
+        return proxima, None
+
+    def subgrafo(self, vertices):
+        # Nós e arestas (formato de /api/grafos) induzidos pelos vértices
+        conjunto = set(vertices)
+        nodes = [self.nodes[vertice] for vertice in vertices]
+        edges = []
+        for vertice in vertices:
+            for posicao in range(self.offsets[vertice], self.offsets[vertice + 1]):
+                tipo = self.tipos[posicao]
+                alvo = self.alvos[posicao]
+                # Cada par só na direção canônica, para não duplicar
+                if tipo in (NOTA_TAG, LINK) and alvo in conjunto:
+                    edges.append({
+                        'from': self.nodes[vertice]['id'],
+                        'to': self.nodes[alvo]['id'],
+                        'type': 'nota_tag' if tipo == NOTA_TAG else 'nota_nota'
+                    })
+        return nodes, edges
@@ -0,0 +1,239 @@
+import bisect
+import multiprocessing
+import os
+import sys
+import time
+
+from flask import g, request
+
+# Instrumentação das requisições: tempo por rota, instruções SQL (quantas e
+# quanto tempo), espera pela conexão do pool e tamanho da resposta. Os
+# valores vão para histogramas por endpoint expostos em /metrics no formato
+# texto do Prometheus e, com ZETRIA_SERVER_TIMING=1, também no header
+# Server-Timing de cada resposta.
+#
+# Como no consumer_grafos, os números ficam num Array em memória
+# compartilhada: criado em create_app(), antes do fork dos workers
+# (preload), então qualquer worker que atender o /metrics devolve o total
+# de todos eles.
+
+SERVER_TIMING = os.environ.get('ZETRIA_SERVER_TIMING', '0') == '1'
+
+# (nome, descrição, limites dos buckets)
+HISTOGRAMAS = (
+    ('http_duracao_segundos', 'Duração da requisição',
+     (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    ('http_resposta_bytes', 'Tamanho do corpo da resposta',
+     (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)),
+    ('sql_instrucoes', 'Instruções SQL executadas por requisição',
+     (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)),
+    ('sql_duracao_segundos', 'Tempo em instruções SQL por requisição',
+     (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)),
+    ('db_aquisicao_segundos', 'Espera pela conexão do pool por requisição',
+     (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)),
+)
+
+CLASSES_STATUS = ('1xx', '2xx', '3xx', '4xx', '5xx')
+
+# Requisições que não casaram com nenhuma rota (404, 405)
+SEM_ENDPOINT = '<nenhum>'
+
+
+class Medicao:
+    """O que uma requisição gastou até agora; fica em g.medicao."""
+
+    __slots__ = ('inicio', 'sql_instrucoes', 'sql_tempo', 'aquisicao', 'instrucoes')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.sql_instrucoes = 0
+        self.sql_tempo = 0.0
+        self.aquisicao = 0.0
+        # Com uma lista aqui cada instrução é guardada com o local da
+        # chamada (ver orcamentos.py); custa um passeio pela pilha
+        self.instrucoes = None
+
+    def envolver(self, cursor):
+        # Passado ao PooledConnection: todo cursor da requisição é medido
+        return CursorMedido(cursor, self)
+
+    def registrar_sql(self, operacao, duracao):
+        self.sql_instrucoes += 1
+        self.sql_tempo += duracao
+        if self.instrucoes is not None:
+            self.instrucoes.append((operacao, local_chamada()))
+
+
+# Módulos da aplicação: tudo que está no diretório deste arquivo
+_ESTE_ARQUIVO = os.path.abspath(__file__)
+_DIRETORIO_APP = os.path.dirname(_ESTE_ARQUIVO)
+
+# Frames da aplicação mostrados por instrução (do mais interno para fora)
+PROFUNDIDADE_LOCAL = 3
+
+
+def local_chamada():
+    # "arquivo.py:linha função <- ..." dos frames da aplicação que levaram
+    # ao execute(), pulando este módulo e o wrapper do require_login. Código
+    # sem arquivo ('<frozen runpy>', '<string>') não é da aplicação, mas o
+    # abspath o poria no diretório atual
+    frame = sys._getframe(2)
+    partes = []
+    while frame is not None and len(partes) < PROFUNDIDADE_LOCAL:
+        arquivo = frame.f_code.co_filename
+        if not arquivo.startswith('<'):
+            arquivo = os.path.abspath(arquivo)
+        if (os.path.dirname(arquivo) == _DIRETORIO_APP and arquivo != _ESTE_ARQUIVO
+                and frame.f_code.co_name != 'decorated_function'):
+            partes.append(f'{os.path.basename(arquivo)}:{frame.f_lineno} {frame.f_code.co_name}')
+        frame = frame.f_back
+    return ' <- '.join(partes)
+
+
+class CursorMedido:
+    """Cursor do mysql-connector que conta e cronometra execute()."""
+
+    def __init__(self, cursor, medicao):
+        self._cursor = cursor
+        self._medicao = medicao
+
+    def __getattr__(self, nome):
+        return getattr(self._cursor, nome)
+
+    def execute(self, operacao, params=None, multi=False):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.execute(operacao, params, multi)
+        finally:
+            self._medicao.registrar_sql(operacao, time.perf_counter() - inicio)
+
+    def executemany(self, operacao, seq_params):
+        inicio = time.perf_counter()
+        try:
+            return self._cursor.executemany(operacao, seq_params)
+        finally:
+            self._medicao.registrar_sql(operacao, time.perf_counter() - inicio)
+
+
+class Metricas:
+    """Contadores e histogramas por endpoint, compartilhados entre workers.
+
+    Cada endpoint tem uma fatia do Array: as requisições por classe de
+    status e, para cada histograma, a contagem de cada bucket (o último é
+    o +Inf) seguida da soma dos valores.
+    """
+
+    def __init__(self, endpoints):
+        self.endpoints = sorted(endpoints) + [SEM_ENDPOINT]
+        self._indice = {endpoint: i for i, endpoint in enumerate(self.endpoints)}
+        self._inicio_histograma = []
+        posicao = len(CLASSES_STATUS)
+        for _, _, limites in HISTOGRAMAS:
+            self._inicio_histograma.append(posicao)
+            posicao += len(limites) + 2
+        self._tamanho = posicao
+        self._valores = multiprocessing.Array('d', len(self.endpoints) * self._tamanho, lock=False)
+        self._lock = multiprocessing.Lock()
+
+    def observar(self, endpoint, status, duracao, tamanho, medicao):
+        base = self._indice.get(endpoint, self._indice[SEM_ENDPOINT]) * self._tamanho
+        valores = (duracao, tamanho, medicao.sql_instrucoes, medicao.sql_tempo, medicao.aquisicao)
+
+        # Posições calculadas fora do lock; dentro, só as somas
+        posicoes = [base + min(status // 100, 5) - 1]
+        somas = []
+        for (_, _, limites), inicio, valor in zip(HISTOGRAMAS, self._inicio_histograma, valores):
+            if valor is None:
+                continue
+            posicoes.append(base + inicio + bisect.bisect_left(limites, valor))
+            somas.append((base + inicio + len(limites) + 1, valor))
+
+        with self._lock:
+            for posicao in posicoes:
+                self._valores[posicao] += 1
+            for posicao, valor in somas:
+                self._valores[posicao] += valor
+
+    def exportar(self):
+        with self._lock:
+            valores = self._valores[:]
+
+        linhas = [
+            '# HELP zetria_http_requisicoes_total Requisições atendidas',
+            '# TYPE zetria_http_requisicoes_total counter',
+        ]
+        for endpoint, i in self._indice.items():
+            base = i * self._tamanho
+            for indice, classe in enumerate(CLASSES_STATUS):
+                if valores[base + indice]:
+                    linhas.append(f'zetria_http_requisicoes_total{{endpoint="{endpoint}",status="{classe}"}} '
+                                  f'{valores[base + indice]:.0f}')
+
+        for (nome, descricao, limites), inicio in zip(HISTOGRAMAS, self._inicio_histograma):
+            metrica = f'zetria_{nome}'
+            linhas.append(f'# HELP {metrica} {descricao}')
+            linhas.append(f'# TYPE {metrica} histogram')
+            for endpoint, i in self._indice.items():
+                base = i * self._tamanho + inicio
+                contagens = valores[base:base + len(limites) + 1]
+                total = sum(contagens)
+                if not total:
+                    continue
+                rotulo = f'endpoint="{endpoint}"'
+                acumulado = 0
+                for limite, contagem in zip(limites, contagens):
+                    acumulado += contagem
+                    linhas.append(f'{metrica}_bucket{{{rotulo},le="{limite}"}} {acumulado:.0f}')
+                linhas.append(f'{metrica}_bucket{{{rotulo},le="+Inf"}} {total:.0f}')
+                linhas.append(f'{metrica}_sum{{{rotulo}}} {valores[base + len(limites) + 1]!r}')
+                linhas.append(f'{metrica}_count{{{rotulo}}} {total:.0f}')
+        return '\n'.join(linhas) + '\n'
+
+
+def _contar_bytes(corpo, contagem):
+    # Repassa os pedaços de uma resposta em stream somando o tamanho
+    try:
+        for parte in corpo:
+            contagem[0] += len(parte)
+            yield parte
+    finally:
+        if hasattr(corpo, 'close'):
+            corpo.close()
+
+
+def instalar(app):
+    # Chamado por create_app() depois de registrar os blueprints
+    metricas = Metricas(app.view_functions)
+    app.extensions['metricas'] = metricas
+
+    @app.before_request
+    def iniciar_medicao():
+        g.medicao = Medicao()
+
+    @app.after_request
+    def registrar_medicao(response):
+        medicao = g.pop('medicao', None)
+        if medicao is None:
+            return response
+        endpoint = request.endpoint
+
+        if response.is_streamed:
+            # O corpo (e o SQL dele, ex.: exportação) só acontece depois
+            # daqui: registra quando o servidor fechar a resposta
+            contagem = [0]
+            response.response = _contar_bytes(response.response, contagem)
+            response.call_on_close(lambda: metricas.observar(
+                endpoint, response.status_code, time.perf_counter() - medicao.inicio, contagem[0], medicao))
+            return response
+
+        duracao = time.perf_counter() - medicao.inicio
+        metricas.observar(endpoint, response.status_code, duracao, response.calculate_content_length(), medicao)
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = (
+                f'app;dur={duracao * 1000:.2f}, '
+                f'sql;desc="{medicao.sql_instrucoes} consultas";dur={medicao.sql_tempo * 1000:.2f}, '
+                f'pool;dur={medicao.aquisicao * 1000:.2f}'
+            )
+        return response
+
+    return metricas
@@ -0,0 +1,5 @@
+-- Índice para a listagem paginada de notas (ORDER BY updated_at DESC, id DESC)
+USE zetria;
+
+ALTER TABLE notas
+    ADD INDEX idx_notas_user_updated (user_id, updated_at);
@@ -0,0 +1,12 @@
+-- [[links]] cujo título ainda não existe; resolvidos quando uma nota
+-- com esse título é criada ou renomeada
+USE zetria;
+
+CREATE TABLE
+    IF NOT EXISTS links_pendentes (
+        source_nota_id INT NOT NULL,
+        target_key VARCHAR(255) NOT NULL,
+        PRIMARY KEY (source_nota_id, target_key),
+        INDEX idx_links_pendentes_key (target_key),
+        FOREIGN KEY (source_nota_id) REFERENCES notas (id) ON DELETE CASCADE
+    );
@@ -0,0 +1,10 @@
+-- Versão das notas por usuário: incrementada em toda escrita de nota e
+-- gravada na nota escrita, para os caches sincronizarem só o que mudou
+USE zetria;
+
+ALTER TABLE usuarios
+    ADD COLUMN notas_versao BIGINT NOT NULL DEFAULT 0;
+
+ALTER TABLE notas
+    ADD COLUMN versao_usuario BIGINT NOT NULL DEFAULT 0,
+    ADD INDEX idx_notas_user_versao (user_id, versao_usuario);
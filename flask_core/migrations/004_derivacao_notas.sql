@@ -0,0 +1,13 @@
+-- Pós-processamento assíncrono das notas (tags e [[links]] derivados do
+-- conteúdo). revisao é incrementada em toda escrita da nota; derivado_versao
+-- é a revisão cujas tags/links já foram aplicados e titulo_derivado o título
+-- usado nessa aplicação (o que os links de outras notas enxergam)
+USE zetria;
+
+ALTER TABLE notas
+    ADD COLUMN revisao INT NOT NULL DEFAULT 1,
+    ADD COLUMN derivado_versao INT NOT NULL DEFAULT 0,
+    ADD COLUMN titulo_derivado VARCHAR(255) NULL;
+
+-- Notas existentes já têm tags e links gravados
+UPDATE notas SET derivado_versao = revisao, titulo_derivado = title, updated_at = updated_at;
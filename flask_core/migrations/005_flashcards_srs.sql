@@ -0,0 +1,24 @@
+-- Repetição espaçada (SM-2): estado de agendamento por cartão e user_id
+-- desnormalizado para a fila de revisões ser um único range no índice
+-- (user_id, review_at), sem JOIN com notas
+USE zetria;
+
+ALTER TABLE flashcards
+    ADD COLUMN user_id INT NULL AFTER nota_id,
+    ADD COLUMN ease DOUBLE NOT NULL DEFAULT 2.5,
+    ADD COLUMN interval_days INT NOT NULL DEFAULT 0,
+    ADD COLUMN repetitions INT NOT NULL DEFAULT 0,
+    ADD COLUMN lapses INT NOT NULL DEFAULT 0,
+    ADD COLUMN last_reviewed_at TIMESTAMP NULL;
+
+UPDATE flashcards f
+JOIN notas n ON n.id = f.nota_id
+SET f.user_id = n.user_id;
+
+-- Cartões nunca agendados entram na fila a partir da criação
+UPDATE flashcards SET review_at = created_at WHERE review_at IS NULL;
+
+ALTER TABLE flashcards
+    MODIFY user_id INT NOT NULL,
+    ADD CONSTRAINT fk_flashcards_user FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE,
+    ADD INDEX idx_flashcards_user_review (user_id, review_at, id);
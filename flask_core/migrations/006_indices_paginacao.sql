@@ -0,0 +1,10 @@
+-- Índices da paginação por cursor (keyset) de flashcards e tarefas: cada
+-- página é um range no índice, sem ordenar todas as linhas do usuário
+-- (o InnoDB já inclui o id no fim de todo índice secundário)
+USE zetria;
+
+ALTER TABLE flashcards
+    ADD INDEX idx_flashcards_user_created (user_id, created_at);
+
+ALTER TABLE tasks
+    ADD INDEX idx_tasks_user_due (user_id, due_date);
@@ -0,0 +1,19 @@
+-- Tarefas recorrentes: due_date é o início da série e recurrence_rule a
+-- regra (subconjunto do RRULE); as ocorrências são expandidas na leitura.
+-- task_ocorrencias guarda só as ocorrências marcadas pelo usuário
+USE zetria;
+
+UPDATE tasks SET recurring = FALSE WHERE recurring IS NULL;
+
+ALTER TABLE tasks
+    MODIFY recurring BOOLEAN NOT NULL DEFAULT FALSE,
+    ADD INDEX idx_tasks_user_recurring (user_id, recurring, due_date);
+
+CREATE TABLE
+    IF NOT EXISTS task_ocorrencias (
+        task_id INT NOT NULL,
+        ocorrencia DATETIME NOT NULL,
+        completed BOOLEAN NOT NULL DEFAULT TRUE,
+        PRIMARY KEY (task_id, ocorrencia),
+        FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+    );
@@ -0,0 +1,11 @@
+-- Carimbos por usuário para as requisições condicionais (ETag e
+-- Last-Modified): um contador por recurso, avançado em toda escrita, e o
+-- instante da última escrita. As notas já tinham o notas_versao
+USE zetria;
+
+ALTER TABLE usuarios
+    ADD COLUMN notas_alterado_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    ADD COLUMN flashcards_versao BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN flashcards_alterado_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    ADD COLUMN tasks_versao BIGINT NOT NULL DEFAULT 0,
+    ADD COLUMN tasks_alterado_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6);
@@ -0,0 +1,24 @@
+-- Resumo das notas na própria linha, para as listas e o grafo não lerem o
+-- content: preview (os 100 primeiros caracteres, com "..." se cortado),
+-- word_count (palavras separadas por espaço) e tag_count/link_count (tags e
+-- links que a derivação aplicou). Gravados junto com cada escrita da nota
+-- (ver derivacao.preview_nota e derivacao.SQL_CONTAGENS)
+USE zetria;
+
+ALTER TABLE notas
+    ADD COLUMN preview VARCHAR(255) NOT NULL DEFAULT '',
+    ADD COLUMN word_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN tag_count INT NOT NULL DEFAULT 0,
+    ADD COLUMN link_count INT NOT NULL DEFAULT 0;
+
+-- Notas existentes. Palavras: cada sequência sem espaço vira um "x"; a
+-- diferença de tamanho com o texto sem elas é o número de sequências
+UPDATE notas
+SET preview = IF(CHAR_LENGTH(COALESCE(content, '')) > 100,
+                 CONCAT(LEFT(content, 100), '...'), COALESCE(content, '')),
+    word_count = CHAR_LENGTH(REGEXP_REPLACE(COALESCE(content, ''), '[^[:space:]]+', 'x'))
+               - CHAR_LENGTH(REGEXP_REPLACE(COALESCE(content, ''), '[^[:space:]]+', '')),
+    tag_count = (SELECT COUNT(*) FROM nota_tags WHERE nota_id = notas.id),
+    link_count = (SELECT COUNT(*) FROM links_notas WHERE source_nota_id = notas.id)
+               + (SELECT COUNT(*) FROM links_pendentes WHERE source_nota_id = notas.id),
+    updated_at = updated_at;
@@ -0,0 +1,134 @@
+import os
+import re
+from collections import Counter
+
+from flask import current_app, g, request
+
+# Orçamento de consultas por rota. Cada rota declara com @orcamento_sql
+# quantas instruções SQL pode executar por requisição no pior caso e quantas
+# vezes a mesma instrução (a mesma "forma", sem os valores) pode se repetir.
+# A repetição é o sinal de N+1: uma consulta dentro de um laço, como a busca
+# de tags nota a nota que api_listar_notas já teve.
+#
+# A verificação usa a medição da requisição (ver instrumentacao.py) e roda:
+#   - nos testes (app.testing): a requisição que estourar levanta
+#     OrcamentoSQLExcedido, e o teste falha com o relatório;
+#   - com ZETRIA_ORCAMENTO_SQL=erro ou =aviso, em qualquer ambiente (aviso
+#     só imprime o relatório);
+#   - nunca em produção sem a variável: o custo é guardar cada instrução
+#     com o local da chamada.
+# O SQL executado dentro de respostas em stream (exportação) acontece depois
+# da verificação e não entra na conta.
+
+MODO = os.environ.get('ZETRIA_ORCAMENTO_SQL', '')
+
+# Quantas vezes a mesma forma de instrução pode rodar numa requisição. Duas
+# cobre os casos legítimos (ex.: a versão do usuário lida pela rota e de novo
+# pela derivação síncrona); três já é um laço
+REPETICOES_PADRAO = 2
+
+# Pior caso da derivação de uma nota na própria requisição (sem RabbitMQ):
+# versão, pendentes, títulos, tags (5), reapontar links (6), links da nota
+# (6), UPDATE e versão
+SQL_DERIVACAO_NOTA = 22
+
+
+class OrcamentoSQLExcedido(AssertionError):
+    pass
+
+
+def orcamento_sql(maximo, repeticoes=REPETICOES_PADRAO):
+    # maximo None: rota sem limite (lotes que crescem com o cofre), mas a
+    # repetição continua verificada. repeticoes None: sem limite também de
+    # repetição, para rotas que gravam em várias transações iguais (cada
+    # lote repete as mesmas instruções)
+    def decorator(f):
+        f.orcamento_sql = (maximo, repeticoes)
+        return f
+    return decorator
+
+
+_ESPACOS = re.compile(r'\s+')
+_TEXTO = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_GRUPO = re.compile(r'\(\s*(?:(?:%s|\?)\s*,\s*)*(?:%s|\?)\s*\)')
+_GRUPOS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+
+
+def forma_sql(operacao):
+    # Instrução sem valores: literais e placeholders viram "?", listas do
+    # IN e linhas de um VALUES multi-linha viram um "(?)" só
+    if isinstance(operacao, (bytes, bytearray)):
+        operacao = operacao.decode('utf-8', 'replace')
+    forma = _ESPACOS.sub(' ', operacao).strip()
+    forma = _TEXTO.sub('?', forma)
+    forma = _NUMERO.sub('?', forma)
+    forma = _GRUPO.sub('(?)', forma)
+    return _GRUPOS.sub('(?)', forma)
+
+
+def verificar(endpoint, orcamento, instrucoes):
+    # Lista de problemas (texto) da requisição; vazia se está dentro do orçamento
+    if orcamento is None:
+        return [f'{endpoint}: rota sem @orcamento_sql ({len(instrucoes)} instruções)']
+    maximo, repeticoes = orcamento
+
+    problemas = []
+    if maximo is not None and len(instrucoes) > maximo:
+        problemas.append(f'{endpoint}: {len(instrucoes)} instruções SQL, orçamento {maximo}')
+
+    formas = Counter()
+    locais = {}
+    for operacao, local in instrucoes:
+        forma = forma_sql(operacao)
+        formas[forma] += 1
+        locais.setdefault(forma, Counter())[local] += 1
+
+    for forma, vezes in formas.most_common():
+        if repeticoes is None or vezes <= repeticoes:
+            break
+        problemas.append(f'{endpoint}: mesma instrução {vezes}x (máximo {repeticoes}), possível N+1: {forma[:200]}')
+        for local, quantas in locais[forma].most_common(3):
+            problemas.append(f'    {quantas}x em {local}')
+    return problemas
+
+
+def modo_atual():
+    if MODO in ('erro', 'aviso'):
+        return MODO
+    return 'erro' if current_app.testing else None
+
+
+def rotas_sem_orcamento(app):
+    return sorted(endpoint for endpoint, view in app.view_functions.items()
+                  if endpoint != 'static' and not hasattr(view, 'orcamento_sql'))
+
+
+def instalar(app):
+    # Depois de instrumentacao.instalar(): o before_request daqui roda depois
+    # do que cria g.medicao e o after_request antes do que a consome
+    if MODO in ('erro', 'aviso'):
+        faltando = rotas_sem_orcamento(app)
+        if faltando:
+            print(f"Rotas sem @orcamento_sql: {', '.join(faltando)}")
+
+    @app.before_request
+    def detalhar_medicao():
+        medicao = g.get('medicao')
+        if medicao is not None and modo_atual():
+            medicao.instrucoes = []
+
+    @app.after_request
+    def verificar_orcamento(response):
+        medicao = g.get('medicao')
+        if medicao is None or medicao.instrucoes is None or request.endpoint in (None, 'static'):
+            return response
+
+        view = current_app.view_functions[request.endpoint]
+        problemas = verificar(request.endpoint, getattr(view, 'orcamento_sql', None), medicao.instrucoes)
+        if problemas:
+            relatorio = '\n'.join(problemas)
+            if modo_atual() == 'erro':
+                raise OrcamentoSQLExcedido(relatorio)
+            print(f"Orçamento SQL excedido:\n{relatorio}")
+        return response
@@ -0,0 +1,318 @@
+import calendar
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Subconjunto do RRULE (RFC 5545) usado nas tarefas recorrentes:
+#   FREQ=DAILY|WEEKLY|MONTHLY|YEARLY, INTERVAL, COUNT, UNTIL,
+#   BYDAY (MO..SU, com ordinal no mensal/anual: 1MO, -1FR; no anual o
+#   ordinal conta dentro de cada mês, não dentro do ano),
+#   BYMONTHDAY (negativo conta do fim do mês) e BYMONTH.
+# A semana começa na segunda (WKST=MO). Também aceita só a frequência
+# ("daily", "weekly", ...), como o formulário grava.
+
+FREQUENCIAS = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+DIAS_SEMANA = {'MO': 0, 'TU': 1, 'WE': 2, 'TH': 3, 'FR': 4, 'SA': 5, 'SU': 6}
+
+# Uma regra que não gera nada (ex.: dia 31 em fevereiro) não pode prender a
+# expansão: desiste depois de tantos períodos seguidos sem ocorrência
+MAX_PERIODOS_VAZIOS = 2000
+
+
+class Regra:
+    """Regra de recorrência já interpretada (imutável, reaproveitada pelo cache)."""
+
+    __slots__ = ('freq', 'intervalo', 'count', 'until', 'byday', 'bymonthday', 'bymonth')
+
+    def __init__(self, freq, intervalo=1, count=None, until=None, byday=(), bymonthday=(), bymonth=()):
+        self.freq = freq
+        self.intervalo = intervalo
+        self.count = count
+        self.until = until
+        self.byday = byday            # ((ordinal ou None, dia da semana), ...)
+        self.bymonthday = bymonthday
+        self.bymonth = bymonth
+
+
+def _parse_inteiros(valor, minimo, maximo, permitir_negativo=False):
+    numeros = []
+    for parte in valor.split(','):
+        numero = int(parte)
+        if not (minimo <= abs(numero) <= maximo) or (numero < 0 and not permitir_negativo):
+            raise ValueError(f'valor fora do intervalo: {numero}')
+        numeros.append(numero)
+    return tuple(sorted(set(numeros)))
+
+
+def _parse_byday(valor):
+    dias = []
+    for parte in valor.split(','):
+        parte = parte.strip().upper()
+        codigo = parte[-2:]
+        if codigo not in DIAS_SEMANA:
+            raise ValueError(f'dia da semana inválido: {parte}')
+        ordinal = int(parte[:-2]) if parte[:-2] else None
+        if ordinal is not None and not 1 <= abs(ordinal) <= 53:
+            raise ValueError(f'ordinal inválido: {parte}')
+        dias.append((ordinal, DIAS_SEMANA[codigo]))
+    return tuple(dias)
+
+
+def _parse_until(valor):
+    valor = valor.rstrip('Z')
+    formato = '%Y%m%dT%H%M%S' if 'T' in valor else '%Y%m%d'
+    until = datetime.strptime(valor, formato)
+    if formato == '%Y%m%d':
+        # Só a data: vale o dia inteiro
+        until = until.replace(hour=23, minute=59, second=59)
+    return until
+
+
+@lru_cache(maxsize=4096)
+def parse_regra(texto):
+    # ValueError se a regra for inválida ou fora do subconjunto suportado
+    texto = (texto or '').strip()
+    if texto.upper().startswith('RRULE:'):
+        texto = texto[6:]
+    if texto.upper() in FREQUENCIAS:
+        return Regra(texto.upper())
+
+    partes = {}
+    for item in texto.split(';'):
+        if not item.strip():
+            continue
+        chave, _, valor = item.partition('=')
+        if not valor:
+            raise ValueError(f'parte inválida: {item}')
+        partes[chave.strip().upper()] = valor.strip()
+
+    freq = partes.pop('FREQ', '').upper()
+    if freq not in FREQUENCIAS:
+        raise ValueError('FREQ ausente ou não suportada')
+
+    intervalo = int(partes.pop('INTERVAL', '1'))
+    if intervalo < 1:
+        raise ValueError('INTERVAL deve ser positivo')
+    count = int(partes.pop('COUNT')) if 'COUNT' in partes else None
+    if count is not None and count < 1:
+        raise ValueError('COUNT deve ser positivo')
+    until = _parse_until(partes.pop('UNTIL')) if 'UNTIL' in partes else None
+    if count is not None and until is not None:
+        raise ValueError('COUNT e UNTIL não podem ser usados juntos')
+
+    byday = _parse_byday(partes.pop('BYDAY')) if 'BYDAY' in partes else ()
+    if any(ordinal is not None for ordinal, _ in byday) and freq not in ('MONTHLY', 'YEARLY'):
+        raise ValueError('BYDAY com ordinal só vale para MONTHLY e YEARLY')
+    bymonthday = _parse_inteiros(partes.pop('BYMONTHDAY'), 1, 31, True) if 'BYMONTHDAY' in partes else ()
+    bymonth = _parse_inteiros(partes.pop('BYMONTH'), 1, 12) if 'BYMONTH' in partes else ()
+    partes.pop('WKST', None)
+
+    if partes:
+        raise ValueError(f'partes não suportadas: {", ".join(sorted(partes))}')
+
+    return Regra(freq, intervalo, count, until, byday, bymonthday, bymonth)
+
+
+def _dias_do_mes(regra, ano, mes, dia_padrao):
+    # Dias (números) do mês que a regra seleciona, em ordem
+    total = calendar.monthrange(ano, mes)[1]
+    dias = set()
+
+    for dia in regra.bymonthday:
+        dia = dia if dia > 0 else total + dia + 1
+        if 1 <= dia <= total:
+            dias.add(dia)
+
+    if regra.byday:
+        primeiro_dia_semana = calendar.weekday(ano, mes, 1)
+        for ordinal, dia_semana in regra.byday:
+            primeiro = 1 + (dia_semana - primeiro_dia_semana) % 7
+            candidatos = list(range(primeiro, total + 1, 7))
+            if ordinal is None:
+                selecionados = candidatos
+            elif -len(candidatos) <= ordinal <= len(candidatos) and ordinal != 0:
+                selecionados = [candidatos[ordinal - 1 if ordinal > 0 else ordinal]]
+            else:
+                selecionados = []
+            # BYMONTHDAY e BYDAY juntos: interseção, como no RFC
+            if regra.bymonthday:
+                dias.intersection_update(selecionados)
+            else:
+                dias.update(selecionados)
+
+    if not regra.bymonthday and not regra.byday and dia_padrao <= total:
+        dias.add(dia_padrao)
+
+    return sorted(dias)
+
+
+def _periodo_inicial(regra, dtstart, inicio):
+    # Primeiro período que pode ter ocorrência >= inicio, para não percorrer
+    # a série desde o começo. Com COUNT é preciso contar desde o dtstart
+    if regra.count is not None or inicio <= dtstart:
+        return 0
+    if regra.freq == 'DAILY':
+        return (inicio - dtstart).days // regra.intervalo
+    if regra.freq == 'WEEKLY':
+        semana_inicial = dtstart.date() - timedelta(days=dtstart.weekday())
+        return (inicio.date() - semana_inicial).days // 7 // regra.intervalo
+    if regra.freq == 'MONTHLY':
+        meses = (inicio.year - dtstart.year) * 12 + inicio.month - dtstart.month
+        return max(0, meses // regra.intervalo)
+    return max(0, (inicio.year - dtstart.year) // regra.intervalo)
+
+
+def _inicio_periodo(regra, dtstart, periodo):
+    # Primeiro instante possível do período: se já passou do fim da janela,
+    # nenhum período seguinte tem ocorrência dentro dela
+    passo = periodo * regra.intervalo
+    if regra.freq == 'DAILY':
+        return dtstart.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=passo)
+    if regra.freq == 'WEEKLY':
+        segunda = dtstart.date() - timedelta(days=dtstart.weekday()) + timedelta(weeks=passo)
+        return datetime.combine(segunda, datetime.min.time())
+    if regra.freq == 'MONTHLY':
+        ano, mes = divmod(dtstart.year * 12 + dtstart.month - 1 + passo, 12)
+        return datetime(ano, mes + 1, 1)
+    return datetime(dtstart.year + passo, 1, 1)
+
+
+def _candidatos(regra, dtstart, periodo):
+    # Datas do período (em ordem), antes dos filtros de dtstart/until/count
+    hora = dtstart.time()
+    passo = periodo * regra.intervalo
+
+    if regra.freq == 'DAILY':
+        dia = dtstart + timedelta(days=passo)
+        if regra.bymonth and dia.month not in regra.bymonth:
+            return []
+        if regra.byday and dia.weekday() not in {d for _, d in regra.byday}:
+            return []
+        if regra.bymonthday and dia.day not in _dias_do_mes(regra, dia.year, dia.month, dia.day):
+            return []
+        return [dia]
+
+    if regra.freq == 'WEEKLY':
+        segunda = dtstart.date() - timedelta(days=dtstart.weekday()) + timedelta(weeks=passo)
+        dias_semana = sorted({d for _, d in regra.byday}) or [dtstart.weekday()]
+        datas = []
+        for dia_semana in dias_semana:
+            dia = segunda + timedelta(days=dia_semana)
+            if not regra.bymonth or dia.month in regra.bymonth:
+                datas.append(datetime.combine(dia, hora))
+        return datas
+
+    if regra.freq == 'MONTHLY':
+        indice = dtstart.year * 12 + dtstart.month - 1 + passo
+        ano, mes = divmod(indice, 12)
+        mes += 1
+        if regra.bymonth and mes not in regra.bymonth:
+            return []
+        return [datetime.combine(datetime(ano, mes, dia).date(), hora)
+                for dia in _dias_do_mes(regra, ano, mes, dtstart.day)]
+
+    ano = dtstart.year + passo
+    if ano > datetime.max.year:
+        return []
+    datas = []
+    for mes in regra.bymonth or (dtstart.month,):
+        datas.extend(datetime.combine(datetime(ano, mes, dia).date(), hora)
+                     for dia in _dias_do_mes(regra, ano, mes, dtstart.day))
+    return datas
+
+
+def _ocorrencias_diarias(regra, dtstart, inicio, fim):
+    # DAILY sem filtros: progressão aritmética, sem montar períodos
+    passo = timedelta(days=regra.intervalo)
+    primeiro = 0
+    if regra.count is None and inicio > dtstart:
+        primeiro = -(-(inicio - dtstart) // passo)  # teto da divisão
+    limite = fim if regra.until is None else min(fim, regra.until + timedelta(microseconds=1))
+    if regra.count is not None:
+        limite = min(limite, dtstart + passo * regra.count)
+
+    data = dtstart + passo * primeiro
+    while data < limite:
+        if data >= inicio:
+            yield data
+        data += passo
+
+
+def ocorrencias(regra, dtstart, inicio, fim):
+    # Gerador das ocorrências em [inicio, fim), em ordem, sem materializar a série
+    if regra.freq == 'DAILY' and not (regra.byday or regra.bymonthday or regra.bymonth):
+        yield from _ocorrencias_diarias(regra, dtstart, inicio, fim)
+        return
+
+    contadas = 0
+    periodo = _periodo_inicial(regra, dtstart, inicio)
+    vazios = 0
+
+    while vazios < MAX_PERIODOS_VAZIOS:
+        try:
+            if _inicio_periodo(regra, dtstart, periodo) >= fim:
+                return
+            datas = _candidatos(regra, dtstart, periodo)
+        except (OverflowError, ValueError):
+            return
+        periodo += 1
+
+        if not datas:
+            vazios += 1
+            continue
+        vazios = 0
+
+        for data in datas:
+            if data < dtstart:
+                continue
+            if data >= fim or (regra.until is not None and data > regra.until):
+                return
+            contadas += 1
+            if data >= inicio:
+                yield data
+            if regra.count is not None and contadas >= regra.count:
+                return
+
+
+def eh_ocorrencia(regra, dtstart, data):
+    for ocorrencia in ocorrencias(regra, dtstart, data, data + timedelta(seconds=1)):
+        return ocorrencia == data
+    return False
+
+
+class CacheOcorrencias:
+    """LRU das expansões por (regra, dtstart, janela).
+
+    A chave inclui o texto da regra e o dtstart, então editar a tarefa muda
+    a chave e a entrada antiga só envelhece até sair; não há invalidação.
+    """
+
+    def __init__(self, max_entries=20_000):
+        self.max_entries = max_entries
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def expandir(self, texto_regra, dtstart, inicio, fim):
+        chave = (texto_regra, dtstart, inicio, fim)
+        with self._lock:
+            resultado = self._entradas.get(chave)
+            if resultado is not None:
+                self._entradas.move_to_end(chave)
+                self.hits += 1
+                return resultado
+            self.misses += 1
+
+        resultado = tuple(ocorrencias(parse_regra(texto_regra), dtstart, inicio, fim))
+
+        with self._lock:
+            self._entradas[chave] = resultado
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+        return resultado
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entradas), 'hits': self.hits, 'misses': self.misses}
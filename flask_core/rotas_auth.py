@@ -0,0 +1,134 @@
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, flash, redirect, render_template, request, session, url_for
+from mysql.connector import Error
+
+from banco import get_db_connection
+from orcamentos import orcamento_sql
+
+bp = Blueprint('auth', __name__)
+
+def hash_password(password):
+    
+    return hashlib.sha256(password.encode()).hexdigest()
+
+# ROTAS DE AUTENTICAÇÃO
+
+@bp.route('/')
+@orcamento_sql(0)
+def index():
+    
+    if 'user_id' in session:
+        return redirect(url_for('paginas.dashboard'))
+    return redirect(url_for('auth.login'))
+
+@bp.route('/login', methods=['GET', 'POST'])
+@orcamento_sql(1)
+def login():
+   
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '')
+        
+        if not username or not password:
+            flash('Por favor, preencha todos os campos', 'error')
+            return render_template('login.html')
+        
+        connection = get_db_connection()
+        if not connection:
+            flash('Erro de conexão com o banco de dados', 'error')
+            return render_template('login.html')
+        
+        try:
+            cursor = connection.cursor(dictionary=True)
+            hashed_password = hash_password(password)
+            
+            cursor.execute(
+                "SELECT id, username FROM usuarios WHERE username = %s AND password_hash = %s",
+                (username, hashed_password)
+            )
+            user = cursor.fetchone()
+            
+            if user:
+                session['user_id'] = user['id']
+                session['username'] = user['username']
+                flash('Login realizado com sucesso!', 'success')
+                return redirect(url_for('paginas.dashboard'))
+            else:
+                flash('Usuário ou senha incorretos', 'error')
+                
+        except Error as e:
+            print(f"Erro no login: {e}")
+            flash('Erro interno do servidor', 'error')
+        finally:
+            cursor.close()
+    
+    return render_template('login.html')
+
+@bp.route('/cadastro', methods=['GET', 'POST'])
+@orcamento_sql(2)
+def cadastro():
+    
+    if request.method == 'POST':
+        username = request.form.get('username', '').strip()
+        password = request.form.get('password', '')
+        confirm_password = request.form.get('confirm_password', '')
+        
+        # Validações
+        if not username or not password or not confirm_password:
+            flash('Por favor, preencha todos os campos', 'error')
+            return render_template('Cadastro.html')
+        
+        if len(username) < 3:
+            flash('O nome de usuário deve ter pelo menos 3 caracteres', 'error')
+            return render_template('Cadastro.html')
+        
+        if len(password) < 6:
+            flash('A senha deve ter pelo menos 6 caracteres', 'error')
+            return render_template('Cadastro.html')
+        
+        if password != confirm_password:
+            flash('As senhas não coincidem', 'error')
+            return render_template('Cadastro.html')
+        
+        connection = get_db_connection()
+        if not connection:
+            flash('Erro de conexão com o banco de dados', 'error')
+            return render_template('Cadastro.html')
+        
+        try:
+            cursor = connection.cursor()
+            
+            # Verificar se usuário já existe
+            cursor.execute("SELECT id FROM usuarios WHERE username = %s", (username,))
+            if cursor.fetchone():
+                flash('Este nome de usuário já está em uso', 'error')
+                return render_template('Cadastro.html')
+            
+            # Criar novo usuário
+            hashed_password = hash_password(password)
+            cursor.execute(
+                "INSERT INTO usuarios (username, password_hash, created_at) VALUES (%s, %s, %s)",
+                (username, hashed_password, datetime.now())
+            )
+            connection.commit()
+            
+            flash('Conta criada com sucesso! Faça login para continuar.', 'success')
+            return redirect(url_for('auth.login'))
+            
+        except Error as e:
+            print(f"Erro no cadastro: {e}")
+            flash('Erro interno do servidor', 'error')
+        finally:
+            cursor.close()
+    
+    return render_template('Cadastro.html')
+
+@bp.route('/logout')
+@orcamento_sql(0)
+def logout():
+   
+    session.clear()
+    flash('Logout realizado com sucesso!', 'success')
+    return redirect(url_for('auth.login'))
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
+from mysql.connector import Error
+
+from banco import get_db_connection
+from cofre import exportar, importar
+from orcamentos import orcamento_sql
+from web import require_login
+
+bp = Blueprint('cofre', __name__)
+
+# EXPORTAÇÃO E IMPORTAÇÃO DO COFRE (ver cofre.py)
+
+@bp.route('/api/exportar', methods=['GET'])
+@require_login
+@orcamento_sql(None)
+def api_exportar():
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    user_id = session['user_id']
+    
+    def linhas():
+        # Um erro no meio não tem como virar status HTTP: o arquivo fica sem
+        # o registro "fim", que é como o cliente reconhece a exportação cortada
+        try:
+            yield from exportar(connection, user_id)
+        except Error as e:
+            print(f"Erro ao exportar cofre: {e}")
+    
+    # stream_with_context mantém a conexão da requisição até o fim do stream
+    response = Response(stream_with_context(linhas()), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = f'attachment; filename="zetria-{datetime.now():%Y%m%d}.ndjson"'
+    return response
+
+@bp.route('/api/importar', methods=['POST'])
+@require_login
+@orcamento_sql(None, repeticoes=None)
+def api_importar():
+    
+    # Corpo NDJSON no formato de /api/exportar, lido linha a linha do stream.
+    # Uma transação por lote, cada uma lendo e avançando notas_versao: daí o
+    # orçamento sem limite também de repetição
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        resumo = importar(connection, session['user_id'], request.stream)
+        return jsonify({**resumo, 'success': True})
+        
+    except Error as e:
+        # Os lotes anteriores ao erro já foram gravados
+        print(f"Erro ao importar cofre: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
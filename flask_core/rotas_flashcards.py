@@ -0,0 +1,405 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, session
+from mysql.connector import Error
+
+from banco import get_db_connection
+from orcamentos import orcamento_sql
+from serializacao import resposta_json
+from srs import agendar, parse_nota_resposta
+from versoes import avancar_versao_recurso
+from web import com_validadores, decode_cursor, encode_cursor, nao_modificada, parse_fields, parse_limit, require_login, select_fields, validadores_recursos
+
+bp = Blueprint('flashcards', __name__)
+
+# API CRUD FLASHCARDS
+
+# Campos de ?fields= na listagem de flashcards -> coluna
+FLASHCARD_COLUNAS = {
+    'id': 'f.id',
+    'nota_id': 'f.nota_id',
+    'front_content': 'f.front_content',
+    'back_content': 'f.back_content',
+    'audio_path': 'f.audio_path',
+    'created_at': 'f.created_at',
+    'review_at': 'f.review_at',
+    'ease': 'f.ease',
+    'interval_days': 'f.interval_days',
+    'repetitions': 'f.repetitions',
+    'lapses': 'f.lapses',
+    'last_reviewed_at': 'f.last_reviewed_at',
+    'nota_title': 'n.title',
+}
+
+@bp.route('/api/flashcards', methods=['GET'])
+@require_login
+@orcamento_sql(2)
+def api_listar_flashcards():
+    
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor_pos = decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros de paginação inválidos', 'success': False}), 400
+    
+    try:
+        campos = parse_fields(request.args.get('fields'), FLASHCARD_COLUNAS)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # nota_title vem das notas (e apagar uma nota apaga os flashcards dela)
+        etag, alterado_em = validadores_recursos(cursor, 'flashcards', ('flashcards', 'notas'),
+                                                 request.query_string.decode())
+        resposta = nao_modificada(etag, alterado_em)
+        if resposta:
+            return resposta
+        
+        # JOIN com notas só quando o título da nota foi pedido
+        join = 'JOIN notas n ON f.nota_id = n.id' if 'nota_title' in campos else ''
+        
+        filtro = ''
+        params = [session['user_id']]
+        if cursor_pos:
+            cursor_created_at, cursor_id = cursor_pos
+            filtro = 'AND (f.created_at < %s OR (f.created_at = %s AND f.id < %s))'
+            params += [cursor_created_at, cursor_created_at, cursor_id]
+        
+        # Keyset em idx_flashcards_user_created; limit + 1 para saber se há próxima página
+        cursor.execute(f"""
+            SELECT {select_fields(campos, FLASHCARD_COLUNAS, ('id', 'created_at'))}
+            FROM flashcards f
+            {join}
+            WHERE f.user_id = %s {filtro}
+            ORDER BY f.created_at DESC, f.id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        
+        flashcards = cursor.fetchall()
+        
+        next_cursor = None
+        if len(flashcards) > limit:
+            flashcards = flashcards[:limit]
+            ultimo = flashcards[-1]
+            next_cursor = encode_cursor(ultimo['created_at'], ultimo['id'])
+        
+        # Chaves da ordenação que não foram pedidas
+        sobrando = [c for c in ('id', 'created_at') if c not in campos]
+        if sobrando:
+            for flashcard in flashcards:
+                for campo in sobrando:
+                    del flashcard[campo]
+        
+        return com_validadores(resposta_json({'flashcards': flashcards, 'next_cursor': next_cursor, 'success': True}),
+                               etag, alterado_em)
+        
+    except Error as e:
+        print(f"Erro ao listar flashcards: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/flashcards', methods=['POST'])
+@require_login
+@orcamento_sql(4)
+def api_criar_flashcard():
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    nota_id = data.get('nota_id')
+    front_content = data.get('front_content', '').strip()
+    back_content = data.get('back_content', '').strip()
+    
+    if not nota_id or not front_content or not back_content:
+        return jsonify({'error': 'Nota ID, frente e verso são obrigatórios', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Verificar se a nota pertence ao usuário
+        cursor.execute("""
+            SELECT id FROM notas WHERE id = %s AND user_id = %s
+        """, (nota_id, session['user_id']))
+        
+        if not cursor.fetchone():
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # Inserir novo flashcard (já entra na fila de revisão)
+        now = datetime.now()
+        cursor.execute("""
+            INSERT INTO flashcards (nota_id, user_id, front_content, back_content, created_at, review_at)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, (nota_id, session['user_id'], front_content, back_content, now, now))
+        
+        flashcard_id = cursor.lastrowid
+        avancar_versao_recurso(cursor, session['user_id'], 'flashcards')
+        connection.commit()
+        
+        # Retornar flashcard criado
+        cursor.execute("""
+            SELECT f.id, f.front_content, f.back_content, f.audio_path, 
+                   f.created_at, f.review_at, n.title as nota_title
+            FROM flashcards f
+            JOIN notas n ON f.nota_id = n.id
+            WHERE f.id = %s
+        """, (flashcard_id,))
+        
+        novo_flashcard = cursor.fetchone()
+        
+        return resposta_json({'flashcard': novo_flashcard, 'success': True}, 201)
+        
+    except Error as e:
+        print(f"Erro ao criar flashcard: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/flashcards/<int:flashcard_id>', methods=['GET'])
+@require_login
+@orcamento_sql(1)
+def api_obter_flashcard(flashcard_id):
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Buscar flashcard
+        cursor.execute("""
+            SELECT f.id, f.front_content, f.back_content, f.audio_path, 
+                   f.created_at, f.review_at, n.title as nota_title
+            FROM flashcards f
+            JOIN notas n ON f.nota_id = n.id
+            WHERE f.id = %s AND n.user_id = %s
+        """, (flashcard_id, session['user_id']))
+        
+        flashcard = cursor.fetchone()
+        if not flashcard:
+            return jsonify({'error': 'Flashcard não encontrado', 'success': False}), 404
+        
+        return resposta_json({'flashcard': flashcard, 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao obter flashcard: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/flashcards/<int:flashcard_id>', methods=['PUT'])
+@require_login
+@orcamento_sql(3)
+def api_atualizar_flashcard(flashcard_id):
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    front_content = data.get('front_content', '').strip()
+    back_content = data.get('back_content', '').strip()
+    
+    if not front_content or not back_content:
+        return jsonify({'error': 'Frente e verso são obrigatórios', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Verifica se o flashcard existe e pertence ao usuário
+        cursor.execute("""
+            SELECT f.id FROM flashcards f
+            JOIN notas n ON f.nota_id = n.id
+            WHERE f.id = %s AND n.user_id = %s
+        """, (flashcard_id, session['user_id']))
+        
+        if not cursor.fetchone():
+            return jsonify({'error': 'Flashcard não encontrado', 'success': False}), 404
+        
+        # Atualizar flashcard
+        cursor.execute("""
+            UPDATE flashcards
+            SET front_content = %s, back_content = %s
+            WHERE id = %s
+        """, (front_content, back_content, flashcard_id))
+        
+        avancar_versao_recurso(cursor, session['user_id'], 'flashcards')
+        connection.commit()
+        
+        return jsonify({'message': 'Flashcard atualizado com sucesso', 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao atualizar flashcard: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/flashcards/<int:flashcard_id>', methods=['DELETE'])
+@require_login
+@orcamento_sql(3)
+def api_deletar_flashcard(flashcard_id):
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor()
+        
+        # Verificar se o flashcard existe e pertence ao usuário
+        cursor.execute("""
+            SELECT f.id FROM flashcards f
+            JOIN notas n ON f.nota_id = n.id
+            WHERE f.id = %s AND n.user_id = %s
+        """, (flashcard_id, session['user_id']))
+        
+        if not cursor.fetchone():
+            return jsonify({'error': 'Flashcard não encontrado', 'success': False}), 404
+        
+        # Deletar flashcard
+        cursor.execute("DELETE FROM flashcards WHERE id = %s", (flashcard_id,))
+        avancar_versao_recurso(cursor, session['user_id'], 'flashcards')
+        connection.commit()
+        
+        return jsonify({'message': 'Flashcard deletado com sucesso', 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao deletar flashcard: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+# REPETIÇÃO ESPAÇADA (ver srs.py)
+
+FLASHCARDS_DUE_LIMIT_DEFAULT = 20
+
+@bp.route('/api/flashcards/due', methods=['GET'])
+@require_login
+@orcamento_sql(2)
+def api_flashcards_due():
+    
+    try:
+        limit = parse_limit(request.args.get('limit', FLASHCARDS_DUE_LIMIT_DEFAULT))
+    except ValueError:
+        return jsonify({'error': 'Parâmetro limit inválido', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        now = datetime.now()
+        
+        # Um range em idx_flashcards_user_review, já na ordem do índice;
+        # o JOIN só busca o título das N linhas devolvidas
+        cursor.execute("""
+            SELECT f.id, f.nota_id, f.front_content, f.back_content, f.audio_path,
+                   f.review_at, f.ease, f.interval_days, f.repetitions, f.lapses,
+                   n.title AS nota_title
+            FROM flashcards f
+            JOIN notas n ON n.id = f.nota_id
+            WHERE f.user_id = %s AND f.review_at <= %s
+            ORDER BY f.review_at, f.id
+            LIMIT %s
+        """, (session['user_id'], now, limit))
+        
+        flashcards = cursor.fetchall()
+        
+        # Sem cartões vencidos: quando vence o próximo
+        next_review_at = None
+        if not flashcards:
+            cursor.execute("""
+                SELECT MIN(review_at) AS proxima FROM flashcards
+                WHERE user_id = %s AND review_at > %s
+            """, (session['user_id'], now))
+            next_review_at = cursor.fetchone()['proxima']
+        
+        return resposta_json({'flashcards': flashcards, 'next_review_at': next_review_at, 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao listar flashcards para revisão: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/flashcards/<int:flashcard_id>/review', methods=['POST'])
+@require_login
+@orcamento_sql(3)
+def api_revisar_flashcard(flashcard_id):
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    # grade: 'again', 'hard', 'medium', 'easy' ou a nota SM-2 de 0 a 5
+    try:
+        nota_resposta = parse_nota_resposta(data.get('grade'))
+    except ValueError:
+        return jsonify({'error': 'Avaliação inválida', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # FOR UPDATE: duas revisões simultâneas do mesmo cartão não se perdem
+        cursor.execute("""
+            SELECT id, ease, interval_days, repetitions FROM flashcards
+            WHERE id = %s AND user_id = %s
+            FOR UPDATE
+        """, (flashcard_id, session['user_id']))
+        
+        flashcard = cursor.fetchone()
+        if not flashcard:
+            connection.rollback()
+            return jsonify({'error': 'Flashcard não encontrado', 'success': False}), 404
+        
+        now = datetime.now()
+        ease, intervalo, repeticoes, lapso, review_at = agendar(
+            flashcard['ease'], flashcard['interval_days'], flashcard['repetitions'], nota_resposta, now
+        )
+        
+        cursor.execute("""
+            UPDATE flashcards
+            SET ease = %s, interval_days = %s, repetitions = %s, lapses = lapses + %s,
+                review_at = %s, last_reviewed_at = %s
+            WHERE id = %s
+        """, (ease, intervalo, repeticoes, int(lapso), review_at, now, flashcard_id))
+        avancar_versao_recurso(cursor, session['user_id'], 'flashcards')
+        connection.commit()
+        
+        return jsonify({
+            'flashcard': {
+                'id': flashcard_id,
+                'ease': ease,
+                'interval_days': intervalo,
+                'repetitions': repeticoes,
+                'review_at': review_at,
+                'last_reviewed_at': now
+            },
+            'success': True
+        })
+        
+    except Error as e:
+        print(f"Erro ao revisar flashcard: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
@@ -0,0 +1,258 @@
+from flask import Blueprint, current_app, jsonify, request, session
+from mysql.connector import Error
+
+from banco import get_db_connection
+from derivacao import versao_notas_usuario
+from estado import grafo_cache
+from grafo_cache import GrafoUsuario
+from orcamentos import orcamento_sql
+from serializacao import resposta_json, resposta_json_stream
+from web import comprimir_resposta, escolher_encoding, make_etag, parse_bool_arg, require_login
+
+bp = Blueprint('grafos', __name__)
+
+# Campos opcionais das notas no formato compacto de /api/grafos
+GRAFO_CAMPOS_COMPACTO = ('preview', 'created_at')
+
+def load_grafo(cursor, user_id):
+    
+    cursor.execute("""
+        SELECT id, title, preview, created_at
+        FROM notas
+        WHERE user_id = %s
+    """, (user_id,))
+    
+    notas = cursor.fetchall()
+    
+    cursor.execute("""
+        SELECT nt.nota_id, t.id AS tag_id, t.name
+        FROM nota_tags nt
+        JOIN notas n ON nt.nota_id = n.id
+        JOIN tags t ON t.id = nt.tag_id
+        WHERE n.user_id = %s
+    """, (user_id,))
+    
+    relacionamentos = cursor.fetchall()
+    
+    cursor.execute("""
+        SELECT l.source_nota_id, l.target_nota_id
+        FROM links_notas l
+        JOIN notas n ON l.source_nota_id = n.id
+        WHERE n.user_id = %s
+    """, (user_id,))
+    
+    return GrafoUsuario.from_rows(notas, relacionamentos, cursor.fetchall())
+
+def get_grafo(cursor, user_id, derivar=GrafoUsuario.nodes_edges, versao=None):
+    
+    # derivar escolhe a forma: payload (nodes, edges) ou a CSR do motor de consultas
+    if versao is None:
+        versao = versao_notas_usuario(cursor, user_id)
+    
+    resultado = grafo_cache.get(user_id, versao, derivar)
+    if resultado is None:
+        grafo = load_grafo(cursor, user_id)
+        resultado = derivar(grafo)
+        grafo_cache.put(user_id, versao, grafo)
+    return resultado
+
+@bp.route('/api/grafos', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_grafos():
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # ?formato=compacto: arrays colunares e arestas como pares de índices;
+        # ?campos=preview,created_at escolhe os campos opcionais das notas
+        compacto = request.args.get('formato') == 'compacto'
+        campos = ()
+        if compacto:
+            campos = tuple(sorted({c.strip() for c in request.args.get('campos', '').split(',') if c.strip()}))
+            invalidos = [c for c in campos if c not in GRAFO_CAMPOS_COMPACTO]
+            if invalidos:
+                return jsonify({'error': f'Campos inválidos: {", ".join(invalidos)}', 'success': False}), 400
+        
+        encoding = escolher_encoding()
+        
+        # Requisição condicional: se nada mudou, responde 304 sem montar o grafo.
+        # O ETag muda com o formato e a codificação (representações diferentes)
+        versao = versao_notas_usuario(cursor, session['user_id'])
+        etag = make_etag('grafo', session['user_id'], versao,
+                         'compacto' if compacto else 'objetos', ','.join(campos), encoding)
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        elif compacto:
+            payload = get_grafo(cursor, session['user_id'],
+                                derivar=lambda grafo: grafo.compacto(campos), versao=versao)
+            response = resposta_json(dict(payload, formato='compacto', success=True))
+        else:
+            nodes, edges = get_grafo(cursor, session['user_id'], versao=versao)
+            response = resposta_json({'nodes': nodes, 'edges': edges, 'success': True})
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return comprimir_resposta(response, encoding)
+        
+    except Error as e:
+        print(f"Erro ao obter grafo: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/grafos/nodes', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_grafos_nodes():
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        nodes, _ = get_grafo(cursor, session['user_id'])
+        return resposta_json_stream('nodes', nodes, {'success': True})
+        
+    except Error as e:
+        print(f"Erro ao obter nós do grafo: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/grafos/edges', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_grafos_edges():
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        _, edges = get_grafo(cursor, session['user_id'])
+        return resposta_json_stream('edges', edges, {'success': True})
+        
+    except Error as e:
+        print(f"Erro ao obter arestas do grafo: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+# CONSULTAS NO GRAFO
+
+GRAFO_MAX_SALTOS = 3
+
+GRAFO_MAX_VIZINHANCA = 2000
+
+@bp.route('/api/grafos/backlinks/<int:nota_id>', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_grafos_backlinks(nota_id):
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        csr = get_grafo(cursor, session['user_id'], GrafoUsuario.csr)
+        
+        if csr.vertice_nota(nota_id) is None:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        return resposta_json({'nota_id': nota_id, 'backlinks': csr.backlinks(nota_id), 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao obter backlinks: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/grafos/vizinhanca/<int:nota_id>', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_grafos_vizinhanca(nota_id):
+    
+    try:
+        k = int(request.args.get('k', 1))
+        limite = int(request.args.get('limit', 500))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros inválidos', 'success': False}), 400
+    
+    if not 1 <= k <= GRAFO_MAX_SALTOS or limite < 1:
+        return jsonify({'error': f'k deve estar entre 1 e {GRAFO_MAX_SALTOS}', 'success': False}), 400
+    
+    # tags=0 percorre só os links entre notas
+    com_tags = parse_bool_arg('tags')
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        csr = get_grafo(cursor, session['user_id'], GrafoUsuario.csr)
+        
+        if csr.vertice_nota(nota_id) is None:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        distancias = csr.vizinhanca(nota_id, k, com_tags, min(limite, GRAFO_MAX_VIZINHANCA))
+        nodes, edges = csr.subgrafo(list(distancias))
+        nodes = [dict(node, distance=distancia) for node, distancia in zip(nodes, distancias.values())]
+        
+        return resposta_json({'nodes': nodes, 'edges': edges, 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao obter vizinhança: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/grafos/caminho', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_grafos_caminho():
+    
+    try:
+        origem_id = int(request.args['origem'])
+        destino_id = int(request.args['destino'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'origem e destino são obrigatórios', 'success': False}), 400
+    
+    com_tags = parse_bool_arg('tags')
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        csr = get_grafo(cursor, session['user_id'], GrafoUsuario.csr)
+        
+        if csr.vertice_nota(origem_id) is None or csr.vertice_nota(destino_id) is None:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        caminho = csr.caminho(origem_id, destino_id, com_tags)
+        if caminho is None:
+            return resposta_json({'caminho': [], 'edges': [], 'distance': None, 'success': True})
+        
+        nodes, edges = csr.subgrafo(caminho)
+        
+        # Só as arestas consecutivas do caminho
+        consecutivas = {frozenset((csr.nodes[a]['id'], csr.nodes[b]['id'])) for a, b in zip(caminho, caminho[1:])}
+        edges = [edge for edge in edges if frozenset((edge['from'], edge['to'])) in consecutivas]
+        
+        return resposta_json({'caminho': nodes, 'edges': edges, 'distance': len(caminho) - 1, 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao calcular caminho: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
@@ -0,0 +1,673 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, session
+from mysql.connector import Error
+
+from banco import get_db_connection
+from buffer_notas import CONFLITO, GUARDADO, Pendente
+from busca import parse_consulta, snippet
+from deltas import aplicar_deltas, delta_unico, normalizar_deltas
+from derivacao import avancar_versao_notas, contar_palavras, extract_tags, preview_nota, versao_notas_usuario
+from escrita_notas import COLUNAS_NOTA, gravar_nota
+from estado import agendar_derivacao, buffer_notas, busca_cache, fetch_tags_por_nota, get_titulo_index, grafo_cache, titulo_cache
+from orcamentos import SQL_DERIVACAO_NOTA, orcamento_sql
+from serializacao import resposta_json
+from web import com_validadores, decode_cursor, decode_offset_cursor, encode_cursor, encode_offset_cursor, make_etag, nao_modificada, parse_limit, require_login, validadores_recursos
+from wikilinks import sync_escrita_nota
+
+bp = Blueprint('notas', __name__)
+
+# API CRUD NOTAS
+
+@bp.route('/api/notas', methods=['GET'])
+@require_login
+@orcamento_sql(3)
+def api_listar_notas():
+   
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor_pos = decode_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros de paginação inválidos', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        etag, alterado_em = validadores_recursos(cursor, 'notas', ('notas',), request.query_string.decode())
+        resposta = nao_modificada(etag, alterado_em)
+        if resposta:
+            return resposta
+        
+        filtro = ''
+        params = [session['user_id']]
+        if cursor_pos:
+            cursor_updated_at, cursor_id = cursor_pos
+            filtro = 'AND (n.updated_at < %s OR (n.updated_at = %s AND n.id < %s))'
+            params += [cursor_updated_at, cursor_updated_at, cursor_id]
+        
+        # Busca limit + 1 para saber se existe próxima página
+        # Só o resumo das notas, nunca o content: o corpo vem de
+        # /api/notas/<id> (o parâmetro content=0 de antes não muda mais nada)
+        cursor.execute(f"""
+            SELECT n.id, n.title, n.preview, n.word_count, n.tag_count, n.link_count,
+                   n.created_at, n.updated_at
+            FROM notas n
+            WHERE n.user_id = %s {filtro}
+            ORDER BY n.updated_at DESC, n.id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        
+        notas = cursor.fetchall()
+        
+        next_cursor = None
+        if len(notas) > limit:
+            notas = notas[:limit]
+            ultima = notas[-1]
+            next_cursor = encode_cursor(ultima['updated_at'], ultima['id'])
+        
+        # Tags de todas as notas da página em uma única consulta
+        tags_por_nota = fetch_tags_por_nota(cursor, [nota['id'] for nota in notas])
+        
+        for nota in notas:
+            nota['tags'] = tags_por_nota.get(nota['id'], [])
+        
+        return com_validadores(resposta_json({'notas': notas, 'next_cursor': next_cursor, 'success': True}),
+                               etag, alterado_em)
+        
+    except Error as e:
+        print(f"Erro ao listar notas: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/notas/search', methods=['GET'])
+@require_login
+@orcamento_sql(6)
+def api_buscar_notas():
+    
+    consulta = request.args.get('q', '').strip()
+    termos, tags = parse_consulta(consulta)
+    if not termos and not tags:
+        return jsonify({'error': 'Informe termos ou #tags para buscar', 'success': False}), 400
+    
+    # Resultados ranqueados não têm chave estável: o cursor guarda a posição
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        offset = decode_offset_cursor(request.args.get('cursor'))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros de paginação inválidos', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        user_id = session['user_id']
+        
+        versao = versao_notas_usuario(cursor, user_id)
+        indice, lock = busca_cache.get(user_id)
+        with lock:
+            sincronizado = indice.versao != versao
+            if sincronizado:
+                indice.sincronizar(cursor, user_id, versao)
+            ranking = indice.buscar(termos, tags)
+        if sincronizado:
+            busca_cache.liberar_espaco()
+        
+        pagina = ranking[offset:offset + limit]
+        next_cursor = encode_offset_cursor(offset + limit) if offset + limit < len(ranking) else None
+        
+        # Conteúdo só das notas da página, para os trechos
+        notas = {}
+        if pagina:
+            ids = [nota_id for _, nota_id in pagina]
+            placeholders = ','.join(['%s'] * len(ids))
+            cursor.execute(f"""
+                SELECT id, title, content, updated_at
+                FROM notas
+                WHERE user_id = %s AND id IN ({placeholders})
+            """, [user_id] + ids)
+            notas = {row['id']: row for row in cursor.fetchall()}
+        tags_por_nota = fetch_tags_por_nota(cursor, list(notas))
+        
+        resultados = []
+        for score, nota_id in pagina:
+            nota = notas.get(nota_id)
+            if nota is None:
+                continue
+            resultados.append({
+                'id': nota_id,
+                'title': nota['title'],
+                'snippet': snippet(nota['content'], termos),
+                'score': round(score, 4),
+                'tags': tags_por_nota.get(nota_id, []),
+                'updated_at': nota['updated_at']
+            })
+        
+        return resposta_json({
+            'resultados': resultados,
+            'total': len(ranking),
+            'next_cursor': next_cursor,
+            'success': True
+        })
+        
+    except Error as e:
+        print(f"Erro ao buscar notas: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/notas', methods=['POST'])
+@require_login
+@orcamento_sql(4 + SQL_DERIVACAO_NOTA)
+def api_criar_nota():
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    title = data.get('title', '').strip()
+    content = data.get('content', '').strip()
+    
+    if not title or not content:
+        return jsonify({'error': 'Título e conteúdo são obrigatórios', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        now = datetime.now()
+        user_id = session['user_id']
+        
+        # Versão antes/depois da escrita, na mesma transação, para o patch dos caches
+        versao_antes = versao_notas_usuario(cursor, user_id, para_escrita=True)
+        versao_depois = versao_antes + 1
+        
+        # Inserir nova nota; tags e links ficam para a derivação (derivado_versao 0)
+        cursor.execute("""
+            INSERT INTO notas (user_id, title, content, preview, word_count, created_at, updated_at,
+                               versao_usuario, revisao, derivado_versao)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, 1, 0)
+        """, (session['user_id'], title, content, preview_nota(content), contar_palavras(content),
+              now, now, versao_depois))
+        
+        nota_id = cursor.lastrowid
+        
+        avancar_versao_notas(cursor, user_id, versao_depois)
+        
+        connection.commit()
+        
+        # Os títulos derivados não mudaram: só avança a versão do índice
+        titulo_cache.patch(user_id, versao_antes, versao_depois, lambda indice: None)
+        
+        # Retornar nota criada
+        cursor.execute("""
+            SELECT id, title, content, preview, word_count, tag_count, link_count,
+                   created_at, updated_at, revisao
+            FROM notas WHERE id = %s
+        """, (nota_id,))
+        
+        nova_nota = cursor.fetchone()
+        
+        nota_grafo = dict(nova_nota)
+        grafo_cache.patch(user_id, versao_antes, versao_depois,
+                          lambda grafo: grafo.upsert_nota(nota_grafo))
+        busca_cache.patch(user_id, versao_antes, versao_depois,
+                          lambda indice: indice.upsert(nota_id, title, content, nota_grafo['updated_at']))
+        
+        pendente = agendar_derivacao(connection, cursor, user_id, nota_id)
+        
+        # Tags que a derivação vai gravar
+        nova_nota['tags'] = extract_tags(content)
+        nova_nota['derivado_versao'] = 0 if pendente else nova_nota['revisao']
+        nova_nota['derivacao_pendente'] = pendente
+        
+        return resposta_json({'nota': nova_nota, 'success': True}, 201)
+        
+    except Error as e:
+        print(f"Erro ao criar nota: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/notas/<int:nota_id>', methods=['GET'])
+@require_login
+@orcamento_sql(3)
+def api_obter_nota(nota_id):
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Carimbo da nota: versao_usuario muda a cada escrita e a cada
+        # derivação dela (tags); o Last-Modified é o das notas do usuário
+        cursor.execute("""
+            SELECT n.versao_usuario, n.revisao, u.notas_alterado_em
+            FROM notas n
+            JOIN usuarios u ON u.id = n.user_id
+            WHERE n.id = %s AND n.user_id = %s
+        """, (nota_id, session['user_id']))
+        
+        carimbo = cursor.fetchone()
+        if not carimbo:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # Revisão do autosave ainda no buffer (ver buffer_notas.py): é a que
+        # o editor tem que receber, e entra nos validadores
+        pendente = buffer_notas.ler(nota_id)
+        if pendente and pendente.revisao <= carimbo['revisao']:
+            pendente = None
+        alterado_em = carimbo['notas_alterado_em']
+        if pendente and (alterado_em is None or pendente.atualizado_em > alterado_em):
+            alterado_em = pendente.atualizado_em
+        
+        etag = make_etag('nota', session['user_id'], nota_id, carimbo['versao_usuario'],
+                         pendente.revisao if pendente else 0)
+        resposta = nao_modificada(etag, alterado_em)
+        if resposta:
+            return resposta
+        
+        # Buscar nota
+        cursor.execute("""
+            SELECT id, title, content, created_at, updated_at, revisao, derivado_versao
+            FROM notas
+            WHERE id = %s AND user_id = %s
+        """, (nota_id, session['user_id']))
+        
+        nota = cursor.fetchone()
+        if not nota:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # Buscar tags
+        cursor.execute("""
+            SELECT t.name
+            FROM tags t
+            JOIN nota_tags nt ON t.id = nt.tag_id
+            WHERE nt.nota_id = %s
+        """, (nota_id,))
+        
+        tags = [row['name'] for row in cursor.fetchall()]
+        nota['tags'] = tags
+        if pendente and pendente.revisao > nota['revisao']:
+            nota.update(title=pendente.title, content=pendente.content,
+                        revisao=pendente.revisao, updated_at=pendente.atualizado_em)
+        nota['derivacao_pendente'] = nota['derivado_versao'] < nota['revisao']
+        
+        return com_validadores(resposta_json({'nota': nota, 'success': True}), etag, alterado_em)
+        
+    except Error as e:
+        print(f"Erro ao obter nota: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/notas/<int:nota_id>/derivado', methods=['GET'])
+@require_login
+@orcamento_sql(1)
+def api_estado_derivado_nota(nota_id):
+    
+    # Consulta leve para o cliente saber quando as tags e links da última
+    # revisão salva já foram aplicados
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT revisao, derivado_versao FROM notas
+            WHERE id = %s AND user_id = %s
+        """, (nota_id, session['user_id']))
+        
+        estado = cursor.fetchone()
+        if not estado:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # Revisão no buffer do autosave ainda nem chegou ao banco
+        pendente = buffer_notas.ler(nota_id)
+        if pendente and pendente.revisao > estado['revisao']:
+            estado['revisao'] = pendente.revisao
+        
+        return jsonify({
+            'revisao': estado['revisao'],
+            'derivado_versao': estado['derivado_versao'],
+            'derivacao_pendente': estado['derivado_versao'] < estado['revisao'],
+            'success': True
+        })
+        
+    except Error as e:
+        print(f"Erro ao obter estado da nota: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/notas/<int:nota_id>', methods=['PUT'])
+@require_login
+@orcamento_sql(4 + SQL_DERIVACAO_NOTA)
+def api_atualizar_nota(nota_id):
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    title = data.get('title', '').strip()
+    content = data.get('content', '').strip()
+    
+    if not title or not content:
+        return jsonify({'error': 'Título e conteúdo são obrigatórios', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    reserva = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        user_id = session['user_id']
+        
+        versao_antes = versao_notas_usuario(cursor, user_id, para_escrita=True)
+        versao_depois = versao_antes + 1
+        
+        # Verificar se a nota existe e pertence ao usuário
+        cursor.execute("""
+            SELECT id, revisao FROM notas
+            WHERE id = %s AND user_id = %s
+        """, (nota_id, user_id))
+        
+        nota_atual = cursor.fetchone()
+        if not nota_atual:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # O conteúdo inteiro substitui o que o autosave deixou no buffer, e a
+        # revisão continua depois da que estava lá. A vaga fica reservada (o
+        # autosave não a altera) e só sai do buffer depois do commit
+        revisao_buffer = 0
+        reservado = buffer_notas.reservar(nota_id)
+        if reservado:
+            reserva, pendente = reservado
+            revisao_buffer = pendente.revisao
+        
+        # Atualizar só a nota; tags e links são derivados depois da nova revisão
+        now = datetime.now()
+        revisao = max(nota_atual['revisao'], revisao_buffer) + 1
+        preview = preview_nota(content)
+        cursor.execute("""
+            UPDATE notas
+            SET title = %s, content = %s, preview = %s, word_count = %s, updated_at = %s,
+                versao_usuario = %s, revisao = %s
+            WHERE id = %s
+        """, (title, content, preview, contar_palavras(content), now, versao_depois, revisao, nota_id))
+        
+        avancar_versao_notas(cursor, user_id, versao_depois)
+        
+        connection.commit()
+        if reserva is not None:
+            buffer_notas.concluir(nota_id, reserva)
+            reserva = None
+        
+        titulo_cache.patch(user_id, versao_antes, versao_depois, lambda indice: None)
+        
+        nota_grafo = {'id': nota_id, 'title': title, 'preview': preview}
+        grafo_cache.patch(user_id, versao_antes, versao_depois,
+                          lambda grafo: grafo.upsert_nota(nota_grafo))
+        busca_cache.patch(user_id, versao_antes, versao_depois,
+                          lambda indice: indice.upsert(nota_id, title, content, now))
+        
+        pendente = agendar_derivacao(connection, cursor, user_id, nota_id)
+        
+        return jsonify({
+            'message': 'Nota atualizada com sucesso',
+            'revisao': revisao,
+            'derivacao_pendente': pendente,
+            'success': True
+        })
+        
+    except Error as e:
+        print(f"Erro ao atualizar nota: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        if reserva is not None:
+            # Sem commit: o que estava no buffer continua lá para ser gravado
+            buffer_notas.concluir(nota_id, reserva, gravada=False)
+        cursor.close()
+
+def aplicar_deltas_base(data, antigo, revisao):
+    
+    # (conteúdo novo, deltas, None) ou (None, None, resposta de erro) para
+    # os deltas do PATCH sobre o conteúdo da revisão base
+    try:
+        deltas = normalizar_deltas(data.get('deltas'), len(antigo))
+    except ValueError as e:
+        return None, None, (jsonify({'error': f'Deltas inválidos: {e}', 'success': False}), 400)
+    
+    content = aplicar_deltas(antigo, deltas)
+    if not content.strip():
+        return None, None, (jsonify({'error': 'Título e conteúdo são obrigatórios', 'success': False}), 400)
+    
+    tamanho = data.get('tamanho')
+    if tamanho is not None and tamanho != len(content):
+        # Posições calculadas sobre outro texto: o cliente reenvia inteiro
+        return None, None, (jsonify({
+            'error': 'O conteúdo resultante não confere com o do editor',
+            'revisao': revisao,
+            'success': False
+        }), 409)
+
+    # Como no POST/PUT, grava sem espaços nas pontas. O editor manda os deltas
+    # sobre o texto já aparado, então para ele nada muda; um cliente que não
+    # apare passa a ter outra base e recebe 409 pelo tamanho no próximo
+    # salvamento. Os deltas viram um só, do antigo para o aparado, porque a
+    # gravação no banco aplica os deltas e não o conteúdo
+    aparado = content.strip()
+    if aparado != content:
+        content, deltas = aparado, [delta_unico(antigo, aparado)]
+    return content, deltas, None
+
+def resposta_revisao_guardada(revisao):
+    
+    # Salvamento que ficou no buffer do autosave: a derivação só vem depois
+    # que ele for gravado no banco
+    return jsonify({
+        'message': 'Nota atualizada com sucesso',
+        'revisao': revisao,
+        'derivacao_pendente': True,
+        'success': True
+    })
+
+@bp.route('/api/notas/<int:nota_id>', methods=['PATCH'])
+@require_login
+@orcamento_sql(5 + SQL_DERIVACAO_NOTA)
+def api_aplicar_delta_nota(nota_id):
+    
+    # Salvamento por diferença (ver deltas.py): {"revisao": revisão base,
+    # "deltas": [...], "title": opcional, "tamanho": opcional, o número de
+    # caracteres esperado depois dos deltas}. Se a nota já está em outra
+    # revisão responde 409 com a atual, e nada é gravado.
+    # É o salvamento do autosave: as revisões passam pelo buffer
+    # (buffer_notas.py) e uma sequência delas vira uma escrita só no banco
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    revisao_base = data.get('revisao')
+    if type(revisao_base) is not int:
+        return jsonify({'error': 'Revisão base não informada', 'success': False}), 400
+    
+    title = data.get('title')
+    if title is not None:
+        title = title.strip() if isinstance(title, str) else ''
+        if not title:
+            return jsonify({'error': 'Título e conteúdo são obrigatórios', 'success': False}), 400
+    
+    user_id = session['user_id']
+    
+    # Nota que já está no buffer na revisão base: só o buffer muda, sem SQL
+    pendente = buffer_notas.ler(nota_id)
+    if pendente and pendente.user_id == user_id and pendente.revisao == revisao_base:
+        content, _, erro = aplicar_deltas_base(data, pendente.content, pendente.revisao)
+        if erro:
+            return erro
+        if buffer_notas.guardar(nota_id, user_id, title or pendente.title, content, revisao_base) == GUARDADO:
+            return resposta_revisao_guardada(revisao_base + 1)
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        versao_antes = versao_notas_usuario(cursor, user_id, para_escrita=True)
+        
+        cursor.execute(f"""
+            SELECT {COLUNAS_NOTA}
+            FROM notas
+            WHERE id = %s AND user_id = %s
+        """, (nota_id, user_id))
+        
+        nota_atual = cursor.fetchone()
+        if not nota_atual:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # A revisão base é a do buffer, se ele tem uma mais nova que o banco
+        pendente = buffer_notas.ler(nota_id)
+        if not pendente or pendente.revisao <= nota_atual['revisao']:
+            pendente = None
+        base = pendente or Pendente(nota_id, user_id, nota_atual['title'], nota_atual['content'] or '',
+                                    nota_atual['revisao'], nota_atual['revisao'], None)
+        
+        if base.revisao != revisao_base:
+            return jsonify({
+                'error': 'A nota foi alterada depois da revisão base',
+                'revisao': base.revisao,
+                'success': False
+            }), 409
+        
+        content, deltas, erro = aplicar_deltas_base(data, base.content, base.revisao)
+        if erro:
+            return erro
+        
+        if title is None:
+            title = base.title
+        
+        resultado = buffer_notas.guardar(nota_id, user_id, title, content, revisao_base,
+                                         revisao_banco=nota_atual['revisao'])
+        if resultado == GUARDADO:
+            # Libera o lock das notas do usuário
+            connection.commit()
+            return resposta_revisao_guardada(revisao_base + 1)
+        if resultado == CONFLITO:
+            # Outro salvamento entrou no buffer enquanto este esperava o lock
+            atual = buffer_notas.ler(nota_id)
+            return jsonify({
+                'error': 'A nota foi alterada depois da revisão base',
+                'revisao': atual.revisao if atual else nota_atual['revisao'],
+                'success': False
+            }), 409
+        
+        # Não coube no buffer: grava direto, a partir do que está no banco
+        if pendente:
+            deltas = [delta_unico(nota_atual['content'] or '', content)]
+        pendente_derivacao = gravar_nota(connection, cursor, user_id, nota_atual, title, content, deltas,
+                                         revisao_base + 1, versao_antes, datetime.now())
+        
+        return jsonify({
+            'message': 'Nota atualizada com sucesso',
+            'revisao': revisao_base + 1,
+            'derivacao_pendente': pendente_derivacao,
+            'success': True
+        })
+        
+    except Error as e:
+        print(f"Erro ao atualizar nota: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/notas/<int:nota_id>', methods=['DELETE'])
+@require_login
+@orcamento_sql(14)
+def api_deletar_nota(nota_id):
+    """API: Deletar nota"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    reserva = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        user_id = session['user_id']
+        
+        versao_antes = versao_notas_usuario(cursor, user_id, para_escrita=True)
+        versao_depois = versao_antes + 1
+        
+        # Verificar se a nota existe e pertence ao usuário
+        cursor.execute("""
+            SELECT id, titulo_derivado FROM notas
+            WHERE id = %s AND user_id = %s
+        """, (nota_id, user_id))
+        
+        nota_atual = cursor.fetchone()
+        if not nota_atual:
+            return jsonify({'error': 'Nota não encontrada', 'success': False}), 404
+        
+        # O autosave pendente sai junto com a nota, mas só depois do commit
+        reservado = buffer_notas.reservar(nota_id)
+        if reservado:
+            reserva = reservado[0]
+        
+        # Links que apontavam para a nota passam para outra nota de mesmo
+        # título ou voltam a ficar pendentes (nota nunca derivada: não há)
+        indice = get_titulo_index(cursor, user_id, versao_antes)
+        titulo_antigo = nota_atual['titulo_derivado']
+        links_adicionados, links_removidos = sync_escrita_nota(
+            cursor, user_id, indice, nota_id, titulo_antigo, None
+        )
+        
+        # Deletar associações de tags
+        cursor.execute("DELETE FROM nota_tags WHERE nota_id = %s", (nota_id,))
+        
+        # Deletar links relacionados
+        cursor.execute("DELETE FROM links_notas WHERE source_nota_id = %s OR target_nota_id = %s", (nota_id, nota_id))
+        cursor.execute("DELETE FROM links_pendentes WHERE source_nota_id = %s", (nota_id,))
+        
+        # Deletar nota
+        cursor.execute("DELETE FROM notas WHERE id = %s", (nota_id,))
+        
+        avancar_versao_notas(cursor, user_id, versao_depois)
+        
+        connection.commit()
+        if reserva is not None:
+            buffer_notas.concluir(nota_id, reserva)
+            reserva = None
+        
+        titulo_cache.patch(user_id, versao_antes, versao_depois,
+                           lambda indice: indice.set_titulo(nota_id, titulo_antigo, None))
+        
+        def patch_grafo(grafo):
+            grafo.apply_links(links_adicionados, links_removidos)
+            grafo.remove_nota(nota_id)
+        
+        grafo_cache.patch(user_id, versao_antes, versao_depois, patch_grafo)
+        busca_cache.patch(user_id, versao_antes, versao_depois,
+                          lambda indice: indice.remove(nota_id))
+        
+        return jsonify({'message': 'Nota deletada com sucesso', 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao deletar nota: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        if reserva is not None:
+            buffer_notas.concluir(nota_id, reserva, gravada=False)
+        cursor.close()
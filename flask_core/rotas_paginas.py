@@ -0,0 +1,70 @@
+from flask import Blueprint, render_template, session
+
+from orcamentos import orcamento_sql
+from web import require_login
+
+bp = Blueprint('paginas', __name__)
+
+# ROTAS PRINCIPAIS
+@bp.route('/dashboard')
+@require_login
+@orcamento_sql(0)
+def dashboard():
+    
+    return render_template('dashboard.html', username=session.get('username'))
+
+@bp.route('/notas')
+@require_login
+@orcamento_sql(0)
+def listar_notas():
+    
+    return render_template('Interface.notas.html', username=session.get('username'))
+
+@bp.route('/notas/nova')
+@require_login
+@orcamento_sql(0)
+def nova_nota():
+    
+    return render_template('nota.html', username=session.get('username'))
+
+@bp.route('/notas/<int:nota_id>/editar')
+@require_login
+@orcamento_sql(0)
+def editar_nota(nota_id):
+    
+    return render_template('nota.html', username=session.get('username'), nota_id=nota_id)
+
+@bp.route('/flashcards')
+@require_login
+@orcamento_sql(0)
+def listar_flashcards():
+    
+    return render_template('interface.flashcard1.html', username=session.get('username'))
+
+@bp.route('/flashcards/novo')
+@require_login
+@orcamento_sql(0)
+def novo_flashcard():
+   
+    return render_template('interface.flashcard2.html', username=session.get('username'))
+
+@bp.route('/flashcards/estudar')
+@require_login
+@orcamento_sql(0)
+def estudar_flashcards():
+    
+    return render_template('interface.flashcard3.html', username=session.get('username'))
+
+@bp.route('/calendario')
+@require_login
+@orcamento_sql(0)
+def calendario():
+    
+    return render_template('calendario.html', username=session.get('username'))
+
+@bp.route('/grafos')
+@require_login
+@orcamento_sql(0)
+def grafos():
+    
+    return render_template('grafos.html', username=session.get('username'))
@@ -0,0 +1,32 @@
+from flask import Blueprint, current_app, jsonify
+
+from banco import get_db_pool
+from estado import buffer_notas, grafo_cache, ocorrencias_cache
+from orcamentos import orcamento_sql
+
+bp = Blueprint('sistema', __name__)
+
+@bp.route('/api/sistema/pool', methods=['GET'])
+@orcamento_sql(0)
+def api_pool_stats():
+    
+    return jsonify({'pool': get_db_pool().stats(), 'success': True})
+
+@bp.route('/api/sistema/cache', methods=['GET'])
+@orcamento_sql(0)
+def api_cache_stats():
+    
+    return jsonify({
+        'grafo_cache': grafo_cache.stats(),
+        'ocorrencias_cache': ocorrencias_cache.stats(),
+        'buffer_notas': buffer_notas.stats(),
+        'success': True
+    })
+
+@bp.route('/metrics', methods=['GET'])
+@orcamento_sql(0)
+def metrics():
+    
+    # Formato texto do Prometheus, somando todos os workers (ver instrumentacao.py)
+    return current_app.response_class(current_app.extensions['metricas'].exportar(),
+                                      mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,506 @@
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+
+from flask import Blueprint, jsonify, request, session
+from mysql.connector import Error
+
+from banco import get_db_connection
+from estado import ocorrencias_cache
+from orcamentos import orcamento_sql
+from recorrencia import eh_ocorrencia, parse_regra
+from serializacao import resposta_json, resposta_json_stream
+from versoes import avancar_versao_recurso
+from web import com_validadores, decode_cursor, encode_cursor, nao_modificada, parse_fields, parse_limit, require_login, select_fields, validadores_recursos
+
+bp = Blueprint('tasks', __name__)
+
+# API CRUD TAREFAS/EVENTOS
+
+# Campos de ?fields= na listagem de tarefas -> coluna
+TASK_COLUNAS = {
+    'id': 'id',
+    'title': 'title',
+    'description': 'description',
+    'due_date': 'due_date',
+    'recurring': 'recurring',
+    'recurrence_rule': 'recurrence_rule',
+    'completed': 'completed',
+    'created_at': 'created_at',
+}
+
+@bp.route('/api/tasks', methods=['GET'])
+@require_login
+@orcamento_sql(2)
+def api_listar_tasks():
+    
+    try:
+        limit = parse_limit(request.args.get('limit'))
+        cursor_pos = decode_cursor(request.args.get('cursor'), permitir_nulo=True)
+    except ValueError:
+        return jsonify({'error': 'Parâmetros de paginação inválidos', 'success': False}), 400
+    
+    try:
+        campos = parse_fields(request.args.get('fields'), TASK_COLUNAS)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        etag, alterado_em = validadores_recursos(cursor, 'tasks', ('tasks',), request.query_string.decode())
+        resposta = nao_modificada(etag, alterado_em)
+        if resposta:
+            return resposta
+        
+        # Ordem do índice idx_tasks_user_due: sem data primeiro (NULL vem
+        # antes no MySQL), depois por data; id desempata
+        filtro = ''
+        params = [session['user_id']]
+        if cursor_pos:
+            cursor_due, cursor_id = cursor_pos
+            if cursor_due is None:
+                filtro = 'AND ((due_date IS NULL AND id > %s) OR due_date IS NOT NULL)'
+                params += [cursor_id]
+            else:
+                filtro = 'AND (due_date > %s OR (due_date = %s AND id > %s))'
+                params += [cursor_due, cursor_due, cursor_id]
+        
+        cursor.execute(f"""
+            SELECT {select_fields(campos, TASK_COLUNAS, ('id', 'due_date'))}
+            FROM tasks
+            WHERE user_id = %s {filtro}
+            ORDER BY due_date ASC, id ASC
+            LIMIT %s
+        """, params + [limit + 1])
+        
+        tasks = cursor.fetchall()
+        
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            ultima = tasks[-1]
+            next_cursor = encode_cursor(ultima['due_date'], ultima['id'])
+        
+        # Chaves da ordenação que não foram pedidas
+        sobrando = [c for c in ('id', 'due_date') if c not in campos]
+        if sobrando:
+            for task in tasks:
+                for campo in sobrando:
+                    del task[campo]
+        
+        return com_validadores(resposta_json({'tasks': tasks, 'next_cursor': next_cursor, 'success': True}),
+                               etag, alterado_em)
+        
+    except Error as e:
+        print(f"Erro ao listar tarefas: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+# Intervalo máximo de /api/tasks/range e teto de linhas por consulta
+TASKS_RANGE_MAX_DIAS = 366
+
+TASKS_RANGE_MAX_LINHAS = 5000
+
+def parse_data_param(valor):
+    
+    # 'YYYY-MM-DD' (meia-noite) ou data e hora ISO. Com fuso ('Z' do
+    # toISOString ou '-03:00'), fica só a hora, como due_date é gravado nas
+    # rotas de criação e edição: as colunas não têm fuso e comparar um
+    # datetime com fuso a um sem fuso levanta TypeError
+    if not valor:
+        raise ValueError('data obrigatória')
+    if not isinstance(valor, str):
+        raise ValueError(f'data inválida: {valor!r}')
+    return datetime.fromisoformat(valor.replace('Z', '+00:00')).replace(tzinfo=None)
+
+def fetch_tasks_intervalo(cursor, user_id, inicio, fim, campos, limite=TASKS_RANGE_MAX_LINHAS):
+    
+    # Intervalo semiaberto [inicio, fim) direto na coluna: um range em
+    # idx_tasks_user_recurring, ao contrário de DATE(due_date) = ..., que não
+    # usa índice. Tarefas avulsas vêm como estão; as recorrentes viram uma
+    # entrada por ocorrência na janela, em ordem de data junto com as avulsas
+    cursor.execute(f"""
+        SELECT {select_fields(campos, TASK_COLUNAS, ('id', 'due_date'))}
+        FROM tasks
+        WHERE user_id = %s AND recurring = FALSE AND due_date >= %s AND due_date < %s
+        ORDER BY due_date ASC, id ASC
+        LIMIT %s
+    """, (user_id, inicio, fim, limite))
+    avulsas = cursor.fetchall()
+    
+    # Séries que começam antes do fim da janela; o due_date é o início da série
+    cursor.execute(f"""
+        SELECT {select_fields(campos, TASK_COLUNAS, ('id', 'due_date', 'recurrence_rule'))}
+        FROM tasks
+        WHERE user_id = %s AND recurring = TRUE AND due_date < %s
+    """, (user_id, fim))
+    series = cursor.fetchall()
+    if not series:
+        return avulsas
+    
+    # Conclusão é por ocorrência: uma consulta para todas as séries da janela
+    placeholders = ','.join(['%s'] * len(series))
+    cursor.execute(f"""
+        SELECT task_id, ocorrencia, completed
+        FROM task_ocorrencias
+        WHERE task_id IN ({placeholders}) AND ocorrencia >= %s AND ocorrencia < %s
+    """, [serie['id'] for serie in series] + [inicio, fim])
+    concluidas = {(row['task_id'], row['ocorrencia']): bool(row['completed']) for row in cursor.fetchall()}
+    
+    def expandir(serie):
+        try:
+            datas = ocorrencias_cache.expandir((serie['recurrence_rule'] or '').strip(),
+                                               serie['due_date'], inicio, fim)
+        except ValueError:
+            # Regra gravada antes da validação: a tarefa vale só pela data
+            datas = (serie['due_date'],) if serie['due_date'] >= inicio else ()
+        if 'recurrence_rule' not in campos:
+            del serie['recurrence_rule']
+        for data in datas:
+            item = dict(serie, due_date=data, occurrence=data)
+            if 'completed' in campos:
+                item['completed'] = concluidas.get((serie['id'], data), False)
+            yield item
+    
+    # Cada fonte já está em ordem: merge preguiçoso, para no limite sem
+    # expandir o resto das séries
+    fontes = [avulsas] + [expandir(serie) for serie in series]
+    return list(islice(heapq.merge(*fontes, key=lambda t: (t['due_date'], t['id'])), limite))
+
+@bp.route('/api/tasks/range', methods=['GET'])
+@require_login
+@orcamento_sql(4)
+def api_tasks_intervalo():
+    
+    # ?start=&end=: tarefas com due_date em [start, end), agrupadas por dia
+    try:
+        inicio = parse_data_param(request.args.get('start'))
+        fim = parse_data_param(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'Parâmetros start e end inválidos (use YYYY-MM-DD ou data ISO)', 'success': False}), 400
+    
+    if fim <= inicio or (fim - inicio).days > TASKS_RANGE_MAX_DIAS:
+        return jsonify({'error': f'Intervalo inválido (máximo de {TASKS_RANGE_MAX_DIAS} dias)', 'success': False}), 400
+    
+    try:
+        campos = parse_fields(request.args.get('fields'), TASK_COLUNAS)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Conclusões de ocorrências também avançam tasks_versao
+        etag, alterado_em = validadores_recursos(cursor, 'tasks_range', ('tasks',), request.query_string.decode())
+        resposta = nao_modificada(etag, alterado_em)
+        if resposta:
+            return resposta
+        
+        tasks = fetch_tasks_intervalo(cursor, session['user_id'], inicio, fim, campos,
+                                      TASKS_RANGE_MAX_LINHAS + 1)
+        truncated = len(tasks) > TASKS_RANGE_MAX_LINHAS
+        tasks = tasks[:TASKS_RANGE_MAX_LINHAS]
+        
+        # Já vêm em ordem de due_date: cada dia é uma sequência contígua
+        days = {}
+        for task in tasks:
+            dia = task['due_date'].date().isoformat()
+            if 'due_date' not in campos:
+                del task['due_date']
+            if 'id' not in campos:
+                del task['id']
+            days.setdefault(dia, []).append(task)
+        
+        return com_validadores(resposta_json({
+            'start': inicio,
+            'end': fim,
+            'days': days,
+            'truncated': truncated,
+            'success': True
+        }), etag, alterado_em)
+        
+    except Error as e:
+        print(f"Erro ao buscar tarefas por intervalo: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/tasks/date/<date_str>', methods=['GET'])
+@require_login
+@orcamento_sql(3)
+def api_tasks_por_data(date_str):
+    
+    try:
+        # Converter string de data
+        target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido (use YYYY-MM-DD)', 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Buscar tarefas para a data específica: [dia, dia + 1) no índice
+        inicio = datetime.combine(target_date, datetime.min.time())
+        tasks = fetch_tasks_intervalo(cursor, session['user_id'], inicio,
+                                      inicio + timedelta(days=1), list(TASK_COLUNAS))
+        
+        return resposta_json_stream('tasks', tasks, {'date': date_str, 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao buscar tarefas por data: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+def validar_recorrencia(recurring, recurrence_rule, due_date):
+    
+    # Mensagem de erro para o cliente, ou None se a recorrência é válida
+    if not recurring:
+        return None
+    if due_date is None:
+        return 'Tarefa recorrente precisa de data (início da série)'
+    try:
+        parse_regra(recurrence_rule)
+    except ValueError as e:
+        return f'Regra de recorrência inválida: {e}'
+    return None
+
+@bp.route('/api/tasks', methods=['POST'])
+@require_login
+@orcamento_sql(3)
+def api_criar_task():
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    title = data.get('title', '').strip()
+    description = data.get('description', '').strip()
+    due_date_str = data.get('due_date')
+    recurring = bool(data.get('recurring', False))
+    recurrence_rule = (data.get('recurrence_rule') or '').strip()
+    
+    if not title:
+        return jsonify({'error': 'Título é obrigatório', 'success': False}), 400
+    
+    # Converter string de data para datetime se fornecida
+    due_date = None
+    if due_date_str:
+        try:
+            due_date = datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
+        except ValueError:
+            return jsonify({'error': 'Formato de data inválido', 'success': False}), 400
+    
+    erro = validar_recorrencia(recurring, recurrence_rule, due_date)
+    if erro:
+        return jsonify({'error': erro, 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Inserir nova tarefa
+        cursor.execute("""
+            INSERT INTO tasks (user_id, title, description, due_date, recurring, recurrence_rule, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (session['user_id'], title, description, due_date, recurring, recurrence_rule, datetime.now()))
+        
+        task_id = cursor.lastrowid
+        avancar_versao_recurso(cursor, session['user_id'], 'tasks')
+        connection.commit()
+        
+        # Retornar tarefa criada
+        cursor.execute("""
+            SELECT id, title, description, due_date, recurring, 
+                   recurrence_rule, completed, created_at
+            FROM tasks WHERE id = %s
+        """, (task_id,))
+        
+        nova_task = cursor.fetchone()
+        
+        return resposta_json({'task': nova_task, 'success': True}, 201)
+        
+    except Error as e:
+        print(f"Erro ao criar tarefa: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/tasks/<int:task_id>', methods=['PUT'])
+@require_login
+@orcamento_sql(3)
+def api_atualizar_task(task_id):
+   
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Dados não fornecidos', 'success': False}), 400
+    
+    title = data.get('title', '').strip()
+    description = data.get('description', '').strip()
+    due_date_str = data.get('due_date')
+    completed = data.get('completed', False)
+    recurring = bool(data.get('recurring', False))
+    recurrence_rule = (data.get('recurrence_rule') or '').strip()
+    
+    if not title:
+        return jsonify({'error': 'Título é obrigatório', 'success': False}), 400
+    
+    
+    due_date = None
+    if due_date_str:
+        try:
+            due_date = datetime.fromisoformat(due_date_str.replace('Z', '+00:00'))
+        except ValueError:
+            return jsonify({'error': 'Formato de data inválido', 'success': False}), 400
+    
+    erro = validar_recorrencia(recurring, recurrence_rule, due_date)
+    if erro:
+        return jsonify({'error': erro, 'success': False}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        # Verificar se a tarefa existe e pertence ao usuário
+        cursor.execute("""
+            SELECT id FROM tasks
+            WHERE id = %s AND user_id = %s
+        """, (task_id, session['user_id']))
+        
+        if not cursor.fetchone():
+            return jsonify({'error': 'Tarefa não encontrada', 'success': False}), 404
+        
+        # Atualizar tarefa
+        cursor.execute("""
+            UPDATE tasks
+            SET title = %s, description = %s, due_date = %s, completed = %s, 
+                recurring = %s, recurrence_rule = %s
+            WHERE id = %s
+        """, (title, description, due_date, completed, recurring, recurrence_rule, task_id))
+        
+        avancar_versao_recurso(cursor, session['user_id'], 'tasks')
+        connection.commit()
+        
+        return jsonify({'message': 'Tarefa atualizada com sucesso', 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao atualizar tarefa: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/tasks/<int:task_id>/ocorrencias', methods=['PUT'])
+@require_login
+@orcamento_sql(3)
+def api_marcar_ocorrencia(task_id):
+    
+    # {ocorrencia, completed}: conclui (ou reabre) uma ocorrência da série
+    # sem mexer nas outras
+    data = request.get_json()
+    if not data or not data.get('ocorrencia'):
+        return jsonify({'error': 'Ocorrência não fornecida', 'success': False}), 400
+    
+    try:
+        ocorrencia = parse_data_param(data['ocorrencia'])
+    except ValueError:
+        return jsonify({'error': 'Formato de data inválido', 'success': False}), 400
+    completed = bool(data.get('completed', True))
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor(dictionary=True)
+        
+        cursor.execute("""
+            SELECT id, due_date, recurrence_rule FROM tasks
+            WHERE id = %s AND user_id = %s AND recurring = TRUE
+        """, (task_id, session['user_id']))
+        
+        task = cursor.fetchone()
+        if not task:
+            return jsonify({'error': 'Tarefa recorrente não encontrada', 'success': False}), 404
+        
+        try:
+            valida = eh_ocorrencia(parse_regra(task['recurrence_rule'] or ''), task['due_date'], ocorrencia)
+        except ValueError:
+            valida = False
+        if not valida:
+            return jsonify({'error': 'Data não é uma ocorrência da tarefa', 'success': False}), 400
+        
+        cursor.execute("""
+            INSERT INTO task_ocorrencias (task_id, ocorrencia, completed)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE completed = VALUES(completed)
+        """, (task_id, ocorrencia, completed))
+        
+        avancar_versao_recurso(cursor, session['user_id'], 'tasks')
+        connection.commit()
+        
+        return jsonify({
+            'task_id': task_id,
+            'occurrence': ocorrencia,
+            'completed': completed,
+            'success': True
+        })
+        
+    except Error as e:
+        print(f"Erro ao marcar ocorrência: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/api/tasks/<int:task_id>', methods=['DELETE'])
+@require_login
+@orcamento_sql(3)
+def api_deletar_task(task_id):
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'error': 'Erro de conexão com o banco', 'success': False}), 500
+    
+    try:
+        cursor = connection.cursor()
+        
+        # Verificar se a tarefa existe e pertence ao usuário
+        cursor.execute("""
+            SELECT id FROM tasks
+            WHERE id = %s AND user_id = %s
+        """, (task_id, session['user_id']))
+        
+        if not cursor.fetchone():
+            return jsonify({'error': 'Tarefa não encontrada', 'success': False}), 404
+        
+        # Deletar tarefa
+        cursor.execute("DELETE FROM tasks WHERE id = %s", (task_id,))
+        avancar_versao_recurso(cursor, session['user_id'], 'tasks')
+        connection.commit()
+        
+        return jsonify({'message': 'Tarefa deletada com sucesso', 'success': True})
+        
+    except Error as e:
+        print(f"Erro ao deletar tarefa: {e}")
+        return jsonify({'error': 'Erro interno do servidor', 'success': False}), 500
+    finally:
+        cursor.close()
@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from flask import Response
+from flask.json import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Serialização das respostas da API. As linhas do MySQL vão direto para o
+# JSON, sem converter campo a campo nas rotas: datas em ISO 8601, Decimal
+# como número e bytes como texto. Com o orjson instalado o corpo é gerado
+# por ele; sem ele, pelo json da biblioteca padrão com as mesmas regras.
+
+MIMETYPE = 'application/json'
+
+# Tamanho dos pedaços enviados pelas respostas em stream
+TAMANHO_BLOCO = 64 * 1024
+
+
+def padrao(valor):
+    # Tipos que o json não conhece (o orjson já trata datetime, date e time)
+    if isinstance(valor, (datetime, date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (bytes, bytearray)):
+        # O mysql-connector devolve bytearray em algumas colunas de texto
+        try:
+            return valor.decode('utf-8')
+        except UnicodeDecodeError:
+            return base64.b64encode(valor).decode('ascii')
+    if isinstance(valor, timedelta):
+        return valor.total_seconds()
+    if isinstance(valor, (set, frozenset)):
+        return list(valor)
+    raise TypeError(f'tipo não serializável: {type(valor).__name__}')
+
+
+if orjson is not None:
+    def dumps(dados):
+        return orjson.dumps(dados, default=padrao, option=orjson.OPT_NON_STR_KEYS)
+else:
+    _encoder = json.JSONEncoder(default=padrao, ensure_ascii=False, separators=(',', ':'))
+
+    def dumps(dados):
+        return _encoder.encode(dados).encode('utf-8')
+
+
+class EncoderJSON(JSONEncoder):
+    """Encoder do jsonify com as mesmas regras de dumps(); sem ele o Flask
+    formata datas no padrão HTTP (RFC 822) em vez de ISO 8601."""
+
+    def default(self, o):
+        try:
+            return padrao(o)
+        except TypeError:
+            return super().default(o)
+
+
+def resposta_json(dados, status=200):
+    # Substitui jsonify nas rotas que devolvem linhas do banco
+    return Response(dumps(dados), status=status, mimetype=MIMETYPE)
+
+
+def resposta_json_stream(chave, itens, extras=None, status=200):
+    # {"<chave>": [itens...], **extras} gerado aos pedaços: cada item é
+    # serializado quando o gerador de itens o entrega, sem montar a lista
+    # nem o corpo inteiro na memória. extras pode ser uma função, chamada
+    # depois do último item (ex.: totais que só se conhecem no fim)
+    def gerar():
+        bloco = [b'{', dumps(chave), b':[']
+        tamanho = 0
+        for indice, item in enumerate(itens):
+            parte = dumps(item)
+            bloco.append(b',' + parte if indice else parte)
+            tamanho += len(parte)
+            if tamanho >= TAMANHO_BLOCO:
+                yield b''.join(bloco)
+                bloco, tamanho = [], 0
+        bloco.append(b']')
+
+        for campo, valor in (extras() if callable(extras) else extras or {}).items():
+            bloco += [b',', dumps(campo), b':', dumps(valor)]
+        bloco.append(b'}')
+        yield b''.join(bloco)
+
+    return Response(gerar(), status=status, mimetype=MIMETYPE)
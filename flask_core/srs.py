@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+# Agendamento de revisões no estilo SM-2 (SuperMemo 2): cada cartão guarda
+# ease, intervalo em dias e quantas revisões seguidas acertou; a nota da
+# revisão (0 a 5) ajusta a ease e define o próximo intervalo
+
+EASE_INICIAL = 2.5
+EASE_MINIMA = 1.3
+INTERVALO_MAXIMO = 36500  # dias
+
+# Botões da tela de estudo -> nota SM-2
+NOTAS_RESPOSTA = {
+    'again': 1,
+    'hard': 3,
+    'medium': 4,
+    'easy': 5,
+}
+
+# Cartão errado volta logo, na mesma sessão
+ESPERA_APOS_ERRO = timedelta(minutes=10)
+
+
+def parse_nota_resposta(valor):
+    # Aceita o nome do botão ou a nota numérica; ValueError se inválido
+    if isinstance(valor, str) and valor in NOTAS_RESPOSTA:
+        return NOTAS_RESPOSTA[valor]
+    if isinstance(valor, bool):
+        raise ValueError('nota inválida')
+    try:
+        nota = int(valor)
+    except (TypeError, ValueError):
+        raise ValueError('nota inválida')
+    if not 0 <= nota <= 5:
+        raise ValueError('nota inválida')
+    return nota
+
+
+def agendar(ease, intervalo, repeticoes, nota, agora):
+    # Devolve (ease, intervalo, repeticoes, lapso, review_at) após a revisão
+    ease = ease + 0.1 - (5 - nota) * (0.08 + (5 - nota) * 0.02)
+    ease = max(EASE_MINIMA, round(ease, 4))
+
+    if nota < 3:
+        # Errou: recomeça a sequência e revê em minutos
+        return ease, 0, 0, True, agora + ESPERA_APOS_ERRO
+
+    if repeticoes == 0:
+        intervalo = 1
+    elif repeticoes == 1:
+        intervalo = 6
+    else:
+        intervalo = round(intervalo * ease)
+    intervalo = min(max(intervalo, 1), INTERVALO_MAXIMO)
+
+    return ease, intervalo, repeticoes + 1, False, agora + timedelta(days=intervalo)
@@ -3,14 +3,14 @@ class CalendarioAPI {
     constructor() {
         this.baseUrl = '/api/tasks';
         this.currentDate = new Date();
-        this.tasks = [];
+        this.tasksPorDia = {};
         this.init();
     }
 
     init() {
-        this.loadTasks();
         this.setupEventListeners();
         this.renderCalendar();
+        this.loadTasks();
     }
 
     setupEventListeners() {
@@ -23,6 +23,7 @@ class CalendarioAPI {
             prevBtn.addEventListener('click', () => {
                 this.currentDate.setMonth(this.currentDate.getMonth() - 1);
                 this.renderCalendar();
+                this.loadTasks();
             });
         }
 
@@ -30,6 +31,7 @@ class CalendarioAPI {
             nextBtn.addEventListener('click', () => {
                 this.currentDate.setMonth(this.currentDate.getMonth() + 1);
                 this.renderCalendar();
+                this.loadTasks();
             });
         }
 
@@ -37,6 +39,7 @@ class CalendarioAPI {
             todayBtn.addEventListener('click', () => {
                 this.currentDate = new Date();
                 this.renderCalendar();
+                this.loadTasks();
             });
         }
 
@@ -57,14 +60,45 @@ class CalendarioAPI {
         });
     }
 
+    // Primeiro dia da grade (domingo antes do dia 1) e o dia seguinte ao último
+    // das 6 semanas exibidas: intervalo semiaberto [inicio, fim)
+    visibleRange() {
+        const firstDay = new Date(this.currentDate.getFullYear(), this.currentDate.getMonth(), 1);
+        const inicio = new Date(firstDay);
+        inicio.setDate(inicio.getDate() - firstDay.getDay());
+        const fim = new Date(inicio);
+        fim.setDate(fim.getDate() + 42);
+        return { inicio, fim };
+    }
+
+    dateKey(date) {
+        // Data local (não UTC), no mesmo formato dos grupos de /api/tasks/range
+        const mes = String(date.getMonth() + 1).padStart(2, '0');
+        const dia = String(date.getDate()).padStart(2, '0');
+        return `${date.getFullYear()}-${mes}-${dia}`;
+    }
+
     async loadTasks() {
         try {
-            const response = await fetch(this.baseUrl);
-            if (response.ok) {
-                const data = await response.json();
-                this.tasks = data.tasks || [];
-                this.renderCalendar();
-            }
+            // Só as tarefas da grade visível, já agrupadas por dia
+            const { inicio, fim } = this.visibleRange();
+            const query = new URLSearchParams({
+                start: this.dateKey(inicio),
+                end: this.dateKey(fim),
+                fields: 'id,title,due_date,completed'
+            });
+            const chave = this.currentDate.getFullYear() * 12 + this.currentDate.getMonth();
+            this.loadingMonth = chave;
+
+            const response = await fetch(`${this.baseUrl}/range?${query}`);
+            if (!response.ok) return;
+            const data = await response.json();
+
+            // Resposta de um mês que o usuário já deixou para trás
+            if (this.loadingMonth !== chave) return;
+
+            this.tasksPorDia = data.days || {};
+            this.renderCalendar();
         } catch (error) {
             console.error('Erro ao carregar tarefas:', error);
         }
@@ -194,7 +228,7 @@ class CalendarioAPI {
                 }
 
                 calendarHTML += `
-                    <div class="${dayClass}" data-date="${currentDate.toISOString().split('T')[0]}">
+                    <div class="${dayClass}" data-date="${this.dateKey(currentDate)}">
                         <span class="day-number">${currentDate.getDate()}</span>
                         <div class="day-tasks">${tasksHTML}</div>
                     </div>
@@ -206,11 +240,7 @@ class CalendarioAPI {
     }
 
     getTasksForDate(date) {
-        const dateStr = date.toISOString().split('T')[0];
-        return this.tasks.filter(task => {
-            const taskDate = new Date(task.due_date).toISOString().split('T')[0];
-            return taskDate === dateStr;
-        });
+        return this.tasksPorDia[this.dateKey(date)] || [];
     }
 
     selectDay(dayElement) {
@@ -32,8 +32,38 @@ class FlashcardsAPI {
     }
 
     
-    async listarFlashcards() {
-        return await this.request(`${this.apiURL}/flashcards`);
+    async listarFlashcardsPagina(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return await this.request(`${this.apiURL}/flashcards${query ? '?' + query : ''}`);
+    }
+
+    
+    async listarFlashcards(params = {}) {
+        // Percorre todas as páginas (cursor) da listagem
+        let flashcards = [];
+        let cursor = null;
+
+        do {
+            const pagina = await this.listarFlashcardsPagina({ limit: 200, ...params, ...(cursor ? { cursor } : {}) });
+            flashcards = flashcards.concat(pagina.flashcards || []);
+            cursor = pagina.next_cursor;
+        } while (cursor);
+
+        return { flashcards, success: true };
+    }
+
+    
+    async listarDevidos(limite = 50) {
+        // Fila de revisão: só os cartões vencidos, os mais atrasados primeiro
+        return await this.request(`${this.apiURL}/flashcards/due?limit=${limite}`);
+    }
+
+    
+    async revisarFlashcard(id, grade) {
+        return await this.request(`${this.apiURL}/flashcards/${id}/review`, {
+            method: 'POST',
+            body: JSON.stringify({ grade })
+        });
     }
 
     
@@ -66,7 +96,19 @@ class FlashcardsAPI {
 
     
     async listarNotas() {
-        return await this.request(`${this.apiURL}/notas`);
+        // Só os títulos são usados (a listagem traz o resumo, não o conteúdo)
+        let notas = [];
+        let cursor = null;
+
+        do {
+            const query = new URLSearchParams({ limit: 200 });
+            if (cursor) query.set('cursor', cursor);
+            const pagina = await this.request(`${this.apiURL}/notas?${query}`);
+            notas = notas.concat(pagina.notas || []);
+            cursor = pagina.next_cursor;
+        } while (cursor);
+
+        return { notas, success: true };
     }
 }
 
@@ -98,6 +140,34 @@ class FlashcardManager {
     }
 
     
+    async carregarDevidos(limite = 50) {
+        try {
+            const response = await this.api.listarDevidos(limite);
+            if (response.success) {
+                this.flashcardsCarregados = response.flashcards;
+                this.proximaRevisao = response.next_review_at;
+                return this.flashcardsCarregados;
+            } else {
+                throw new Error(response.error || 'Erro ao carregar flashcards');
+            }
+        } catch (error) {
+            console.error('Erro ao carregar flashcards para revisão:', error);
+            throw error;
+        }
+    }
+
+    
+    async avaliarFlashcardAtual(grade) {
+        // Registra a revisão; o servidor calcula o próximo agendamento (SM-2)
+        const flashcard = this.obterFlashcardAtual();
+        if (!flashcard) return null;
+
+        const response = await this.api.revisarFlashcard(flashcard.id, grade);
+        Object.assign(flashcard, response.flashcard);
+        return flashcard;
+    }
+
+    
     async criarFlashcard(notaId, frente, verso) {
         try {
             const dados = {
@@ -138,7 +208,7 @@ class FlashcardManager {
     }
 
     
-    iniciarEstudo() {
+    iniciarEstudo(embaralhar = true) {
         if (this.flashcardsCarregados.length === 0) {
             throw new Error('Nenhum flashcard disponível para estudo');
         }
@@ -148,7 +218,9 @@ class FlashcardManager {
         this.mostrandoResposta = false;
         
         
-        this.flashcardsCarregados = this.embaralharArray(this.flashcardsCarregados);
+        if (embaralhar) {
+            this.flashcardsCarregados = this.embaralharArray(this.flashcardsCarregados);
+        }
         
         return this.obterFlashcardAtual();
     }
@@ -39,19 +39,17 @@ class GrafosAPI {
         try {
             this.showLoading();
 
-            
-            const [nodesResponse, edgesResponse] = await Promise.all([
-                fetch('/api/grafos/nodes'),
-                fetch('/api/grafos/edges')
-            ]);
-
-            if (nodesResponse.ok && edgesResponse.ok) {
-                const nodesData = await nodesResponse.json();
-                const edgesData = await edgesResponse.json();
-
-                if (nodesData.success && edgesData.success) {
-                    this.allNodes = nodesData.nodes || [];
-                    this.allEdges = edgesData.edges || [];
+            // Nós e arestas vêm juntos no formato compacto; o navegador
+            // revalida com If-None-Match e recebe 304 quando o grafo não mudou
+            const response = await fetch('/api/grafos?formato=compacto&campos=preview,created_at', { cache: 'no-cache' });
+
+            if (response.ok) {
+                const data = await response.json();
+
+                if (data.success) {
+                    const grafo = this.expandirCompacto(data);
+                    this.allNodes = grafo.nodes;
+                    this.allEdges = grafo.edges;
                     
                     this.updateStats();
                     this.renderGraph();
@@ -67,6 +65,60 @@ class GrafosAPI {
         }
     }
 
+    expandirCompacto(data) {
+        // Converte os arrays colunares de volta para nós e arestas do vis.js;
+        // as arestas são pares de índices nos arrays de notas e de tags
+        const notas = data.notas;
+        const tags = data.tags;
+        const nodes = [];
+
+        notas.id.forEach((id, i) => {
+            const titulo = notas.title[i];
+            nodes.push({
+                id: `nota_${id}`,
+                label: titulo.length > 30 ? titulo.slice(0, 30) + '...' : titulo,
+                type: 'nota',
+                data: {
+                    id: id,
+                    title: titulo,
+                    content: notas.preview ? notas.preview[i] : '',
+                    created_at: notas.created_at && notas.created_at[i] !== null
+                        ? new Date(notas.created_at[i] * 1000).toISOString()
+                        : null
+                }
+            });
+        });
+
+        tags.id.forEach((id, i) => {
+            nodes.push({
+                id: `tag_${id}`,
+                label: `#${tags.name[i]}`,
+                type: 'tag',
+                data: { id: id, name: tags.name[i], usage_count: tags.usage_count[i] }
+            });
+        });
+
+        const edges = [];
+        const notaTag = data.edges.nota_tag;
+        for (let i = 0; i < notaTag.length; i += 2) {
+            edges.push({
+                from: `nota_${notas.id[notaTag[i]]}`,
+                to: `tag_${tags.id[notaTag[i + 1]]}`,
+                type: 'nota_tag'
+            });
+        }
+        const notaNota = data.edges.nota_nota;
+        for (let i = 0; i < notaNota.length; i += 2) {
+            edges.push({
+                from: `nota_${notas.id[notaNota[i]]}`,
+                to: `nota_${notas.id[notaNota[i + 1]]}`,
+                type: 'nota_nota'
+            });
+        }
+
+        return { nodes, edges };
+    }
+
     renderGraph() {
         if (this.allNodes.length === 0) {
             this.showEmptyState();
@@ -101,6 +153,9 @@ class GrafosAPI {
                 highlight: '#ffcc00'
             },
             width: 2,
+            // Links [[nota]] -> nota são direcionados
+            arrows: edge.type === 'nota_nota' ? 'to' : undefined,
+            dashes: edge.type === 'nota_nota',
             smooth: {
                 type: 'continuous'
             }
@@ -21,7 +21,10 @@ class ZetriaAPI {
             const data = await response.json();
 
             if (!response.ok) {
-                throw new Error(data.error || `HTTP ${response.status}`);
+                const erro = new Error(data.error || `HTTP ${response.status}`);
+                erro.status = response.status;
+                erro.dados = data;
+                throw erro;
             }
 
             return data;
@@ -34,8 +37,32 @@ class ZetriaAPI {
     // OPERAÇÕES CRUD
 
     
-    async listarNotas() {
-        return await this.request(`${this.apiURL}/notas`);
+    async listarNotasPagina(params = {}) {
+        const query = new URLSearchParams(params).toString();
+        return await this.request(`${this.apiURL}/notas${query ? '?' + query : ''}`);
+    }
+
+    // Percorre todas as páginas (cursor) e junta as notas
+    async listarNotas(params = {}) {
+        let notas = [];
+        let cursor = null;
+
+        do {
+            const pagina = await this.listarNotasPagina(
+                cursor ? { ...params, cursor } : params
+            );
+            notas = notas.concat(pagina.notas || []);
+            cursor = pagina.next_cursor;
+        } while (cursor);
+
+        return { notas, success: true };
+    }
+
+    
+    // Busca ranqueada; "#tag" na consulta filtra por tag
+    async buscarNotas(consulta, params = {}) {
+        const query = new URLSearchParams({ ...params, q: consulta }).toString();
+        return await this.request(`${this.apiURL}/notas/search?${query}`);
     }
 
     
@@ -60,6 +87,34 @@ class ZetriaAPI {
     }
 
     
+    // Salva só os trechos alterados em relação à revisão base; 409 se a nota
+    // mudou desde então (ver calcularDeltaNota)
+    async aplicarDeltaNota(id, dados) {
+        return await this.request(`${this.apiURL}/notas/${id}`, {
+            method: 'PATCH',
+            body: JSON.stringify(dados)
+        });
+    }
+
+    
+    async estadoDerivadoNota(id) {
+        return await this.request(`${this.apiURL}/notas/${id}/derivado`);
+    }
+
+    
+    async aguardarDerivacao(id, tentativas = 20, intervaloMs = 250) {
+        // Tags e links são gravados em segundo plano depois do salvamento
+        for (let i = 0; i < tentativas; i++) {
+            const estado = await this.estadoDerivadoNota(id);
+            if (!estado.derivacao_pendente) {
+                return estado;
+            }
+            await new Promise(resolve => setTimeout(resolve, intervaloMs));
+        }
+        return await this.estadoDerivadoNota(id);
+    }
+
+    
     async deletarNota(id) {
         return await this.request(`${this.apiURL}/notas/${id}`, {
             method: 'DELETE'
@@ -68,6 +123,54 @@ class ZetriaAPI {
 }
 
 
+// Posições em caracteres Unicode, como o servidor conta (um emoji é um
+// caractere, mas duas unidades UTF-16 numa string JavaScript)
+function contarCaracteres(texto) {
+    const pares = texto.match(/[\uD800-\uDBFF][\uDC00-\uDFFF]/g);
+    return texto.length - (pares ? pares.length : 0);
+}
+
+// Delta único entre o conteúdo salvo e o atual: o que sobra tirando o
+// prefixo e o sufixo comuns. null se não há diferença
+function calcularDeltaNota(base, atual) {
+    if (base === atual) {
+        return null;
+    }
+
+    let inicio = 0;
+    const limite = Math.min(base.length, atual.length);
+    while (inicio < limite && base.charCodeAt(inicio) === atual.charCodeAt(inicio)) {
+        inicio++;
+    }
+
+    let fimBase = base.length;
+    let fimAtual = atual.length;
+    while (fimBase > inicio && fimAtual > inicio &&
+           base.charCodeAt(fimBase - 1) === atual.charCodeAt(fimAtual - 1)) {
+        fimBase--;
+        fimAtual--;
+    }
+
+    // Não corta um par substituto ao meio
+    const alto = (codigo) => codigo >= 0xD800 && codigo <= 0xDBFF;
+    const baixo = (codigo) => codigo >= 0xDC00 && codigo <= 0xDFFF;
+    if (inicio > 0 && alto(base.charCodeAt(inicio - 1))) {
+        inicio--;
+    }
+    if (fimBase < base.length && baixo(base.charCodeAt(fimBase))) {
+        fimBase++;
+        fimAtual++;
+    }
+
+    const inicioCaracteres = contarCaracteres(base.slice(0, inicio));
+    return {
+        inicio: inicioCaracteres,
+        fim: inicioCaracteres + contarCaracteres(base.slice(inicio, fimBase)),
+        texto: atual.slice(inicio, fimAtual)
+    };
+}
+
+
 function mostrarNotificacao(mensagem, tipo = 'info') {
     
     const existentes = document.querySelectorAll('.notificacao-toast');
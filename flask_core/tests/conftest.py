@@ -0,0 +1,206 @@
+import itertools
+import os
+import re
+from datetime import datetime
+
+import pytest
+
+# Antes de importar a aplicação: sem RabbitMQ (derivação na requisição, que
+# entra no orçamento), sem buffer do autosave (PATCH grava direto) e com o
+# orçamento verificado por app.testing, não pela variável
+os.environ['ZETRIA_DERIVACAO_ASSINCRONA'] = '0'
+os.environ['ZETRIA_AUTOSAVE_VAGAS'] = '0'
+os.environ.pop('ZETRIA_ORCAMENTO_SQL', None)
+
+import banco
+from app import create_app
+from orcamentos import REPETICOES_PADRAO, forma_sql
+
+# Banco falso: nenhuma consulta depende do MySQL. Cada instrução passa pelo
+# cursor medido da requisição (instrumentacao.py), que é o que o orçamento
+# conta. fetchone devolve uma linha com as colunas do SELECT (e qualquer
+# outra que for pedida). fetchall devolve LINHAS linhas na primeira vez que
+# cada instrução roda e nada depois: os laços por linha das rotas rodam (uma
+# consulta dentro deles se repete LINHAS vezes, acima do limite de
+# repetição) e a paginação por keyset termina na segunda página.
+
+DATA_FALSA = datetime(2024, 5, 1, 10, 0)
+
+LINHAS = REPETICOES_PADRAO + 1
+
+_SELECT = re.compile(r'\s*SELECT\s+(?:DISTINCT\s+)?(.*?)\s+FROM\s', re.S | re.I)
+_ALIAS = re.compile(r'\s+(?:AS\s+)?', re.I)
+_IN = re.compile(r'\bIN\s*\(((?:\s*%s\s*,)*\s*%s\s*)\)', re.I)
+
+
+def colunas_select(operacao):
+    # Nomes das colunas devolvidas pelo SELECT ('n.title' -> 'title',
+    # 'COUNT(*) AS total' -> 'total')
+    encontrado = _SELECT.match(operacao)
+    if not encontrado:
+        return []
+    colunas, atual, nivel = [], '', 0
+    for caractere in encontrado.group(1) + ',':
+        if caractere == ',' and nivel == 0:
+            colunas.append(_ALIAS.split(atual.strip())[-1].split('.')[-1])
+            atual = ''
+            continue
+        nivel += {'(': 1, ')': -1}.get(caractere, 0)
+        atual += caractere
+    return colunas
+
+
+class LinhaFalsa(dict):
+    """Linha de cursor dictionary=True com um valor plausível por coluna.
+
+    numero distingue as linhas de um fetchall: ids, nomes e títulos
+    diferentes, e links de uma nota para a seguinte.
+    """
+
+    def __init__(self, numero=1):
+        super().__init__()
+        self.numero = numero
+
+    def __missing__(self, coluna):
+        if coluna.endswith(('_em', '_at', '_date', 'ocorrencia')):
+            return DATA_FALSA
+        if coluna in ('title', 'name', 'username', 'content', 'preview', 'description',
+                      'front_content', 'back_content', 'titulo_derivado', 'chave', 'target_key'):
+            return f'x{self.numero}'
+        if coluna == 'recurrence_rule':
+            return 'FREQ=DAILY'
+        if coluna == 'password':
+            return ''
+        if coluna.startswith('target') and coluna.endswith('id'):
+            return self.numero % LINHAS + 1
+        if coluna.endswith('id'):
+            return self.numero
+        return 1
+
+    def __bool__(self):
+        return True
+
+
+class CursorFalso:
+
+    lastrowid = 1
+    rowcount = 1
+
+    def __init__(self, instrucoes, formas):
+        self.instrucoes = instrucoes
+        self.formas = formas
+        self.colunas = []
+        self.pendentes = []
+
+    def execute(self, operacao, params=None, multi=False):
+        self.instrucoes.append(operacao)
+        self.colunas = colunas_select(operacao)
+        forma = forma_sql(operacao)
+        linhas = 0 if forma in self.formas else LINHAS
+        # Filtro por uma lista de ids: não mais linhas que ids pedidos
+        lista = _IN.search(operacao)
+        if lista:
+            linhas = min(linhas, lista.group(1).count('%s'))
+        self.formas.add(forma)
+        self.pendentes = [self._linha(numero) for numero in range(1, linhas + 1)]
+
+    def executemany(self, operacao, seq_params):
+        self.instrucoes.append(operacao)
+        self.colunas = []
+        self.pendentes = []
+
+    def _linha(self, numero):
+        linha = LinhaFalsa(numero)
+        for coluna in self.colunas:
+            linha[coluna] = linha[coluna]
+        return linha
+
+    def fetchone(self):
+        return self._linha(1)
+
+    def fetchall(self):
+        linhas, self.pendentes = self.pendentes, []
+        return linhas
+
+    def fetchmany(self, size=1):
+        linhas, self.pendentes = self.pendentes[:size], self.pendentes[size:]
+        return linhas
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+
+class ConexaoFalsa:
+
+    in_transaction = False
+
+    def __init__(self, instrucoes, formas):
+        self.instrucoes = instrucoes
+        self.formas = formas
+
+    def cursor(self, *args, **kwargs):
+        return CursorFalso(self.instrucoes, self.formas)
+
+    def start_transaction(self, *args, **kwargs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class PoolFalso:
+    """No lugar do ConnectionPool do processo (banco._pool)."""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.instrucoes = []
+        # Formas de instrução que já devolveram linhas (ver CursorFalso)
+        self.formas = set()
+
+    def acquire(self):
+        return ConexaoFalsa(self.instrucoes, self.formas)
+
+    def release(self, conexao, discard=False):
+        pass
+
+    def close_all(self):
+        pass
+
+    def stats(self):
+        return {'pid': self.pid, 'size': 0}
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = PoolFalso()
+    monkeypatch.setattr(banco, '_pool', pool)
+    return pool
+
+
+@pytest.fixture
+def app(pool):
+    app = create_app()
+    app.testing = True
+    return app
+
+
+# Um usuário por teste: os caches do processo (estado.py) são por usuário e
+# as versões do banco falso não mudam, então nada passa de um teste a outro
+_usuarios = itertools.count(1)
+
+
+@pytest.fixture
+def cliente(app):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = next(_usuarios)
+    return cliente
@@ -0,0 +1,152 @@
+import json
+
+import pytest
+from flask import url_for
+
+import rotas_notas
+from app import create_app
+from banco import get_db_connection
+from conftest import LINHAS
+from estado import fetch_tags_por_nota
+from orcamentos import OrcamentoSQLExcedido, forma_sql, orcamento_sql, rotas_sem_orcamento, verificar
+
+# Requisições válidas para as rotas que validam a entrada antes de ir ao
+# banco; as outras são chamadas sem corpo nem parâmetros
+NOTA = {'title': 'Nota', 'content': 'texto #tag [[Outra nota]]'}
+TASK = {'title': 'Tarefa', 'description': 'd', 'due_date': '2024-05-01T10:00:00Z'}
+FLASHCARD = {'nota_id': 1, 'front_content': 'frente', 'back_content': 'verso'}
+COFRE = '\n'.join(json.dumps(registro) for registro in (
+    {'tipo': 'zetria', 'versao': 1},
+    {'tipo': 'nota', 'id': 1, **NOTA, 'tags': ['tag']},
+    {'tipo': 'flashcard', 'id': 1, **FLASHCARD},
+    {'tipo': 'task', 'id': 1, **TASK},
+    {'tipo': 'fim'},
+))
+
+EXEMPLOS = {
+    ('POST', 'auth.login'): {'data': {'username': 'usuario', 'password': 'senha'}},
+    ('POST', 'auth.cadastro'): {'data': {'username': 'usuario', 'password': 'senha123',
+                                         'confirm_password': 'senha123'}},
+    ('POST', 'notas.api_criar_nota'): {'json': NOTA},
+    ('PUT', 'notas.api_atualizar_nota'): {'json': NOTA},
+    ('PATCH', 'notas.api_aplicar_delta_nota'): {'json': {'revisao': 1, 'deltas': [{'inicio': 0, 'fim': 0, 'texto': 'a '}]}},
+    ('GET', 'notas.api_buscar_notas'): {'query_string': {'q': 'texto'}},
+    ('POST', 'tasks.api_criar_task'): {'json': TASK},
+    ('PUT', 'tasks.api_atualizar_task'): {'json': {**TASK, 'completed': True}},
+    ('PUT', 'tasks.api_marcar_ocorrencia'): {'json': {'ocorrencia': '2024-05-01T10:00:00Z', 'completed': True}},
+    ('GET', 'tasks.api_tasks_intervalo'): {'query_string': {'start': '2024-05-01', 'end': '2024-06-01'}},
+    ('GET', 'tasks.api_tasks_por_data'): {'date_str': '2024-05-01'},
+    ('POST', 'flashcards.api_criar_flashcard'): {'json': FLASHCARD},
+    ('PUT', 'flashcards.api_atualizar_flashcard'): {'json': FLASHCARD},
+    ('POST', 'flashcards.api_revisar_flashcard'): {'json': {'grade': 'medium'}},
+    ('GET', 'grafos.api_grafos_caminho'): {'query_string': {'origem': 1, 'destino': 2}},
+    ('POST', 'cofre.api_importar'): {'data': COFRE, 'content_type': 'application/x-ndjson'},
+}
+
+
+def rotas(app):
+    for regra in sorted(app.url_map.iter_rules(), key=lambda regra: regra.rule):
+        if regra.endpoint == 'static':
+            continue
+        for metodo in sorted(regra.methods - {'HEAD', 'OPTIONS'}):
+            yield metodo, regra
+
+
+ROTAS = [(metodo, regra.endpoint, regra.rule) for metodo, regra in rotas(create_app())]
+
+
+def url(app, endpoint, exemplo):
+    # Argumentos da URL tirados do exemplo; ids que faltam valem 1
+    regra = next(app.url_map.iter_rules(endpoint))
+    valores = {argumento: exemplo.pop(argumento, 1) for argumento in regra.arguments}
+    with app.test_request_context():
+        return url_for(endpoint, **valores)
+
+
+@pytest.mark.parametrize('metodo, endpoint, regra', ROTAS, ids=[f'{m} {r}' for m, _, r in ROTAS])
+def test_rota_dentro_do_orcamento(app, cliente, metodo, endpoint, regra):
+    # Um OrcamentoSQLExcedido aqui sai da requisição e falha o teste com o
+    # relatório (instruções a mais ou a instrução repetida e onde roda)
+    exemplo = dict(EXEMPLOS.get((metodo, endpoint), {}))
+    resposta = cliente.open(url(app, endpoint, exemplo), method=metodo, **exemplo)
+    # Consome respostas em stream (exportação) dentro do teste
+    resposta.get_data()
+    resposta.close()
+    assert resposta.status_code < 500, resposta.get_data(as_text=True)
+
+
+def test_exemplos_sao_de_rotas_existentes():
+    existentes = {(metodo, endpoint) for metodo, endpoint, _ in ROTAS}
+    assert set(EXEMPLOS) <= existentes
+
+
+def test_toda_rota_declara_orcamento(app):
+    assert rotas_sem_orcamento(app) == []
+
+
+def test_rota_acima_do_orcamento_levanta(app, cliente):
+    view = app.view_functions['notas.api_obter_nota']
+    view.orcamento_sql, original = (1, 2), view.orcamento_sql
+    try:
+        with pytest.raises(OrcamentoSQLExcedido, match=r'notas\.api_obter_nota: \d+ instruções SQL, orçamento 1'):
+            cliente.get('/api/notas/1')
+    finally:
+        view.orcamento_sql = original
+
+
+def test_instrucao_repetida_levanta_com_local(app, cliente):
+    # Tags buscadas nota a nota: a mesma instrução uma vez por nota (N+1)
+    @orcamento_sql(10)
+    def listar_nota_a_nota():
+        cursor = get_db_connection().cursor(dictionary=True)
+        for nota_id in (1, 2, 3):
+            fetch_tags_por_nota(cursor, [nota_id])
+        return {'success': True}
+
+    app.add_url_rule('/teste/nota-a-nota', 'listar_nota_a_nota', listar_nota_a_nota)
+
+    with pytest.raises(OrcamentoSQLExcedido) as excinfo:
+        cliente.get('/teste/nota-a-nota')
+    relatorio = str(excinfo.value)
+    assert 'listar_nota_a_nota: mesma instrução 3x (máximo 2), possível N+1' in relatorio
+    assert '3x em estado.py:' in relatorio
+    assert 'fetch_tags_por_nota' in relatorio
+
+
+def test_n_mais_1_numa_rota_levanta(monkeypatch, cliente):
+    # Regressão: as tags de volta nota a nota em api_listar_notas. O banco
+    # falso devolve várias notas, então a busca roda uma vez por nota
+    def tags_nota_a_nota(cursor, nota_ids):
+        tags_por_nota = {}
+        for nota_id in nota_ids:
+            tags_por_nota.update(fetch_tags_por_nota(cursor, [nota_id]))
+        return tags_por_nota
+
+    monkeypatch.setattr(rotas_notas, 'fetch_tags_por_nota', tags_nota_a_nota)
+
+    with pytest.raises(OrcamentoSQLExcedido) as excinfo:
+        cliente.get('/api/notas')
+    relatorio = str(excinfo.value)
+    assert f'notas.api_listar_notas: mesma instrução {LINHAS}x (máximo 2), possível N+1' in relatorio
+    assert 'fetch_tags_por_nota <- rotas_notas.py:' in relatorio
+
+
+def test_rota_sem_orcamento_levanta(app, cliente):
+    app.add_url_rule('/teste/sem-orcamento', 'sem_orcamento', lambda: {'success': True})
+
+    assert rotas_sem_orcamento(app) == ['sem_orcamento']
+    with pytest.raises(OrcamentoSQLExcedido, match='rota sem @orcamento_sql'):
+        cliente.get('/teste/sem-orcamento')
+
+
+def test_forma_sql_ignora_valores():
+    assert (forma_sql("SELECT * FROM notas WHERE id = 7 AND title = 'a' AND n IN (%s, %s, %s)")
+            == forma_sql("SELECT *\n  FROM notas WHERE id = 8 AND title = 'b''c' AND n IN (%s)")
+            == 'SELECT * FROM notas WHERE id = ? AND title = ? AND n IN (?)')
+
+
+def test_verificar_dentro_do_orcamento():
+    instrucoes = [('SELECT 1', 'a.py:1 f'), ('SELECT 2', 'a.py:2 f')]
+    assert verificar('rota', (2, 2), instrucoes) == []
+    assert verificar('rota', (None, 1), instrucoes) == ['rota: mesma instrução 2x (máximo 1), possível N+1: SELECT ?',
+                                                        '    1x em a.py:1 f', '    1x em a.py:2 f']
@@ -0,0 +1,28 @@
+# Carimbos de versão por usuário e recurso, para as requisições
+# condicionais (ETag/Last-Modified): toda escrita avança o contador do
+# recurso na mesma transação e grava quando isso aconteceu. O contador das
+# notas é o notas_versao (ver derivacao.py), que também versiona os caches.
+
+# recurso -> (coluna do contador, coluna do instante da última escrita)
+VERSOES_RECURSOS = {
+    'notas': ('notas_versao', 'notas_alterado_em'),
+    'flashcards': ('flashcards_versao', 'flashcards_alterado_em'),
+    'tasks': ('tasks_versao', 'tasks_alterado_em'),
+}
+
+
+def versoes_usuario(cursor, user_id):
+    # Todos os carimbos do usuário numa leitura pela chave primária;
+    # None se o usuário não existe
+    colunas = ', '.join(coluna for par in VERSOES_RECURSOS.values() for coluna in par)
+    cursor.execute(f"SELECT {colunas} FROM usuarios WHERE id = %s", (user_id,))
+    return cursor.fetchone()
+
+
+def avancar_versao_recurso(cursor, user_id, recurso):
+    # Não faz commit: roda na transação da escrita
+    versao, alterado_em = VERSOES_RECURSOS[recurso]
+    cursor.execute(
+        f"UPDATE usuarios SET {versao} = {versao} + 1, {alterado_em} = CURRENT_TIMESTAMP(6) WHERE id = %s",
+        (user_id,)
+    )
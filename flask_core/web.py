@@ -0,0 +1,191 @@
+import base64
+import binascii
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, jsonify, redirect, request, session, url_for
+
+from versoes import VERSOES_RECURSOS, versoes_usuario
+
+# Utilitários HTTP compartilhados pelos blueprints: login, paginação por
+# cursor, projeção de campos, requisições condicionais e compressão.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def require_login(f):
+    
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            if request.is_json:
+                return jsonify({'error': 'Acesso não autorizado', 'success': False}), 401
+            return redirect(url_for('auth.login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+# PAGINAÇÃO
+
+PAGE_LIMIT_DEFAULT = 50
+
+PAGE_LIMIT_MAX = 200
+
+def parse_limit(valor):
+    
+    if valor is None or valor == '':
+        return PAGE_LIMIT_DEFAULT
+    limit = int(valor)
+    if limit < 1:
+        raise ValueError('limit deve ser positivo')
+    return min(limit, PAGE_LIMIT_MAX)
+
+def encode_cursor(*valores):
+    
+    # Cursor opaco: posição (chave de ordenação) do último item da página
+    partes = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    bruto = json.dumps(partes, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(bruto).decode().rstrip('=')
+
+def decode_cursor(token, permitir_nulo=False):
+    
+    # (data, id); com permitir_nulo a data pode ser None (colunas anuláveis)
+    if not token:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data, item_id = json.loads(bruto)
+        if data is None and permitir_nulo:
+            return None, int(item_id)
+        return datetime.fromisoformat(data), int(item_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('cursor inválido') from e
+
+def encode_offset_cursor(offset):
+    
+    return encode_cursor('o', offset)
+
+def decode_offset_cursor(token):
+    
+    if not token:
+        return 0
+    try:
+        bruto = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        tipo, offset = json.loads(bruto)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('cursor inválido') from e
+    if tipo != 'o' or not isinstance(offset, int) or offset < 0:
+        raise ValueError('cursor inválido')
+    return offset
+
+def parse_fields(valor, colunas):
+    
+    # fields=a,b,c: projeção das colunas da listagem (sem fields, todas)
+    if not valor:
+        return list(colunas)
+    campos = list(dict.fromkeys(c.strip() for c in valor.split(',') if c.strip()))
+    invalidos = [c for c in campos if c not in colunas]
+    if not campos or invalidos:
+        raise ValueError(f'campos inválidos: {", ".join(invalidos)}')
+    return campos
+
+def select_fields(campos, colunas, chaves):
+    
+    # Colunas do SELECT: os campos pedidos mais as chaves da ordenação, que
+    # o cursor precisa mesmo quando não foram pedidas
+    selecionados = campos + [c for c in chaves if c not in campos]
+    return ', '.join(f'{colunas[c]} AS {c}' for c in selecionados)
+
+def parse_bool_arg(nome, padrao=True):
+    
+    valor = request.args.get(nome)
+    if valor is None:
+        return padrao
+    return valor not in ('0', 'false')
+
+# REQUISIÇÕES CONDICIONAIS (ver versoes.py)
+
+def make_etag(*partes):
+    
+    return hashlib.sha1('|'.join(str(p) for p in partes).encode()).hexdigest()
+
+def last_modified(alterado_em):
+    
+    # O cabeçalho tem precisão de segundos: só é enviado depois que o segundo
+    # da última escrita passou, senão outra escrita no mesmo segundo teria o
+    # mesmo Last-Modified e o If-Modified-Since manteria a versão velha
+    if alterado_em is None:
+        return None
+    ultima = alterado_em.astimezone(timezone.utc).replace(microsecond=0)
+    if ultima >= datetime.now(timezone.utc).replace(microsecond=0):
+        return None
+    return ultima
+
+def com_validadores(response, etag, alterado_em=None):
+    
+    response.set_etag(etag)
+    ultima = last_modified(alterado_em)
+    if ultima is not None:
+        response.last_modified = ultima
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def validadores_recursos(cursor, nome, recursos, *partes):
+    
+    # ETag e instante da última escrita de uma leitura que depende só dos
+    # recursos dados (e dos parâmetros em partes): uma consulta por chave
+    # primária em usuarios, em vez da consulta da listagem
+    versoes = versoes_usuario(cursor, session['user_id'])
+    etag = make_etag(nome, session['user_id'],
+                     *[versoes[VERSOES_RECURSOS[r][0]] for r in recursos], *partes)
+    alterado_em = max(versoes[VERSOES_RECURSOS[r][1]] for r in recursos)
+    return etag, alterado_em
+
+def nao_modificada(etag, alterado_em=None):
+    
+    # 304 se o cliente já tem esta versão, antes de qualquer consulta pesada;
+    # None para seguir com a resposta completa. If-None-Match tem precedência
+    # e o If-Modified-Since só vale sem ele (RFC 7232)
+    if request.if_none_match:
+        atual = request.if_none_match.contains(etag)
+    else:
+        ultima = last_modified(alterado_em)
+        atual = (ultima is not None and request.if_modified_since is not None
+                 and ultima <= request.if_modified_since)
+    if not atual:
+        return None
+    return com_validadores(current_app.response_class(status=304), etag, alterado_em)
+
+# Respostas menores que isso não compensam o custo de comprimir
+COMPRESSAO_MIN_BYTES = 1024
+
+def escolher_encoding():
+    
+    # br só se o módulo brotli estiver instalado; senão gzip, se aceito
+    aceitos = request.accept_encodings
+    if brotli is not None and aceitos.quality('br') > 0:
+        return 'br'
+    if aceitos.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+def comprimir_resposta(response, encoding):
+    
+    response.vary.add('Accept-Encoding')
+    if encoding is None or response.direct_passthrough:
+        return response
+    
+    corpo = response.get_data()
+    if len(corpo) < COMPRESSAO_MIN_BYTES:
+        return response
+    
+    if encoding == 'br':
+        response.set_data(brotli.compress(corpo, quality=5))
+    else:
+        response.set_data(gzip.compress(corpo, compresslevel=6))
+    response.headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,309 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Tamanho de links_pendentes.target_key. O texto de um [[link]] não tem
+# limite, e o casefold pode alongar um título de 255 caracteres (ß -> ss)
+MAX_CHAVE = 255
+
+
+def chave_titulo(texto):
+    # [[Título|apelido]] e [[Título#seção]] apontam para "Título"
+    texto = texto.split('|', 1)[0].split('#', 1)[0]
+    chave = ' '.join(texto.split()).casefold()
+    if len(chave) > MAX_CHAVE:
+        # Começo da chave + hash do todo: cabe na coluna e continua igual
+        # para o título e para os links que apontam para ele
+        resumo = hashlib.sha1(chave.encode('utf-8')).hexdigest()
+        chave = chave[:MAX_CHAVE - len(resumo) - 1] + '~' + resumo
+    return chave
+
+
+class TituloIndex:
+    """Índice título -> notas de um usuário (chave normalizada, busca O(1)).
+
+    Títulos repetidos são permitidos; o link resolve para a nota mais antiga
+    (menor id) com aquele título.
+    """
+
+    def __init__(self, notas=()):
+        self.ids_por_chave = {}
+        for nota in notas:
+            self._adicionar(chave_titulo(nota['title']), nota['id'])
+
+    def _adicionar(self, chave, nota_id):
+        self.ids_por_chave.setdefault(chave, set()).add(nota_id)
+
+    def _remover(self, chave, nota_id):
+        ids = self.ids_por_chave.get(chave)
+        if ids is not None:
+            ids.discard(nota_id)
+            if not ids:
+                del self.ids_por_chave[chave]
+
+    def resolve(self, chave, alteracao=None):
+        # alteracao = (nota_id, chave_antiga, chave_nova): resolve como se a
+        # escrita em andamento já estivesse aplicada, sem copiar o índice
+        ids = self.ids_por_chave.get(chave, ())
+        if alteracao is not None:
+            nota_id, chave_antiga, chave_nova = alteracao
+            if chave == chave_antiga and chave != chave_nova:
+                ids = set(ids) - {nota_id}
+            elif chave == chave_nova and chave != chave_antiga:
+                ids = set(ids) | {nota_id}
+        return min(ids) if ids else None
+
+    def set_titulo(self, nota_id, titulo_antigo, titulo_novo):
+        if titulo_antigo is not None:
+            self._remover(chave_titulo(titulo_antigo), nota_id)
+        if titulo_novo is not None:
+            self._adicionar(chave_titulo(titulo_novo), nota_id)
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.ids_por_chave.values())
+
+
+class TituloIndexCache:
+    """LRU de índices de título por usuário, versionado como o cache de grafos."""
+
+    def __init__(self, max_entries=256, max_notas=2_000_000):
+        self.max_entries = max_entries
+        self.max_notas = max_notas
+        self._entradas = OrderedDict()  # user_id -> (versao, indice)
+        self._total_notas = 0
+        self._lock = threading.Lock()
+
+    def get(self, user_id, versao):
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None or entrada[0] != versao:
+                return None
+            self._entradas.move_to_end(user_id)
+            return entrada[1]
+
+    def put(self, user_id, versao, indice):
+        with self._lock:
+            self._remover(user_id)
+            self._entradas[user_id] = (versao, indice)
+            self._total_notas += len(indice)
+            while self._entradas and (len(self._entradas) > self.max_entries
+                                      or self._total_notas > self.max_notas):
+                antigo, _ = next(iter(self._entradas.items()))
+                self._remover(antigo)
+
+    def patch(self, user_id, versao_antes, versao_depois, aplicar):
+        with self._lock:
+            entrada = self._entradas.get(user_id)
+            if entrada is None:
+                return
+            if entrada[0] != versao_antes:
+                self._remover(user_id)
+                return
+            indice = entrada[1]
+            self._total_notas -= len(indice)
+            aplicar(indice)
+            self._total_notas += len(indice)
+            self._entradas[user_id] = (versao_depois, indice)
+
+    def _remover(self, user_id):
+        entrada = self._entradas.pop(user_id, None)
+        if entrada is not None:
+            self._total_notas -= len(entrada[1])
+
+
+def mudancas_titulo(indice, nota_id, titulo_antigo, titulo_novo):
+    # Chaves cuja resolução muda quando a nota troca de título (ou é criada,
+    # com titulo_antigo None, ou removida, com titulo_novo None)
+    chave_antiga = chave_titulo(titulo_antigo) if titulo_antigo is not None else None
+    chave_nova = chave_titulo(titulo_novo) if titulo_novo is not None else None
+    if chave_antiga == chave_nova:
+        return []
+
+    alteracao = (nota_id, chave_antiga, chave_nova)
+    mudancas = []
+    for chave in (chave_antiga, chave_nova):
+        if chave is None:
+            continue
+        antes = indice.resolve(chave)
+        depois = indice.resolve(chave, alteracao)
+        if antes != depois:
+            mudancas.append((chave, antes, depois))
+    return mudancas
+
+
+def reapontar_links(cursor, user_id, chave, de_id, para_id):
+    # Move os links que resolviam "chave" para de_id (ou estavam pendentes,
+    # se de_id é None) para para_id (ou para pendentes, se para_id é None)
+    adicionados, removidos = [], []
+
+    if de_id is None:
+        cursor.execute("""
+            SELECT lp.source_nota_id
+            FROM links_pendentes lp
+            JOIN notas n ON n.id = lp.source_nota_id
+            WHERE n.user_id = %s AND lp.target_key = %s
+        """, (user_id, chave))
+        origens = [row['source_nota_id'] for row in cursor.fetchall()]
+        if not origens:
+            return adicionados, removidos
+
+        placeholders = ','.join(['%s'] * len(origens))
+        cursor.execute(
+            f"DELETE FROM links_pendentes WHERE target_key = %s AND source_nota_id IN ({placeholders})",
+            [chave] + origens
+        )
+    else:
+        cursor.execute("""
+            SELECT source_nota_id FROM links_notas WHERE target_nota_id = %s
+        """, (de_id,))
+        origens = [row['source_nota_id'] for row in cursor.fetchall()]
+        if not origens:
+            return adicionados, removidos
+
+        cursor.execute("DELETE FROM links_notas WHERE target_nota_id = %s", (de_id,))
+        removidos = [(origem, de_id) for origem in origens]
+
+    if para_id is None:
+        cursor.execute(
+            f"INSERT IGNORE INTO links_pendentes (source_nota_id, target_key) VALUES {','.join(['(%s, %s)'] * len(origens))}",
+            [valor for origem in origens for valor in (origem, chave)]
+        )
+    else:
+        # Uma nota não aponta para si mesma
+        origens = [origem for origem in origens if origem != para_id]
+        if origens:
+            cursor.execute(
+                f"INSERT IGNORE INTO links_notas (source_nota_id, target_nota_id) VALUES {','.join(['(%s, %s)'] * len(origens))}",
+                [valor for origem in origens for valor in (origem, para_id)]
+            )
+            adicionados = [(origem, para_id) for origem in origens]
+
+    return adicionados, removidos
+
+
+def sync_nota_links(cursor, nota_id, textos, indice, alteracao=None, nova=False):
+    # Mantém links_notas/links_pendentes da nota em sincronia com os [[links]]
+    # do conteúdo, aplicando só a diferença. Não faz commit.
+    desejados = set()
+    pendentes = set()
+    for texto in textos:
+        chave = chave_titulo(texto)
+        if not chave:
+            continue
+        alvo = indice.resolve(chave, alteracao)
+        if alvo is None:
+            pendentes.add(chave)
+        elif alvo != nota_id:
+            desejados.add(alvo)
+
+    atuais = set()
+    pendentes_atuais = set()
+    if not nova:
+        cursor.execute("SELECT target_nota_id FROM links_notas WHERE source_nota_id = %s", (nota_id,))
+        atuais = {row['target_nota_id'] for row in cursor.fetchall()}
+        cursor.execute("SELECT target_key FROM links_pendentes WHERE source_nota_id = %s", (nota_id,))
+        pendentes_atuais = {row['target_key'] for row in cursor.fetchall()}
+
+    removidos = atuais - desejados
+    adicionados = desejados - atuais
+
+    if removidos:
+        placeholders = ','.join(['%s'] * len(removidos))
+        cursor.execute(
+            f"DELETE FROM links_notas WHERE source_nota_id = %s AND target_nota_id IN ({placeholders})",
+            [nota_id] + list(removidos)
+        )
+    if adicionados:
+        cursor.execute(
+            f"INSERT IGNORE INTO links_notas (source_nota_id, target_nota_id) VALUES {','.join(['(%s, %s)'] * len(adicionados))}",
+            [valor for alvo in adicionados for valor in (nota_id, alvo)]
+        )
+
+    pendentes_removidos = pendentes_atuais - pendentes
+    pendentes_adicionados = pendentes - pendentes_atuais
+    if pendentes_removidos:
+        placeholders = ','.join(['%s'] * len(pendentes_removidos))
+        cursor.execute(
+            f"DELETE FROM links_pendentes WHERE source_nota_id = %s AND target_key IN ({placeholders})",
+            [nota_id] + list(pendentes_removidos)
+        )
+    if pendentes_adicionados:
+        cursor.execute(
+            f"INSERT IGNORE INTO links_pendentes (source_nota_id, target_key) VALUES {','.join(['(%s, %s)'] * len(pendentes_adicionados))}",
+            [valor for chave in pendentes_adicionados for valor in (nota_id, chave)]
+        )
+
+    return ([(nota_id, alvo) for alvo in adicionados],
+            [(nota_id, alvo) for alvo in removidos])
+
+
+def alterar_links_nota(cursor, nota_id, indice, chaves_adicionadas, chaves_removidas):
+    # Aplica uma diferença já conhecida nos [[links]] da nota (chaves que
+    # passaram a aparecer ou deixaram de aparecer no conteúdo) sem ler os
+    # links atuais. Supõe o título da nota inalterado e os links dela em dia
+    # com o índice, como depois de uma derivação. Não faz commit.
+    adicionados, removidos = set(), set()
+    pendentes_adicionados, pendentes_removidos = set(), set()
+    for chave in chaves_adicionadas:
+        alvo = indice.resolve(chave)
+        if alvo is None:
+            pendentes_adicionados.add(chave)
+        elif alvo != nota_id:
+            adicionados.add(alvo)
+    for chave in chaves_removidas:
+        alvo = indice.resolve(chave)
+        if alvo is None:
+            pendentes_removidos.add(chave)
+        elif alvo != nota_id:
+            removidos.add(alvo)
+
+    if removidos:
+        placeholders = ','.join(['%s'] * len(removidos))
+        cursor.execute(
+            f"DELETE FROM links_notas WHERE source_nota_id = %s AND target_nota_id IN ({placeholders})",
+            [nota_id] + list(removidos)
+        )
+    if adicionados:
+        cursor.execute(
+            f"INSERT IGNORE INTO links_notas (source_nota_id, target_nota_id) VALUES {','.join(['(%s, %s)'] * len(adicionados))}",
+            [valor for alvo in adicionados for valor in (nota_id, alvo)]
+        )
+    if pendentes_removidos:
+        placeholders = ','.join(['%s'] * len(pendentes_removidos))
+        cursor.execute(
+            f"DELETE FROM links_pendentes WHERE source_nota_id = %s AND target_key IN ({placeholders})",
+            [nota_id] + list(pendentes_removidos)
+        )
+    if pendentes_adicionados:
+        cursor.execute(
+            f"INSERT IGNORE INTO links_pendentes (source_nota_id, target_key) VALUES {','.join(['(%s, %s)'] * len(pendentes_adicionados))}",
+            [valor for chave in pendentes_adicionados for valor in (nota_id, chave)]
+        )
+
+    return ([(nota_id, alvo) for alvo in adicionados],
+            [(nota_id, alvo) for alvo in removidos])
+
+
+def sync_escrita_nota(cursor, user_id, indice, nota_id, titulo_antigo, titulo_novo,
+                      textos=None, nova=False):
+    # Aplica os efeitos de uma escrita de nota nos links: reaponta os links
+    # de outras notas cujo alvo muda com a troca de título e, se textos for
+    # dado, sincroniza os [[links]] da própria nota
+    adicionados, removidos = [], []
+
+    for chave, de_id, para_id in mudancas_titulo(indice, nota_id, titulo_antigo, titulo_novo):
+        novos, antigos = reapontar_links(cursor, user_id, chave, de_id, para_id)
+        adicionados += novos
+        removidos += antigos
+
+    if textos is not None:
+        alteracao = (
+            nota_id,
+            chave_titulo(titulo_antigo) if titulo_antigo is not None else None,
+            chave_titulo(titulo_novo) if titulo_novo is not None else None,
+        )
+        novos, antigos = sync_nota_links(cursor, nota_id, textos, indice, alteracao, nova)
+        adicionados += novos
+        removidos += antigos
+
+    return adicionados, removidos
@@ -0,0 +1,155 @@
+import argparse
+import os
+import signal
+import sys
+
+# Servidor de produção da aplicação web, sobre o gunicorn:
+#
+#   python zetria.py serve [--workers N] [--threads N] [--worker-class gthread|gevent]
+#   python zetria.py reload
+#
+# A aplicação é carregada uma vez no processo mestre (preload) e os workers
+# são forks dele. create_app() não abre conexões; o pool do MySQL e o
+# publicador do RabbitMQ de cada worker são criados na primeira requisição
+# depois do fork (ver banco.py e estado.py).
+
+BIND_PADRAO = os.environ.get('ZETRIA_BIND', '0.0.0.0:5000')
+PIDFILE_PADRAO = os.environ.get('ZETRIA_PIDFILE', '/tmp/zetria.pid')
+
+# Worker recriado depois de N requisições (com jitter, para não reciclar
+# todos ao mesmo tempo); limita o crescimento dos caches e vazamentos
+MAX_REQUESTS = int(os.environ.get('ZETRIA_MAX_REQUESTS', '5000'))
+
+# Tempo que um worker tem para terminar as requisições em curso no reload
+GRACEFUL_TIMEOUT = int(os.environ.get('ZETRIA_GRACEFUL_TIMEOUT', '30'))
+
+
+def cpus_disponiveis():
+    # CPUs que o processo pode usar: afinidade e, em container, a cota do cgroup
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as arquivo:
+            cota, periodo = arquivo.read().split()
+        if cota != 'max':
+            cpus = min(cpus, max(1, -(-int(cota) // int(periodo))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def workers_padrao():
+    # Um processo por CPU; a concorrência dentro do worker vem das threads
+    # (gthread) ou das greenlets (gevent)
+    valor = os.environ.get('ZETRIA_WORKERS')
+    if valor:
+        return int(valor)
+    return cpus_disponiveis()
+
+
+def threads_padrao():
+    # Mais threads que conexões no pool só faz requisições esperarem pelo pool
+    valor = os.environ.get('ZETRIA_THREADS') or os.environ.get('ZETRIA_DB_POOL_SIZE', '5')
+    return int(valor)
+
+
+def criar_servidor(opcoes):
+    from gunicorn.app.base import BaseApplication
+
+    class ServidorZetria(BaseApplication):
+
+        def __init__(self, config):
+            self.config_zetria = config
+            super().__init__()
+
+        def load_config(self):
+            for chave, valor in self.config_zetria.items():
+                self.cfg.set(chave, valor)
+
+        def load(self):
+            from app import create_app
+            return create_app()
+
+    return ServidorZetria(opcoes)
+
+
+def serve(args):
+    if args.worker_class == 'gevent':
+        try:
+            from gevent import monkey
+        except ImportError:
+            sys.exit('gevent não está instalado (pip install gevent)')
+        # Com preload os módulos são importados no mestre: o patch tem que vir
+        # antes, senão locks e sockets criados no import ficam bloqueantes
+        monkey.patch_all()
+
+    workers = args.workers or workers_padrao()
+    threads = args.threads or threads_padrao()
+
+    opcoes = {
+        'bind': args.bind,
+        'workers': workers,
+        'worker_class': args.worker_class,
+        'preload_app': True,
+        'pidfile': args.pidfile,
+        'timeout': args.timeout,
+        'graceful_timeout': GRACEFUL_TIMEOUT,
+        'max_requests': MAX_REQUESTS,
+        'max_requests_jitter': MAX_REQUESTS // 10,
+        'accesslog': os.environ.get('ZETRIA_ACCESSLOG'),
+    }
+    if args.worker_class == 'gthread':
+        opcoes['threads'] = threads
+    else:
+        opcoes['worker_connections'] = args.connections
+
+    print(f"🐝 Zetria em {args.bind}: {workers} worker(s) {args.worker_class}"
+          + (f" x {threads} thread(s)" if args.worker_class == 'gthread' else ''))
+    criar_servidor(opcoes).run()
+
+
+def reload(args):
+    # SIGHUP: o mestre sobe workers novos e encerra os antigos depois que
+    # terminam as requisições em curso (graceful_timeout). Os workers novos
+    # são forks do mestre; para carregar código novo reinicie o serviço
+    try:
+        with open(args.pidfile) as arquivo:
+            pid = int(arquivo.read().strip())
+    except (OSError, ValueError):
+        sys.exit(f'servidor não encontrado ({args.pidfile})')
+
+    try:
+        os.kill(pid, signal.SIGHUP)
+    except ProcessLookupError:
+        sys.exit(f'processo {pid} não existe mais ({args.pidfile})')
+    print(f'reload enviado ao processo {pid}')
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='zetria', description='Servidor web do Zetria')
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    p_serve = comandos.add_parser('serve', help='inicia o servidor com vários workers')
+    p_serve.add_argument('--bind', default=BIND_PADRAO)
+    p_serve.add_argument('--workers', type=int, help='padrão: CPUs disponíveis (ou ZETRIA_WORKERS)')
+    p_serve.add_argument('--threads', type=int, help='threads por worker gthread (padrão: ZETRIA_THREADS ou o tamanho do pool)')
+    p_serve.add_argument('--worker-class', choices=['gthread', 'gevent'],
+                         default=os.environ.get('ZETRIA_WORKER_CLASS', 'gthread'))
+    p_serve.add_argument('--connections', type=int, default=100, help='conexões simultâneas por worker gevent')
+    p_serve.add_argument('--timeout', type=int, default=60)
+    p_serve.add_argument('--pidfile', default=PIDFILE_PADRAO)
+    p_serve.set_defaults(funcao=serve)
+
+    p_reload = comandos.add_parser('reload', help='recria os workers sem derrubar conexões')
+    p_reload.add_argument('--pidfile', default=PIDFILE_PADRAO)
+    p_reload.set_defaults(funcao=reload)
+
+    args = parser.parse_args()
+    args.funcao(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,12 @@ CREATE TABLE
         id INT AUTO_INCREMENT PRIMARY KEY,
         username VARCHAR(80) UNIQUE NOT NULL,
         password_hash VARCHAR(255) NOT NULL,
+        notas_versao BIGINT NOT NULL DEFAULT 0,
+        notas_alterado_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+        flashcards_versao BIGINT NOT NULL DEFAULT 0,
+        flashcards_alterado_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+        tasks_versao BIGINT NOT NULL DEFAULT 0,
+        tasks_alterado_em TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     );
 
@@ -20,6 +26,16 @@ CREATE TABLE
         content TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        versao_usuario BIGINT NOT NULL DEFAULT 0,
+        revisao INT NOT NULL DEFAULT 1,
+        derivado_versao INT NOT NULL DEFAULT 0,
+        titulo_derivado VARCHAR(255) NULL,
+        preview VARCHAR(255) NOT NULL DEFAULT '',
+        word_count INT NOT NULL DEFAULT 0,
+        tag_count INT NOT NULL DEFAULT 0,
+        link_count INT NOT NULL DEFAULT 0,
+        INDEX idx_notas_user_updated (user_id, updated_at),
+        INDEX idx_notas_user_versao (user_id, versao_usuario),
         FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE
     );
 
@@ -47,16 +63,34 @@ CREATE TABLE
         FOREIGN KEY (target_nota_id) REFERENCES notas (id) ON DELETE CASCADE
     );
 
+CREATE TABLE
+    IF NOT EXISTS links_pendentes (
+        source_nota_id INT NOT NULL,
+        target_key VARCHAR(255) NOT NULL,
+        PRIMARY KEY (source_nota_id, target_key),
+        INDEX idx_links_pendentes_key (target_key),
+        FOREIGN KEY (source_nota_id) REFERENCES notas (id) ON DELETE CASCADE
+    );
+
 CREATE TABLE
     IF NOT EXISTS flashcards (
         id INT AUTO_INCREMENT PRIMARY KEY,
         nota_id INT NOT NULL,
+        user_id INT NOT NULL,
         front_content TEXT NOT NULL,
         back_content TEXT NOT NULL,
         audio_path VARCHAR(255) NULL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         review_at TIMESTAMP NULL,
-        FOREIGN KEY (nota_id) REFERENCES notas (id) ON DELETE CASCADE
+        ease DOUBLE NOT NULL DEFAULT 2.5,
+        interval_days INT NOT NULL DEFAULT 0,
+        repetitions INT NOT NULL DEFAULT 0,
+        lapses INT NOT NULL DEFAULT 0,
+        last_reviewed_at TIMESTAMP NULL,
+        INDEX idx_flashcards_user_review (user_id, review_at, id),
+        INDEX idx_flashcards_user_created (user_id, created_at),
+        FOREIGN KEY (nota_id) REFERENCES notas (id) ON DELETE CASCADE,
+        FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE
     );
 
 CREATE TABLE
@@ -66,11 +100,22 @@ CREATE TABLE
         title VARCHAR(255) NOT NULL,
         description TEXT NULL,
         due_date DATETIME NULL,
-        recurring BOOLEAN DEFAULT FALSE,
+        recurring BOOLEAN NOT NULL DEFAULT FALSE,
         recurrence_rule VARCHAR(100) NULL,
         completed BOOLEAN DEFAULT FALSE,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_tasks_user_due (user_id, due_date),
+        INDEX idx_tasks_user_recurring (user_id, recurring, due_date),
         FOREIGN KEY (user_id) REFERENCES usuarios (id) ON DELETE CASCADE
     );
+
+CREATE TABLE
+    IF NOT EXISTS task_ocorrencias (
+        task_id INT NOT NULL,
+        ocorrencia DATETIME NOT NULL,
+        completed BOOLEAN NOT NULL DEFAULT TRUE,
+        PRIMARY KEY (task_id, ocorrencia),
+        FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE
+    );
     
 SELECT host, user, authentication_string FROM mysql.user WHERE user = 'root';
\ No newline at end of file